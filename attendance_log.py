@@ -0,0 +1,211 @@
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import gspread
+import pytz
+from header_index import header_index, is_attendance_column
+
+# =========================
+# BITÁCORA DE ASISTENCIA (FORMATO LARGO, SÓLO AGREGAR)
+# =========================
+# Alternativa al formato ancho (una columna por captura). Cada marca es una
+# fila en la pestaña oculta "_log":
+#
+#   materia | No de control | sesion | estado | timestamp | autor
+#
+# - una captura = UN append_rows con una fila por alumno
+# - una corrección (retardos) = filas nuevas; la última fila de cada
+#   (materia, alumno, sesión) es la que vale
+# - leer = pedir sólo las filas después de las ya conocidas
+# - la pestaña de cada materia conserva sólo los datos del alumno; la vista
+#   ancha (la que ven las páginas) se arma al leer
+#
+# Se activa en secrets (después de migrar con migrate_to_log):
+#   [storage]
+#   layout = "log"
+
+LOG_TITLE = "_log"
+LOG_HEADER = ["materia", "No de control", "sesion", "estado", "timestamp", "autor"]
+KEY_COLUMN = "No de control"
+
+# Misma zona que las páginas (los encabezados "Unidad N - dd/mm/AAAA HH:MM"),
+# con el desfase explícito: el servidor puede estar en UTC
+ZONA = pytz.timezone("America/Mexico_City")
+
+def _ahora() -> str:
+    return datetime.datetime.now(ZONA).isoformat(timespec="seconds")
+
+class LogLayout:
+    """
+    Envuelve un backend (Sheets o SQLite) y expone la misma interfaz con
+    vista ancha, pero guardando la asistencia como bitácora en "_log".
+    """
+
+    name = "log"
+
+    def __init__(self, base):
+        self.base = base
+        self.delta = getattr(base, "delta", None)
+        self._lock = threading.Lock()
+        self._offset = 0                                          # filas de la bitácora ya leídas
+        self._marks: Dict[str, Dict[Tuple[str, str], str]] = {}   # materia -> (alumno, sesión) -> estado
+        self._sessions: Dict[str, Dict[str, None]] = {}          # materia -> sesiones en orden
+
+    # --- bitácora ---
+    def _ensure_log(self) -> None:
+        if LOG_TITLE not in self.base.list_worksheets():
+            self.base.replace_worksheet(LOG_TITLE, [LOG_HEADER])
+
+    def refresh(self) -> int:
+        """Lee sólo las filas nuevas de la bitácora; regresa cuántas llegaron."""
+        with self._lock:
+            try:
+                # Se pide desde la última fila conocida (siempre existe) y se descarta
+                bloque = self.base.read_rows(LOG_TITLE, self._offset + 1, len(LOG_HEADER))[1:]
+            except gspread.exceptions.WorksheetNotFound:
+                return 0
+            for fila in bloque:
+                fila = list(fila) + [""] * (len(LOG_HEADER) - len(fila))
+                materia, nc, sesion, estado = (str(v).strip() for v in fila[:4])
+                if not materia or not sesion:
+                    continue
+                self._marks.setdefault(materia, {})[(nc, sesion)] = estado
+                self._sessions.setdefault(materia, {})[sesion] = None
+            self._offset += len(bloque)
+            return len(bloque)
+
+    def append_events(self, events: List[List[str]]) -> Dict:
+        if not events:
+            return {"rows": 0, "api_calls": 0}
+        self._ensure_log()
+        return self.base.append_rows(LOG_TITLE, events)
+
+    # --- vista ancha ---
+    def _roster(self, worksheet_title: str) -> pd.DataFrame:
+        """Datos del alumno (sin columnas de asistencia que hayan quedado del formato ancho)."""
+        df = self.base.read_df(worksheet_title)
+        return df[[c for c in df.columns if not is_attendance_column(c)]]
+
+    def read_df(self, worksheet_title: str) -> pd.DataFrame:
+        self.refresh()
+        return self._wide(worksheet_title, self.base.read_df(worksheet_title))
+
+    def _wide(self, worksheet_title: str, df: pd.DataFrame) -> pd.DataFrame:
+        roster = df[[c for c in df.columns if not is_attendance_column(c)]]
+        with self._lock:
+            marcas = dict(self._marks.get(worksheet_title, {}))
+            sesiones = list(self._sessions.get(worksheet_title, {}))
+        if roster.empty or KEY_COLUMN not in roster.columns:
+            return roster
+        ncs = roster[KEY_COLUMN].astype(str).str.strip().tolist()
+        columnas = {
+            sesion: [marcas.get((nc, sesion), "") for nc in ncs]
+            for sesion in sesiones
+        }
+        return pd.concat([roster.reset_index(drop=True), pd.DataFrame(columnas)], axis=1)
+
+    def read_many(self, worksheet_titles: List[str]) -> Dict[str, pd.DataFrame]:
+        """Varias materias con una sola lectura de la bitácora."""
+        self.refresh()
+        if hasattr(self.base, "read_many"):
+            rosters = self.base.read_many(worksheet_titles)
+        else:
+            rosters = {t: self.base.read_df(t) for t in worksheet_titles}
+        return {t: self._wide(t, df) for t, df in rosters.items()}
+
+    def get_all_values(self, worksheet_title: str) -> List[List[str]]:
+        df = self.read_df(worksheet_title)
+        if df.empty and not len(df.columns):
+            return []
+        return [list(df.columns)] + df.astype(str).values.tolist()
+
+    def read_header(self, worksheet_title: str) -> List[str]:
+        return list(self.read_df(worksheet_title).columns)
+
+    def list_worksheets(self) -> List[str]:
+        return self.base.list_worksheets()
+
+    # --- escrituras ---
+    def write_column(self, worksheet_title: str, header: str, values: List[str], author: str = "captura") -> Dict:
+        """Una captura completa = un append con una fila por alumno."""
+        roster = self._roster(worksheet_title)
+        ncs = roster[KEY_COLUMN].astype(str).str.strip().tolist() if KEY_COLUMN in roster.columns else []
+        ts = _ahora()
+        events = [
+            [worksheet_title, nc, header, v, ts, author]
+            for nc, v in zip(ncs, values) if nc
+        ]
+        stats = self.append_events(events)
+        return {"col_idx": None, "range": None, "api_calls": stats["api_calls"], "events": len(events)}
+
+    def update_cells(self, worksheet_title: str, cells: Dict[Tuple[int, int], str], author: str = "corrección") -> Dict:
+        """
+        Coordenadas de la vista ancha: las celdas de asistencia se vuelven
+        eventos; las de datos del alumno se escriben en su pestaña.
+        """
+        header = self.read_header(worksheet_title)
+        roster_header = self.base.read_header(worksheet_title)
+        datos, marcas = {}, []
+        for (row, col), value in cells.items():
+            nombre_col = header[col - 1] if col <= len(header) else ""
+            if nombre_col and not is_attendance_column(nombre_col) and nombre_col in roster_header:
+                datos[(row, roster_header.index(nombre_col) + 1)] = value
+            elif nombre_col:
+                marcas.append((row, nombre_col, value))
+        api_calls = 0
+        if datos:
+            api_calls += self.base.update_cells(worksheet_title, datos)["api_calls"]
+        if marcas:
+            roster = self._roster(worksheet_title)
+            ncs = roster[KEY_COLUMN].astype(str).str.strip().tolist()
+            ts = _ahora()
+            events = [
+                [worksheet_title, ncs[row - 2], sesion, value, ts, author]
+                for row, sesion, value in marcas if 2 <= row < len(ncs) + 2
+            ]
+            api_calls += self.append_events(events)["api_calls"]
+        return {"cells": len(cells), "api_calls": api_calls}
+
+    # --- la pestaña de la materia (datos del alumno) ---
+    def replace_worksheet(self, worksheet_title: str, values: List[List[str]]) -> None:
+        self.base.replace_worksheet(worksheet_title, values)
+
+    def replace_worksheets(self, sheets: Dict[str, List[List[str]]]) -> Dict:
+        return self.base.replace_worksheets(sheets)
+
+    def delete_rows(self, worksheet_title: str, rows: List[int]) -> Dict:
+        # Los eventos del alumno se quedan en la bitácora; sin fila ya no aparecen
+        return self.base.delete_rows(worksheet_title, rows)
+
+def events_from_wide(materia: str, df: pd.DataFrame, author: str = "migración") -> List[List[str]]:
+    """Eventos equivalentes a las columnas de asistencia de una hoja ancha."""
+    if df.empty or KEY_COLUMN not in df.columns:
+        return []
+    ncs = df[KEY_COLUMN].astype(str).str.strip().tolist()
+    events = []
+    for info in header_index(df.columns).attendance:
+        ts = info.dt.isoformat(timespec="seconds") if info.dt else ""
+        valores = df.iloc[:, info.position].astype(str).tolist()
+        for nc, v in zip(ncs, valores):
+            if nc and v.strip():
+                events.append([materia, nc, info.header, v, ts, author])
+    return events
+
+def migrate_to_log(layout: LogLayout, titles: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Copia la asistencia de las hojas anchas a la bitácora. No borra nada de
+    las hojas y se puede repetir: sólo agrega las marcas que falten o cambien.
+    """
+    layout.refresh()
+    resumen = {}
+    if titles is None:
+        titles = [t for t in layout.list_worksheets() if not t.startswith("_")]
+    for title in titles:
+        df = layout.base.read_df(title)
+        with layout._lock:
+            actuales = layout._marks.get(title, {})
+            events = [e for e in events_from_wide(title, df) if actuales.get((e[1], e[2])) != e[3]]
+        layout.append_events(events)
+        resumen[title] = len(events)
+    return resumen
@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# =========================
+# MATRIZ DE ASISTENCIA (alumnos × sesiones)
+# =========================
+# Una worksheet se codifica UNA vez en una matriz int8 densa y todos los
+# conteos y tasas (por alumno, sesión, unidad o materia) salen de reducciones
+# de NumPy. Las tasas de graficas.py (vía summary_cube.py), del cubo OLAP y de
+# la hoja _resumen usan la misma regla: count_rates.
+#
+# Códigos:
+#   0 = sin dato   1 = ✓ presente   2 = ~ / r retardo   3 = ✗ falta
+
+NONE, PRESENT, TARDY, ABSENT = 0, 1, 2, 3
+N_STATUS = 4
+STATUSES = {"present": PRESENT, "tardy": TARDY, "absent": ABSENT}
+
+# Puntaje usado en las gráficas: ✓ = 1, ~ = 0.5, lo demás = 0
+SCORE = np.array([0.0, 1.0, 0.5, 0.0])
+
+def status_code(value) -> int:
+    """Convierte ✓, ~ / r, ✗ en su código (0 si no es una marca de asistencia)."""
+    if not isinstance(value, str):
+        return NONE
+    v = value.strip().lower()
+    if v == "✓":
+        return PRESENT
+    if v in ("~", "r"):
+        return TARDY
+    if v == "✗":
+        return ABSENT
+    return NONE
+
+def merge_marks(saved: Sequence[str], present: Sequence[bool]) -> List[str]:
+    """
+    Valores a guardar a partir de las casillas "Presente": una marca guardada
+    que coincide con su casilla se conserva (p. ej. un retardo "~" sin marcar);
+    las demás, y las celdas vacías, se vuelven ✓ / ✗.
+    """
+    return [v if v and (v == "✓") == p else ("✓" if p else "✗") for v, p in zip(saved, present)]
+
+def encode_values(values: np.ndarray) -> np.ndarray:
+    """
+    Codifica un arreglo de celdas en int8 en una sola pasada:
+    factoriza los valores (hay muy pocos distintos) y traduce con una tabla.
+    """
+    shape = values.shape
+    flat = values.ravel()
+    if flat.size == 0:
+        return np.zeros(shape, dtype=np.int8)
+    idx, uniques = pd.factorize(flat, use_na_sentinel=True)
+    lut = np.fromiter((status_code(u) for u in uniques), dtype=np.int8, count=len(uniques))
+    lut = np.append(lut, np.int8(NONE))  # idx == -1 (NaN) -> sin dato
+    return lut[idx].reshape(shape)
+
+def count_rates(present, tardy, absent, total) -> Dict[str, np.ndarray]:
+    """
+    present_rate / tardy_rate / absent_rate sobre `total` celdas (las celdas
+    sin dato cuentan en el denominador); 0 donde no hay celdas.
+    """
+    total = np.asarray(total, dtype=np.float64)
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, valor in (("present", present), ("tardy", tardy), ("absent", absent)):
+            out[f"{name}_rate"] = np.where(total > 0, np.asarray(valor, dtype=np.float64) / total, 0.0)
+    return out
+
+def status_rates(counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Tasas a partir de conteos por código (..., N_STATUS)."""
+    counts = np.asarray(counts)
+    return count_rates(counts[..., PRESENT], counts[..., TARDY], counts[..., ABSENT], counts.sum(axis=-1))
+
+def unit_onehot(units: Sequence[Optional[str]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Matriz sesiones × unidades (1 si la sesión pertenece a la unidad) y las
+    etiquetas en orden de aparición. `units[j]` es la unidad de la sesión j;
+    None = sesión ignorada.
+    """
+    etiquetas = [u for u in dict.fromkeys(units) if u is not None]
+    pos = {u: i for i, u in enumerate(etiquetas)}
+    onehot = np.zeros((len(units), len(etiquetas)), dtype=np.float64)
+    for j, u in enumerate(units):
+        if u is not None:
+            onehot[j, pos[u]] = 1.0
+    return etiquetas, onehot
+
+class AttendanceMatrix:
+    """Asistencia de una materia: `codes[alumno, sesión]` en int8."""
+
+    def __init__(self, codes: np.ndarray, students: pd.DataFrame, sessions: List[str]):
+        self.codes = codes
+        self.students = students
+        self.sessions = sessions
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, session_cols: Sequence[str]) -> "AttendanceMatrix":
+        id_cols = [c for c in ("No de control", "Nombre") if c in df.columns]
+        session_cols = list(session_cols)
+        codes = encode_values(df[session_cols].to_numpy(dtype=object))
+        return cls(codes, df[id_cols].reset_index(drop=True), session_cols)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    # --- conteos y tasas ---
+    def counts(self, axis: Optional[int] = None) -> np.ndarray:
+        """Conteo por código (..., N_STATUS): axis=1 por alumno, axis=0 por sesión, None de la materia."""
+        return np.stack([(self.codes == c).sum(axis=axis) for c in range(N_STATUS)], axis=-1)
+
+    def rates(self, axis: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Tasas por alumno (axis=1), por sesión (axis=0) o de la materia (None)."""
+        return status_rates(self.counts(axis))
+
+    # --- puntaje ✓=1, ~=0.5 ---
+    def scores(self) -> np.ndarray:
+        return SCORE[self.codes]
+
+    # --- agrupación por unidad ---
+    def unit_counts(self, units: Sequence[Optional[str]]) -> Tuple[List[str], np.ndarray]:
+        """Etiquetas y conteo por código alumno × unidad × N_STATUS."""
+        etiquetas, onehot = unit_onehot(units)
+        conteos = np.stack(
+            [(self.codes == c).astype(np.float64) @ onehot for c in range(N_STATUS)], axis=-1
+        ).astype(np.int64)
+        return etiquetas, conteos
+
+    def unit_scores(self, units: Sequence[Optional[str]]) -> pd.DataFrame:
+        """Promedio del puntaje por alumno y unidad (0–1)."""
+        etiquetas, onehot = unit_onehot(units)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            prom = (self.scores() @ onehot) / onehot.sum(axis=0)
+        return pd.DataFrame(prom, columns=etiquetas)
@@ -0,0 +1,110 @@
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+# =========================
+# SELLOS DE VERSIÓN PARA LOS CACHÉS
+# =========================
+# En vez de vencer los DataFrames cada N segundos, cada entrada de caché se
+# guarda con la versión de los datos que la produjeron:
+#
+#   versión = <modifiedTime de la hoja en Drive> | <escrituras de la app>
+#
+# - remota: una sola consulta barata a Drive (sin bajar celdas), compartida por
+#   todas las sesiones y hecha como mucho cada `check_interval_s` segundos
+# - local: contador por worksheet que suben nuestros propios escritores en el
+#   momento de escribir (write-through), así que una captura se ve de inmediato
+# Si la versión no cambió, el caché responde sin tocar la red.
+
+class VersionClock:
+    """Versión remota (con consulta espaciada) + contadores locales por worksheet."""
+
+    def __init__(
+        self,
+        fetch_remote: Callable[[], str],
+        check_interval_s: float = 15.0,
+        on_change: Optional[Callable[[bool], None]] = None,
+    ):
+        self.fetch_remote = fetch_remote
+        self.check_interval_s = check_interval_s
+        self.on_change = on_change   # on_change(externo): cambió la versión remota
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._remote = ""
+        self._checked_at = 0.0
+        self._local: Dict[str, int] = {}
+        self._writes_since_check = 0
+        self.checks = 0
+        self.remote_changes = 0
+        self.external_changes = 0
+        self.last_error: Optional[str] = None
+
+    def bump(self, titles: Iterable[str]) -> None:
+        """Nuestro escritor modificó estas worksheets: su versión cambia ya."""
+        with self._lock:
+            for t in titles:
+                self._local[t] = self._local.get(t, 0) + 1
+            self._writes_since_check += 1
+
+    def bump_all(self) -> None:
+        """Cambio estructural (pestañas creadas/reemplazadas): todo cambia de versión."""
+        with self._lock:
+            self._local["*"] = self._local.get("*", 0) + 1
+            self._writes_since_check += 1
+
+    def remote(self) -> str:
+        """Sello remoto; sólo un hilo consulta y los demás usan el último conocido."""
+        if time.monotonic() - self._checked_at < self.check_interval_s:
+            return self._remote
+        if not self._check_lock.acquire(blocking=False):
+            return self._remote
+        try:
+            if time.monotonic() - self._checked_at < self.check_interval_s:
+                return self._remote
+            try:
+                nuevo = str(self.fetch_remote())
+                self.last_error = None
+            except Exception as e:  # sin Drive se sigue con el último sello (y los contadores locales)
+                self.last_error = f"{type(e).__name__}: {e}"
+                nuevo = self._remote
+            self.checks += 1
+            with self._lock:
+                cambio = bool(self._remote) and nuevo != self._remote
+                propias = self._writes_since_check
+                self._writes_since_check = 0
+                self._remote = nuevo
+            self._checked_at = time.monotonic()
+            if cambio:
+                self.remote_changes += 1
+                # Cambió sin escrituras nuestras: seguro alguien editó la hoja a mano
+                # (con escrituras nuestras también puede haberlo hecho; sólo es métrica)
+                externo = not propias
+                self.external_changes += int(externo)
+                if self.on_change:
+                    self.on_change(externo)
+            return nuevo
+        finally:
+            self._check_lock.release()
+
+    def local(self, titles: Optional[List[str]] = None) -> int:
+        """Escrituras de este proceso a unas worksheets (sin consultar Drive)."""
+        with self._lock:
+            if titles is None:
+                return sum(self._local.values())
+            return self._local.get("*", 0) + sum(self._local.get(t, 0) for t in titles)
+
+    def stamp(self, titles: Optional[List[str]] = None) -> str:
+        """Versión de unas worksheets (None = de toda la hoja de cálculo)."""
+        remoto = self.remote()
+        return f"{remoto}|{self.local(titles)}"
+
+    def stats(self) -> Dict:
+        return {
+            "remote": self._remote,
+            "age_s": time.monotonic() - self._checked_at if self._checked_at else None,
+            "checks": self.checks,
+            "remote_changes": self.remote_changes,
+            "external_changes": self.external_changes,
+            "local_writes": sum(self._local.values()),
+            "last_error": self.last_error,
+        }
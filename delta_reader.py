@@ -0,0 +1,301 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from gspread.utils import a1_range_to_grid_range, absolute_range_name, fill_gaps, numericise_all, rowcol_to_a1, to_records
+
+# =========================
+# LECTURA INCREMENTAL DE WORKSHEETS
+# =========================
+# Cada captura agrega una columna a la derecha, así que la hoja crece todo el
+# semestre aunque sólo cambien las últimas columnas. Este lector guarda la
+# cuadrícula conocida de cada worksheet y en cada refresco pide (en un solo
+# batch_get):
+# - la fila de encabezados
+# - las columnas más allá del ancho conocido
+# - las filas más allá del alto conocido (alumnos nuevos)
+# - los rangos marcados como modificados por nuestros propios escritores
+# y los mezcla sobre la cuadrícula en memoria.
+# Una celda existente editada a mano en Google Sheets no entra en ninguno de
+# esos rangos, así que cada `full_resync_s` segundos la worksheet se vuelve a
+# bajar completa (además de cuando cambia la versión remota, ver gsheets_utils).
+
+def col_letter(col: int) -> str:
+    """Índice de columna (base 1) a letras A1: 1 -> A, 28 -> AB."""
+    return rowcol_to_a1(1, col)[:-1]
+
+def grid_to_df(grid: List[List[str]]) -> pd.DataFrame:
+    """Mismo resultado que pd.DataFrame(ws.get_all_records())."""
+    if not grid:
+        return pd.DataFrame()
+    values = fill_gaps(grid)
+    return pd.DataFrame(to_records(values[0], [numericise_all(row) for row in values[1:]]))
+
+class _WorksheetState:
+    def __init__(self, grid: List[List[str]]):
+        self.grid = grid
+        self.dirty: List[str] = []
+        self.df: Optional[pd.DataFrame] = None
+        self.synced_at = time.monotonic()   # última lectura completa
+        self.read_at = 0.0                  # último refresco (completo o delta)
+        self.lock = threading.Lock()
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.grid)
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.grid[0]) if self.grid else 0
+
+    def pad(self) -> None:
+        """Todas las filas del mismo ancho."""
+        n_cols = max((len(r) for r in self.grid), default=0)
+        for row in self.grid:
+            row.extend([""] * (n_cols - len(row)))
+
+    def put(self, top: int, left: int, block: List[List[str]], height: int = 0, width: int = 0) -> None:
+        """
+        Copia un bloque (base 0) a la cuadrícula. `height`/`width` indican el
+        tamaño del rango pedido: lo que la API no regresó (celdas vacías al
+        final) se limpia.
+        """
+        height = max(height, len(block))
+        width = max(width, max((len(r) for r in block), default=0))
+        n_rows = max(self.n_rows, top + height)
+        n_cols = max(self.n_cols, left + width)
+        for row in self.grid:
+            row.extend([""] * (n_cols - len(row)))
+        while len(self.grid) < n_rows:
+            self.grid.append([""] * n_cols)
+        for i in range(height):
+            fila = block[i] if i < len(block) else []
+            for j in range(width):
+                self.grid[top + i][left + j] = fila[j] if j < len(fila) else ""
+
+class DeltaReader:
+    """Cuadrícula en memoria por worksheet, refrescada sólo con lo que cambió."""
+
+    def __init__(
+        self,
+        get_all_values: Callable[[object], List[List[str]]],
+        batch_get: Callable[[object, List[str]], List[List[List[str]]]],
+        full_resync_s: float = 120.0,
+    ):
+        self._get_all_values = get_all_values
+        self._batch_get = batch_get
+        self.full_resync_s = full_resync_s
+        self._states: Dict[str, _WorksheetState] = {}
+        self._lock = threading.Lock()
+        self.last_stats: Dict[str, Dict] = {}
+
+    def mark_dirty(self, worksheet_title: str, range_a1: str) -> None:
+        """Un escritor de la app modificó este rango: se vuelve a pedir en el próximo refresco."""
+        state = self._states.get(worksheet_title)
+        if state is not None:
+            with state.lock:
+                state.dirty.append(range_a1)
+
+    def forget(self, worksheet_title: str) -> None:
+        """La hoja se reemplazó completa: el próximo refresco la baja entera."""
+        with self._lock:
+            self._states.pop(worksheet_title, None)
+
+    def forget_all(self) -> None:
+        """Alguien editó la hoja por fuera: todas se vuelven a bajar completas."""
+        with self._lock:
+            self._states.clear()
+
+    def header(self, worksheet_title: str, max_age_s: float) -> Optional[List[str]]:
+        """
+        Fila de encabezados refrescada hace menos de `max_age_s` y sin escrituras
+        nuestras pendientes de releer; None si no se puede asegurar (hay que pedirla).
+        """
+        state = self._states.get(worksheet_title)
+        if state is None or not state.grid or time.monotonic() - state.read_at > max_age_s:
+            return None
+        with state.lock:
+            if state.dirty:
+                return None
+            fila = list(state.grid[0])
+        while fila and fila[-1] == "":
+            fila.pop()
+        return fila
+
+    def _stale(self, state: _WorksheetState) -> bool:
+        """Pasó el intervalo de resincronización completa."""
+        return time.monotonic() - state.synced_at >= self.full_resync_s
+
+    def _full_load(self, ws, state: _WorksheetState, api_calls: int = 0, mode: str = "full") -> None:
+        state.grid = [list(r) for r in self._get_all_values(ws)]
+        state.pad()
+        state.dirty = []
+        state.synced_at = time.monotonic()
+        self.last_stats[ws.title] = {
+            "mode": mode,
+            "api_calls": api_calls + 1,
+            "cells": sum(len(r) for r in state.grid),
+            "bytes": sum(len(v) for r in state.grid for v in r),
+        }
+
+    def _get_state(self, ws) -> Optional[_WorksheetState]:
+        with self._lock:
+            return self._states.get(ws.title)
+
+    def _new_state(self, ws) -> _WorksheetState:
+        state = _WorksheetState([])
+        with self._lock:
+            self._states[ws.title] = state
+        return state
+
+    def read_df(self, ws) -> pd.DataFrame:
+        state = self._get_state(ws)
+        if state is None:
+            state = self._new_state(ws)
+            with state.lock:
+                self._full_load(ws, state)
+                state.df = grid_to_df(state.grid)
+                state.read_at = time.monotonic()
+                return state.df.copy()
+
+        with state.lock:
+            if self._stale(state):
+                self._full_load(ws, state, mode="full (resync)")
+                state.df = grid_to_df(state.grid)
+                state.read_at = time.monotonic()
+                return state.df.copy()
+            plan = self._plan(ws, state)
+            try:
+                results = self._batch_get(ws, plan["ranges"])
+            except Exception:
+                state.dirty = plan["dirty"] + state.dirty
+                raise
+            changed = self._apply(ws, state, plan, results)
+            if changed or state.df is None:
+                state.df = grid_to_df(state.grid)
+            state.read_at = time.monotonic()
+            return state.df.copy()
+
+    def read_many(
+        self,
+        wss: List,
+        values_batch_get: Callable[[List[str]], List[List[List[str]]]],
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Refresca varias worksheets con UN solo values_batch_get a nivel spreadsheet:
+        las desconocidas se piden completas y las conocidas sólo con sus rangos delta.
+        """
+        planes = []
+        rangos: List[str] = []
+        # Orden fijo al tomar los candados para no bloquearse con otra lectura en lote
+        for ws in sorted(wss, key=lambda w: w.title):
+            state = self._get_state(ws) or self._new_state(ws)
+            state.lock.acquire()
+            if state.grid and not self._stale(state):
+                plan = self._plan(ws, state)
+            else:
+                plan = {"full": True, "ranges": [""], "dirty": []}
+            plan["offset"] = len(rangos)
+            rangos.extend(absolute_range_name(ws.title, r or None) for r in plan["ranges"])
+            planes.append((ws, state, plan))
+
+        try:
+            try:
+                results = values_batch_get(rangos)
+            except Exception:
+                for _, state, plan in planes:
+                    state.dirty = plan["dirty"] + state.dirty
+                raise
+
+            out = {}
+            for ws, state, plan in planes:
+                bloque = results[plan["offset"]:plan["offset"] + len(plan["ranges"])]
+                if plan.get("full"):
+                    state.grid = [list(r) for r in bloque[0]]
+                    state.pad()
+                    state.dirty = []
+                    state.synced_at = time.monotonic()
+                    self.last_stats[ws.title] = {
+                        "mode": "full (lote)",
+                        "api_calls": 0,
+                        "cells": sum(len(r) for r in state.grid),
+                        "bytes": sum(len(v) for r in state.grid for v in r),
+                    }
+                    changed = True
+                else:
+                    changed = self._apply(ws, state, plan, bloque)
+                    self.last_stats[ws.title]["mode"] = "delta (lote)"
+                if changed or state.df is None:
+                    state.df = grid_to_df(state.grid)
+                state.read_at = time.monotonic()
+                out[ws.title] = state.df.copy()
+            return out
+        finally:
+            for _, state, _ in planes:
+                state.lock.release()
+
+    def _plan(self, ws, state: _WorksheetState) -> Dict:
+        """Rangos a pedir para ponerse al día con una worksheet ya conocida."""
+        width, height = state.n_cols, state.n_rows
+        ranges = ["1:1"]
+
+        # columnas nuevas (con su encabezado) hasta donde llega la cuadrícula conocida
+        grid_cols = max(ws.col_count, width)
+        if grid_cols > width:
+            ranges.append(f"{col_letter(width + 1)}1:{col_letter(grid_cols)}")
+        # alumnos nuevos en las columnas conocidas
+        if width:
+            ranges.append(f"A{height + 1}:{col_letter(width)}")
+        dirty, state.dirty = state.dirty, []
+        ranges.extend(dirty)
+        return {"ranges": ranges, "dirty": dirty, "width": width, "height": height, "grid_cols": grid_cols}
+
+    def _apply(self, ws, state: _WorksheetState, plan: Dict, results: List[List[List[str]]]) -> bool:
+        """Mezcla los bloques pedidos en la cuadrícula; regresa True si algo cambió."""
+        width, height, grid_cols, dirty = plan["width"], plan["height"], plan["grid_cols"], plan["dirty"]
+        api_calls = 1
+        fetched = list(results)
+
+        header = fetched[0][0] if fetched[0] else []
+        known = state.grid[0][:width] if state.grid else []
+        if header[:width] != known[:len(header)]:
+            # Encabezados existentes cambiaron (columna borrada/renombrada): recarga completa
+            self._full_load(ws, state, api_calls)
+            return True
+
+        i = 1
+        if grid_cols > width:
+            state.put(0, width, fetched[i], width=grid_cols - width)
+            i += 1
+        if width:
+            state.put(height, 0, fetched[i])
+            i += 1
+        for rango, block in zip(dirty, fetched[i:]):
+            g = a1_range_to_grid_range(rango)
+            top, left = g.get("startRowIndex", 0), g.get("startColumnIndex", 0)
+            state.put(
+                top, left, block,
+                height=g.get("endRowIndex", top + len(block)) - top,
+                width=g.get("endColumnIndex", left + 1) - left,
+            )
+
+        # La cuadrícula creció en otro proceso más allá de lo que conocíamos
+        if len(header) > grid_cols:
+            extra = self._batch_get(ws, [f"{col_letter(grid_cols + 1)}1:{col_letter(len(header))}"])
+            api_calls += 1
+            state.put(0, grid_cols, extra[0])
+            fetched.append(extra[0])
+
+        # Se recortan columnas vacías al final (la API no las regresa)
+        n_cols = max(len(header), 1)
+        for row in state.grid:
+            del row[n_cols:]
+
+        celdas = sum(len(r) for block in fetched for r in block)
+        self.last_stats[ws.title] = {
+            "mode": "delta",
+            "api_calls": api_calls,
+            "cells": celdas,
+            "bytes": sum(len(str(v)) for block in fetched for r in block for v in r),
+        }
+        return celdas > len(header) or n_cols != width or bool(dirty)
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+import pandas as pd
+
+# =========================
+# CACHÉ DE DATAFRAMES CON LÍMITE DE MEMORIA (LRU)
+# =========================
+# Un solo caché por proceso para todas las sesiones:
+# - presupuesto en bytes medido con DataFrame.memory_usage(deep=True)
+# - al pasarse, se sacan las entradas usadas hace más tiempo
+# - cada grupo (p. ej. ("ws", hoja, materia)) guarda sólo su versión más
+#   reciente: una versión nueva reemplaza a la anterior en lugar de acumularse
+# Las combinaciones de materias (comparativo) se arman con los DataFrames por
+# materia que ya están aquí, en vez de guardar cada combinación.
+
+def frame_nbytes(value) -> int:
+    """Bytes en memoria de un DataFrame / Series (o tupla / dict de ellos)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, (tuple, list)):
+        return sum(frame_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(frame_nbytes(v) for v in value.values())
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage())
+    return 0
+
+class FrameCache:
+    """LRU por bytes; las llaves son (grupo, versión)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, object, int]]" = OrderedDict()  # grupo -> (versión, valor, bytes)
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.replaced = 0
+        self.rejected = 0
+
+    def get(self, group: Hashable, version: Hashable):
+        with self._lock:
+            entry = self._entries.get(group)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(group)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, group: Hashable) -> Optional[Tuple[Hashable, object]]:
+        """(versión, valor) del grupo sin contar acierto/fallo ni moverlo en la LRU."""
+        with self._lock:
+            entry = self._entries.get(group)
+            return None if entry is None else (entry[0], entry[1])
+
+    def discard(self, group: Hashable) -> None:
+        with self._lock:
+            if group in self._entries:
+                self._drop(group)
+
+    def _drop(self, group: Hashable) -> None:
+        _, _, nbytes = self._entries.pop(group)
+        self.resident_bytes -= nbytes
+
+    def put(self, group: Hashable, version: Hashable, value, nbytes: Optional[int] = None) -> bool:
+        """Guarda el valor; regresa False si por sí solo no cabe en el presupuesto."""
+        nbytes = frame_nbytes(value) if nbytes is None else nbytes
+        with self._lock:
+            if group in self._entries:
+                self._drop(group)
+                self.replaced += 1
+            if nbytes > self.max_bytes:
+                self.rejected += 1
+                return False
+            while self._entries and self.resident_bytes + nbytes > self.max_bytes:
+                viejo = next(iter(self._entries))
+                self._drop(viejo)
+                self.evictions += 1
+            self._entries[group] = (version, value, nbytes)
+            self.resident_bytes += nbytes
+            return True
+
+    def get_or_load(self, group: Hashable, version: Hashable, loader: Callable[[], object]):
+        value = self.get(group, version)
+        if value is None:
+            value = loader()
+            self.put(group, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            por_tipo: Dict[str, Dict[str, int]] = {}
+            for group, (_, _, nbytes) in self._entries.items():
+                tipo = group[0] if isinstance(group, tuple) and group else str(group)
+                t = por_tipo.setdefault(tipo, {"entries": 0, "bytes": 0})
+                t["entries"] += 1
+                t["bytes"] += nbytes
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "replaced": self.replaced,
+                "rejected": self.rejected,
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "by_kind": por_tipo,
+            }
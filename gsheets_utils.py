@@ -1,45 +1,1163 @@
 import time
+import datetime
 import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
 import streamlit as st
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.utils import absolute_range_name, rowcol_to_a1
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
 import pandas as pd
+import sqlite3
+import requests
+import google.auth.exceptions
+from write_journal import WriteJournal, is_transient
+from cache_version import VersionClock
+from single_flight import SingleFlight
+from frame_cache import FrameCache
+from snapshot_store import SnapshotStore
+from prefetch import Prefetcher
+import summary_sheet
+from delta_reader import DeltaReader, col_letter
+from rate_limiter import RateLimitExceeded, SheetsScheduler, current_lane, lane
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+SHEET_NAME = st.secrets.get("SHEET_NAME", "Seguimiento_Asistencia_2025_2")
+
+# Se renueva el token cuando le quedan menos de estos segundos de vida
+TOKEN_REFRESH_MARGIN_S = 300
+
+# --- Planificador global de peticiones (cuotas por minuto de Sheets) ---
+#   [rate_limit]
+#   reads_per_minute = 60
+#   writes_per_minute = 60
+@st.cache_resource
+def get_scheduler() -> SheetsScheduler:
+    cfg = st.secrets.get("rate_limit", {})
+    return SheetsScheduler(
+        reads_per_minute=cfg.get("reads_per_minute", 60),
+        writes_per_minute=cfg.get("writes_per_minute", 60),
+    )
 
 # --- Retry con backoff exponencial para manejar errores 429 ---
-def with_backoff(max_retries=5, base=0.7):
+# Con `kind` ("read"/"write") cada intento pide antes un token al planificador,
+# y un 429 vacía la cubeta para que las demás sesiones también esperen.
+def with_backoff(max_retries=5, base=0.7, kind=None):
     def deco(fn):
         @functools.wraps(fn)
         def wrapper(*args, **kwargs):
-            for i in range(max_retries):
+            for i in range(max_retries + 1):
+                if kind:
+                    get_scheduler().acquire(kind)
                 try:
                     return fn(*args, **kwargs)
                 except gspread.exceptions.APIError as e:
-                    if "429" not in str(e):
+                    if "429" not in str(e) or i == max_retries:
                         raise
+                    if kind:
+                        get_scheduler().penalize(kind)
                     sleep_s = base * (2 ** i)
                     time.sleep(sleep_s)
-            return fn(*args, **kwargs)
         return wrapper
     return deco
 
+# --- Credenciales compartidas por todas las sesiones ---
+_token_lock = threading.Lock()
+
+@st.cache_resource
+def _get_credentials() -> Credentials:
+    return Credentials.from_service_account_info(st.secrets["service_account"], scopes=SCOPES)
+
+def _ensure_fresh_token(creds: Credentials) -> None:
+    """Renueva el token antes de que expire (no espera a un 401)."""
+    def needs_refresh():
+        if not creds.token or creds.expiry is None:
+            return True
+        # google-auth guarda expiry como UTC sin tzinfo
+        expira = creds.expiry.replace(tzinfo=datetime.timezone.utc)
+        restante = expira - datetime.datetime.now(datetime.timezone.utc)
+        return restante.total_seconds() < TOKEN_REFRESH_MARGIN_S
+
+    if needs_refresh():
+        with _token_lock:
+            if needs_refresh():
+                creds.refresh(Request())
+
 # --- Cachear cliente ---
 @st.cache_resource
+def _build_gs_client():
+    return gspread.authorize(_get_credentials())
+
 def get_gs_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["service_account"], scope)
-    return gspread.authorize(creds)
+    client = _build_gs_client()
+    _ensure_fresh_token(_get_credentials())
+    return client
 
-# --- Cachear Spreadsheet ---
+# --- ID de la hoja de cálculo ---
 @st.cache_resource
-def get_sheet(spreadsheet_name: str):
-    client = get_gs_client()
-    return client.open(spreadsheet_name)
+def get_spreadsheet_id(spreadsheet_name: str = SHEET_NAME) -> str:
+    """
+    Acepta [general].spreadsheet_id o spreadsheet_id en la raíz de secrets.
+    Si no existe, se busca la hoja por nombre UNA sola vez por proceso.
+    """
+    if "general" in st.secrets and "spreadsheet_id" in st.secrets["general"]:
+        return st.secrets["general"]["spreadsheet_id"]
+    if "spreadsheet_id" in st.secrets:
+        return st.secrets["spreadsheet_id"]
+    return with_backoff(kind="read")(get_gs_client().open)(spreadsheet_name).id
+
+# --- Cachear Spreadsheet (una sola instancia por ID) ---
+@st.cache_resource
+@with_backoff(kind="read")
+def _open_by_key(spreadsheet_id: str):
+    return get_gs_client().open_by_key(spreadsheet_id)
+
+def get_sheet(spreadsheet_name: str = SHEET_NAME):
+    sh = _open_by_key(get_spreadsheet_id(spreadsheet_name))
+    get_gs_client()  # mantiene el token vigente
+    return sh
+
+# --- Cachear lista de worksheets ---
+@st.cache_resource
+@with_backoff(kind="read")
+def _worksheets_by_title(spreadsheet_id: str) -> Dict[str, gspread.Worksheet]:
+    sh = _open_by_key(spreadsheet_id)
+    return {ws.title: ws for ws in sh.worksheets()}
+
+def get_worksheet(worksheet_title: str, spreadsheet_name: str = SHEET_NAME) -> gspread.Worksheet:
+    """Worksheet por título sin pedir metadatos en cada rerun."""
+    spreadsheet_id = get_spreadsheet_id(spreadsheet_name)
+    get_gs_client()
+    por_titulo = _worksheets_by_title(spreadsheet_id)
+    if worksheet_title not in por_titulo:
+        # Pudo haberse creado desde otra sesión: recargamos la lista una vez
+        invalidate_worksheets()
+        por_titulo = _worksheets_by_title(spreadsheet_id)
+    if worksheet_title not in por_titulo:
+        raise gspread.exceptions.WorksheetNotFound(worksheet_title)
+    return por_titulo[worksheet_title]
+
+def invalidate_worksheets() -> None:
+    """Olvida la lista de worksheets (p. ej. después de crear una pestaña)."""
+    _worksheets_by_title.clear()
+
+# --- Helpers de gspread con backoff ---
+@with_backoff(kind="read")
+def _last_update_time(sh) -> str:
+    return sh.get_lastUpdateTime()
+
+@with_backoff(kind="read")
+def _row_values(ws, row: int) -> List[str]:
+    return ws.row_values(row)
+
+@with_backoff(kind="read")
+def _get_all_values(ws) -> List[List[str]]:
+    return ws.get_all_values()
+
+@with_backoff(kind="read")
+def _batch_get(ws, ranges: List[str]) -> List[List[List[str]]]:
+    return ws.batch_get(ranges)
+
+@with_backoff(kind="read")
+def _values_batch_get(sh, ranges: List[str]) -> List[List[List[str]]]:
+    resp = sh.values_batch_get(ranges)
+    return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+
+@with_backoff(kind="write")
+def _add_cols(ws, cols: int) -> None:
+    ws.add_cols(cols)
+
+@with_backoff(kind="write")
+def _add_rows(ws, rows: int) -> None:
+    ws.add_rows(rows)
+
+@with_backoff(kind="write")
+def _update_range(ws, range_name: str, values: List[List[str]]):
+    return ws.update(range_name=range_name, values=values)
+
+@with_backoff(kind="write")
+def _batch_update(ws, data: List[Dict]):
+    return ws.batch_update(data)
+
+@with_backoff(kind="write")
+def _clear(ws) -> None:
+    ws.clear()
+
+@with_backoff(kind="write")
+def _add_worksheet(sh, title: str, rows: int, cols: int) -> gspread.Worksheet:
+    return sh.add_worksheet(title=title, rows=rows, cols=cols)
+
+@with_backoff(kind="write")
+def _append_rows(ws, rows: List[List[str]]):
+    return ws.append_rows(rows, value_input_option="RAW", insert_data_option="INSERT_ROWS")
+
+@with_backoff(kind="write")
+def _spreadsheet_batch_update(sh, requests: List[Dict]):
+    return sh.batch_update({"requests": requests})
+
+@with_backoff(kind="write")
+def _values_batch_update(sh, data: List[Dict]):
+    return sh.values_batch_update({"valueInputOption": "RAW", "data": data})
+
+# =========================
+# BACKENDS DE ALMACENAMIENTO
+# =========================
+# Todas las páginas leen/escriben a través de las funciones públicas de este
+# módulo; éstas delegan en el backend elegido en secrets:
+#
+#   [storage]
+#   backend = "sheets"              # o "sqlite"
+#   sqlite_path = "data/asistencia.db"
+
+# Segundos en que la fila de encabezados recién leída se reutiliza al escribir
+HEADER_REUSE_S = 5.0
+
+class SheetsBackend:
+    """Backend original: Google Sheets vía gspread."""
+
+    name = "sheets"
+
+    def __init__(self, spreadsheet_name: str = SHEET_NAME):
+        self.spreadsheet_name = spreadsheet_name
+        # Sólo baja encabezados, columnas/filas nuevas y rangos que escribimos
+        # (y la hoja completa cada [cache] full_resync_s segundos)
+        cfg = st.secrets.get("cache", {})
+        self.delta = DeltaReader(
+            _get_all_values, _batch_get, full_resync_s=float(cfg.get("full_resync_s", 120)),
+        )
+
+    def _ws(self, worksheet_title: str) -> gspread.Worksheet:
+        return get_worksheet(worksheet_title, self.spreadsheet_name)
+
+    def list_worksheets(self) -> List[str]:
+        return list(_worksheets_by_title(get_spreadsheet_id(self.spreadsheet_name)).keys())
+
+    def read_df(self, worksheet_title: str) -> pd.DataFrame:
+        return self.delta.read_df(self._ws(worksheet_title))
+
+    def read_many(self, worksheet_titles: List[str]) -> Dict[str, pd.DataFrame]:
+        """Varias worksheets en UN solo values_batch_get."""
+        sh = get_sheet(self.spreadsheet_name)
+        wss = [self._ws(t) for t in worksheet_titles]
+        return self.delta.read_many(wss, lambda ranges: _values_batch_get(sh, ranges))
+
+    def get_all_values(self, worksheet_title: str) -> List[List[str]]:
+        return _get_all_values(self._ws(worksheet_title))
+
+    def read_header(self, worksheet_title: str) -> List[str]:
+        return _row_values(self._ws(worksheet_title), 1)
+
+    def write_column(self, worksheet_title: str, header: str, values: List[str]) -> Dict:
+        """Encabezado + columna completa con UN solo update de rango."""
+        ws = self._ws(worksheet_title)
+        api_calls = 0
+
+        # La lectura previa a la escritura (ver _read_before_write) acaba de traer la fila 1
+        headers = self.delta.header(worksheet_title, max_age_s=HEADER_REUSE_S)
+        if headers is None:
+            headers = _row_values(ws, 1)
+            api_calls += 1
+        if header in headers:
+            col_idx = headers.index(header) + 1
+        else:
+            col_idx = len(headers) + 1
+
+        # La hoja debe tener columnas suficientes antes de escribir el rango
+        if col_idx > ws.col_count:
+            _add_cols(ws, col_idx - ws.col_count)
+            api_calls += 1
+
+        rango = f"{rowcol_to_a1(1, col_idx)}:{rowcol_to_a1(len(values) + 1, col_idx)}"
+        _update_range(ws, rango, [[header]] + [[v] for v in values])
+        api_calls += 1
+        self.delta.mark_dirty(worksheet_title, rango)
+        return {"col_idx": col_idx, "range": rango, "api_calls": api_calls}
+
+    def update_cells(self, worksheet_title: str, cells: Dict[Tuple[int, int], str]) -> Dict:
+        """Celdas sueltas en UN solo batch_update."""
+        data = [
+            {"range": rowcol_to_a1(row, col), "values": [[value]]}
+            for (row, col), value in sorted(cells.items())
+        ]
+        api_calls = 0
+        if data:
+            ws = self._ws(worksheet_title)
+            # La hoja debe tener filas/columnas suficientes (p. ej. alumnos nuevos al final)
+            max_row = max(row for row, _ in cells)
+            max_col = max(col for _, col in cells)
+            if max_row > ws.row_count:
+                _add_rows(ws, max_row - ws.row_count)
+                api_calls += 1
+            if max_col > ws.col_count:
+                _add_cols(ws, max_col - ws.col_count)
+                api_calls += 1
+            _batch_update(ws, data)
+            api_calls += 1
+            for d in data:
+                self.delta.mark_dirty(worksheet_title, d["range"])
+        return {"cells": len(data), "api_calls": api_calls}
+
+    def modified_stamp(self) -> str:
+        """modifiedTime de la hoja en Drive (metadatos, sin bajar celdas)."""
+        return _last_update_time(get_sheet(self.spreadsheet_name))
+
+    def read_rows(self, worksheet_title: str, start_row: int, n_cols: int) -> List[List[str]]:
+        """Filas desde `start_row` (base 1) hasta el final, en las primeras `n_cols` columnas."""
+        return _batch_get(self._ws(worksheet_title), [f"A{start_row}:{col_letter(n_cols)}"])[0]
+
+    def append_rows(self, worksheet_title: str, rows: List[List[str]]) -> Dict:
+        """Filas nuevas al final con UN solo append (la hoja crece sola)."""
+        if rows:
+            _append_rows(self._ws(worksheet_title), rows)
+            # La hoja creció: la cuadrícula en memoria se vuelve a bajar completa
+            self.delta.forget(worksheet_title)
+        return {"rows": len(rows), "api_calls": 1 if rows else 0}
+
+    def delete_rows(self, worksheet_title: str, rows: List[int]) -> Dict:
+        """Borra filas completas (base 1) en UN solo spreadsheets.batchUpdate."""
+        rows = sorted(set(rows), reverse=True)  # de abajo hacia arriba
+        if not rows:
+            return {"rows": 0, "api_calls": 0}
+        ws = self._ws(worksheet_title)
+        _spreadsheet_batch_update(get_sheet(self.spreadsheet_name), [
+            {"deleteDimension": {"range": {
+                "sheetId": ws.id, "dimension": "ROWS", "startIndex": r - 1, "endIndex": r,
+            }}}
+            for r in rows
+        ])
+        # Cambió la estructura: la cuadrícula en memoria y el tamaño de la hoja ya no sirven
+        self.delta.forget(worksheet_title)
+        invalidate_worksheets()
+        return {"rows": len(rows), "api_calls": 1}
+
+    def replace_worksheet(self, worksheet_title: str, values: List[List[str]]) -> None:
+        """Crea la pestaña (o la limpia si ya existe) y escribe encabezados + datos."""
+        sh = get_sheet(self.spreadsheet_name)
+        try:
+            ws = self._ws(worksheet_title)
+            _clear(ws)
+        except gspread.exceptions.WorksheetNotFound:
+            rows = max(len(values) + 5, 100)
+            cols = max(len(values[0]) + 5 if values else 0, 20)
+            ws = _add_worksheet(sh, worksheet_title, rows, cols)
+            invalidate_worksheets()
+        _update_range(ws, "A1", values)
+        self.delta.forget(worksheet_title)
+
+    def hide_worksheet(self, worksheet_title: str) -> Dict:
+        """Oculta la pestaña en la interfaz de Sheets (las lecturas por API no cambian)."""
+        _spreadsheet_batch_update(get_sheet(self.spreadsheet_name), [
+            {"updateSheetProperties": {
+                "properties": {"sheetId": self._ws(worksheet_title).id, "hidden": True},
+                "fields": "hidden",
+            }}
+        ])
+        return {"api_calls": 1}
+
+    def replace_worksheets(self, sheets: Dict[str, List[List[str]]]) -> Dict:
+        """
+        Varias pestañas con DOS llamadas: un spreadsheets.batchUpdate (crea las
+        nuevas y limpia las existentes) y un values.batchUpdate con todos los datos.
+        """
+        if not sheets:
+            return {"created": 0, "replaced": 0, "api_calls": 0}
+        sh = get_sheet(self.spreadsheet_name)
+        # Lista fresca: un addSheet de un título que ya existe tumbaría todo el lote
+        invalidate_worksheets()
+        existentes = _worksheets_by_title(get_spreadsheet_id(self.spreadsheet_name))
+        requests = []
+        for title, values in sheets.items():
+            if title in existentes:
+                requests.append({"updateCells": {
+                    "range": {"sheetId": existentes[title].id},
+                    "fields": "userEnteredValue",
+                }})
+            else:
+                requests.append({"addSheet": {"properties": {
+                    "title": title,
+                    "gridProperties": {
+                        "rowCount": max(len(values) + 5, 100),
+                        "columnCount": max(len(values[0]) + 5 if values else 0, 20),
+                    },
+                }}})
+        _spreadsheet_batch_update(sh, requests)
+        _values_batch_update(sh, [
+            {"range": absolute_range_name(title, "A1"), "values": values}
+            for title, values in sheets.items() if values
+        ])
+        invalidate_worksheets()
+        for title in sheets:
+            self.delta.forget(title)
+        creadas = sum(1 for t in sheets if t not in existentes)
+        return {"created": creadas, "replaced": len(sheets) - creadas, "api_calls": 2}
+
+@st.cache_resource
+def get_backend(spreadsheet_name: str = SHEET_NAME):
+    """
+    Backend de almacenamiento configurado en secrets (Sheets por defecto).
+    Con layout = "log" la asistencia se guarda como bitácora (ver attendance_log.py);
+    en formato ancho, con shard_by, las materias grandes se reparten en shards (ver sheet_shards.py).
+    """
+    cfg = st.secrets.get("storage", {})
+    backend = str(cfg.get("backend", "sheets")).lower()
+    if backend == "sqlite":
+        from sqlite_backend import SQLiteBackend
+        base = SQLiteBackend(cfg.get("sqlite_path", "data/asistencia.db"))
+    elif backend == "sheets":
+        base = SheetsBackend(spreadsheet_name)
+    else:
+        raise ValueError(f'Backend de almacenamiento desconocido: "{backend}" (usa "sheets" o "sqlite")')
+
+    layout = str(cfg.get("layout", "wide")).lower()
+    if layout == "log":
+        from attendance_log import LogLayout
+        return LogLayout(base)
+    if layout != "wide":
+        raise ValueError(f'Formato de almacenamiento desconocido: "{layout}" (usa "wide" o "log")')
+    # Formato ancho: sólo si se pide, las materias muy grandes se reparten en
+    # pestañas por mes/unidad (el router agrega lecturas de encabezados a cada escritura)
+    shard_by = str(cfg.get("shard_by", "off")).lower()
+    if shard_by == "off":
+        return base
+    from sheet_shards import ShardRouter
+    return ShardRouter(base, by=shard_by, max_columns=int(cfg.get("shard_max_columns", 200)))
+
+def _storage(backend):
+    """Backend real debajo de los formatos (bitácora / shards)."""
+    return getattr(backend, "base", backend)
+
+# =========================
+# VERSIONES DE LOS DATOS (ver cache_version.py)
+# =========================
+# Los cachés de DataFrames usan la versión como llave en lugar de un TTL.
+#   [cache]
+#   version_check_s = 15          # cada cuánto se consulta modifiedTime en Drive
+
+@st.cache_resource
+def get_version_clock(spreadsheet_name: str = SHEET_NAME) -> VersionClock:
+    base = _storage(get_backend(spreadsheet_name))
+
+    def al_cambiar(externo: bool) -> None:
+        # Pestañas nuevas o redimensionadas en otro proceso
+        invalidate_worksheets()
+        # Una edición a mano puede tocar celdas que la lectura incremental no vuelve a pedir.
+        # modifiedTime no dice cuántas ediciones hubo, así que aunque en la misma ventana
+        # hayamos escrito nosotros (externo=False) no se puede descartar una edición a mano:
+        # con cualquier cambio remoto la siguiente lectura de cada worksheet es completa.
+        delta = getattr(base, "delta", None)
+        if delta is not None:
+            delta.forget_all()
+
+    cfg = st.secrets.get("cache", {})
+    return VersionClock(
+        getattr(base, "modified_stamp", lambda: ""),
+        check_interval_s=float(cfg.get("version_check_s", 15)),
+        on_change=al_cambiar,
+    )
+
+def data_version(worksheet_titles: Optional[List[str]] = None, spreadsheet_name: str = SHEET_NAME) -> str:
+    """Sello de versión de unas worksheets (None = toda la hoja de cálculo)."""
+    return get_version_clock(spreadsheet_name).stamp(
+        None if worksheet_titles is None else list(worksheet_titles)
+    )
+
+def version_stats(spreadsheet_name: str = SHEET_NAME) -> Dict:
+    return get_version_clock(spreadsheet_name).stats()
+
+# --- Lecturas coalescidas (ver single_flight.py) ---
+# Lecturas simultáneas de la misma (hoja, worksheet, versión) comparten UNA descarga.
+@st.cache_resource
+def get_flights() -> SingleFlight:
+    return SingleFlight()
+
+def flight_stats() -> Dict:
+    """Por llave: llamadas, descargas reales y llamadas que se ahorraron."""
+    flights = get_flights()
+    return {"in_flight": flights.in_flight(), "keys": flights.stats()}
+
+# =========================
+# API PÚBLICA
+# =========================
+
+def _fetch_titles(spreadsheet_name: str) -> List[str]:
+    titles = [t for t in get_backend(spreadsheet_name).list_worksheets() if not t.startswith("_")]
+    if _SNAPSHOT_TITLES.get(spreadsheet_name) != titles:
+        get_snapshot_store().save_titles(spreadsheet_name, titles)
+    _SNAPSHOT_TITLES[spreadsheet_name] = titles
+    return titles
+
+def _refresh_titles(spreadsheet_name: str) -> None:
+    try:
+        with lane("dashboard"):
+            _fetch_titles(spreadsheet_name)
+    except Exception as e:
+        _SNAPSHOT_STATS["last_error"] = f"{type(e).__name__}: {e}"
+        _SNAPSHOT_TITLES.pop(spreadsheet_name, None)
+
+def list_worksheets(spreadsheet_name: str = SHEET_NAME) -> List[str]:
+    """Títulos de las worksheets (cada una es una materia; las que empiezan con "_" son internas)."""
+    # En frío (fuera de la captura) la lista sale del snapshot y se refresca en segundo plano
+    if spreadsheet_name not in _SNAPSHOT_TITLES and current_lane() != "capture":
+        with _snapshot_lock:
+            if spreadsheet_name not in _SNAPSHOT_TITLES:
+                titles = get_snapshot_store().load_titles(spreadsheet_name)
+                if titles is not None:
+                    _SNAPSHOT_TITLES[spreadsheet_name] = titles
+                    threading.Thread(target=_refresh_titles, args=(spreadsheet_name,), daemon=True).start()
+                    return list(titles)
+    return _fetch_titles(spreadsheet_name)
+
+# --- Caché de DataFrames con límite de memoria (ver frame_cache.py) ---
+#   [cache]
+#   max_mb = 256
+@st.cache_resource
+def get_frame_cache() -> FrameCache:
+    cfg = st.secrets.get("cache", {})
+    return FrameCache(int(float(cfg.get("max_mb", 256)) * 1024 * 1024))
+
+def cache_stats() -> Dict:
+    """Aciertos, fallos, desalojos y bytes residentes del caché de DataFrames."""
+    return get_frame_cache().stats()
+
+def cached_read(group: Tuple, version: str, load):
+    """
+    Valor en caché para (grupo, versión); si falta, UNA sola lectura (aunque
+    lo pidan varias sesiones a la vez) y se guarda. Regresa el objeto compartido.
+    """
+    cache = get_frame_cache()
+    value = cache.get(group, version)
+    if value is not None:
+        return value
+
+    def leer():
+        v = load()
+        cache.put(group, version, v)
+        return v
+
+    return get_flights().do(group + (version,), leer)
+
+# --- Snapshots en disco para arrancar en frío (ver snapshot_store.py) ---
+#   [cache]
+#   snapshot_dir = "data/snapshots"
+# Entrada servida desde disco y aún sin revalidar: versión (SNAPSHOT_PENDING, versión del snapshot)
+SNAPSHOT_PENDING = "snapshot"
+
+_snapshot_lock = threading.Lock()
+_SNAPSHOT_TITLES: Dict[str, List[str]] = {}   # última lista de worksheets conocida por hoja
+_SNAPSHOT_STATS = {"served": 0, "adopted": 0, "refreshed": 0, "last_error": None}
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    cfg = st.secrets.get("cache", {})
+    return SnapshotStore(cfg.get("snapshot_dir", "data/snapshots"))
+
+def snapshot_stats() -> Dict:
+    out = get_snapshot_store().stats()
+    out.update(_SNAPSHOT_STATS)
+    out["last_error"] = _SNAPSHOT_STATS["last_error"] or out["last_error"]
+    return out
+
+def _snapshot_current(snap, version: str) -> bool:
+    """
+    ¿El snapshot corresponde a la versión vigente? De esta corrida se compara
+    la versión completa (una escritura nuestra sube el contador local aunque el
+    modifiedTime conocido no haya cambiado). De otra corrida sus contadores no
+    significan nada aquí: sólo vale si el modifiedTime coincide y este proceso
+    aún no escribió la worksheet.
+    """
+    remoto, local = version.split("|", 1)
+    if not snap.remote or snap.remote != remoto:
+        return False
+    if snap.run == get_snapshot_store().run:
+        return snap.version == version
+    return local == "0"
+
+def _load_and_snapshot(spreadsheet_name: str, worksheet_title: str, version: str) -> pd.DataFrame:
+    """Lectura fresca del backend; deja su snapshot en disco con su versión."""
+    df = get_backend(spreadsheet_name).read_df(worksheet_title)
+    get_snapshot_store().save(spreadsheet_name, worksheet_title, df, version)
+    return df
+
+def _revalidate_snapshot(spreadsheet_name: str, worksheet_title: str, snap) -> None:
+    """Hilo: si la hoja no cambió desde el snapshot se adopta; si cambió, se relee."""
+    group = ("ws", spreadsheet_name, worksheet_title)
+    cache = get_frame_cache()
+    try:
+        with lane("dashboard"):
+            version = data_version([worksheet_title], spreadsheet_name)
+            if _snapshot_current(snap, version):
+                cache.put(group, version, snap.df)
+                _SNAPSHOT_STATS["adopted"] += 1
+            else:
+                cache.put(group, version, _load_and_snapshot(spreadsheet_name, worksheet_title, version))
+                _SNAPSHOT_STATS["refreshed"] += 1
+    except Exception as e:
+        # La siguiente lectura toma el camino normal
+        cache.discard(group)
+        _SNAPSHOT_STATS["last_error"] = f"{type(e).__name__}: {e}"
+
+def _serve_snapshot(spreadsheet_name: str, worksheet_title: str) -> Optional[Tuple[pd.DataFrame, str]]:
+    """
+    Sólo para los tableros (carril "dashboard"); la captura y la reconstrucción
+    del resumen necesitan la hoja vigente. En frío el DataFrame sale del
+    snapshot en disco sin esperar autorización ni descarga, y un hilo lo
+    revalida. Mientras tanto se sirve el mismo snapshot. Si este proceso ya
+    escribió la worksheet, el snapshot puede ser de antes: lectura normal.
+    Regresa (DataFrame, "snapshot|<versión del snapshot>").
+    """
+    if current_lane() != "dashboard":
+        return None
+    if get_version_clock(spreadsheet_name).local([worksheet_title]):
+        return None
+    group = ("ws", spreadsheet_name, worksheet_title)
+    cache = get_frame_cache()
+    with _snapshot_lock:
+        entrada = cache.peek(group)
+        if entrada is not None:
+            pendiente = isinstance(entrada[0], tuple) and entrada[0][0] == SNAPSHOT_PENDING
+            return (entrada[1], "|".join(entrada[0])) if pendiente else None
+        snap = get_snapshot_store().load(spreadsheet_name, worksheet_title)
+        if snap is None:
+            return None
+        cache.put(group, (SNAPSHOT_PENDING, snap.version), snap.df)
+    _SNAPSHOT_STATS["served"] += 1
+    threading.Thread(
+        target=_revalidate_snapshot, args=(spreadsheet_name, worksheet_title, snap), daemon=True,
+    ).start()
+    return snap.df, f"{SNAPSHOT_PENDING}|{snap.version}"
 
 # --- Leer worksheet como DataFrame ---
-@st.cache_data(ttl=30, show_spinner=False)
-@with_backoff()
+def read_ws_df_versioned(spreadsheet_name: str, worksheet_title: str) -> Tuple[pd.DataFrame, str]:
+    """
+    read_ws_df más la versión a la que corresponde ese DataFrame: sirve de
+    llave barata para lo que las páginas derivan de él (sin hashear celdas).
+    """
+    servido = _serve_snapshot(spreadsheet_name, worksheet_title)
+    if servido is not None:
+        df, version = servido
+    else:
+        version = data_version([worksheet_title], spreadsheet_name)
+        df = cached_read(
+            ("ws", spreadsheet_name, worksheet_title),
+            version,
+            lambda: _load_and_snapshot(spreadsheet_name, worksheet_title, version),
+        )
+    return df.copy(), version  # cada página puede modificar la suya
+
 def read_ws_df(spreadsheet_name: str, worksheet_title: str) -> pd.DataFrame:
-    sh = get_sheet(spreadsheet_name)
-    ws = sh.worksheet(worksheet_title)
-    records = ws.get_all_records()
-    return pd.DataFrame(records)
+    """DataFrame de la worksheet; sólo se vuelve a leer si cambió su versión."""
+    return read_ws_df_versioned(spreadsheet_name, worksheet_title)[0]
+
+# --- Derivados de la worksheet (misma versión que su DataFrame) ---
+STUDENT_COLUMNS = ["No de control", "Nombre"]
+
+def _ws_frame(spreadsheet_name: str, worksheet_title: str, version: str) -> pd.DataFrame:
+    return cached_read(
+        ("ws", spreadsheet_name, worksheet_title),
+        version,
+        lambda: _load_and_snapshot(spreadsheet_name, worksheet_title, version),
+    )
+
+def read_header_index(worksheet_title: str, spreadsheet_name: str = SHEET_NAME) -> Dict[str, int]:
+    """{encabezado: columna base 1} de la worksheet, derivado del DataFrame en caché."""
+    version = data_version([worksheet_title], spreadsheet_name)
+    return cached_read(
+        ("header", spreadsheet_name, worksheet_title),
+        version,
+        lambda: {str(h): i + 1 for i, h in enumerate(_ws_frame(spreadsheet_name, worksheet_title, version).columns)},
+    )
+
+def read_students(worksheet_title: str, spreadsheet_name: str = SHEET_NAME) -> pd.DataFrame:
+    """No de control y Nombre de cada alumno, en el orden de la hoja."""
+    version = data_version([worksheet_title], spreadsheet_name)
+
+    def cargar():
+        df = _ws_frame(spreadsheet_name, worksheet_title, version)
+        return df[[c for c in STUDENT_COLUMNS if c in df.columns]].astype(str).reset_index(drop=True)
+
+    return cached_read(("students", spreadsheet_name, worksheet_title), version, cargar).copy()
+
+# --- Precarga de la materia elegida en home.py (ver prefetch.py) ---
+@st.cache_resource
+def get_prefetcher() -> Prefetcher:
+    return Prefetcher()
+
+def prefetch_materia(worksheet_title: str, spreadsheet_name: str = SHEET_NAME) -> bool:
+    """
+    Calienta en segundo plano lo que la captura va a pedir: conexión y versión,
+    worksheet, índice de encabezados y lista de alumnos. Corre en el carril de
+    la captura (lectura vigente, sin snapshots). False si ya estaba precargada.
+    """
+    etapas = [
+        ("Conexión y versión", lambda: data_version([worksheet_title], spreadsheet_name)),
+        ("Worksheet", lambda: _ws_frame(
+            spreadsheet_name, worksheet_title, data_version([worksheet_title], spreadsheet_name),
+        )),
+        ("Índice de encabezados", lambda: read_header_index(worksheet_title, spreadsheet_name)),
+        ("Lista de alumnos", lambda: read_students(worksheet_title, spreadsheet_name)),
+    ]
+    with lane("capture"):
+        return get_prefetcher().start((spreadsheet_name, worksheet_title), etapas)
+
+def prefetch_report(
+    worksheet_title: str, spreadsheet_name: str = SHEET_NAME, wait_s: float = 30.0
+) -> Optional[Dict]:
+    """Espera la precarga en curso (si hay) y regresa sus tiempos por etapa."""
+    return get_prefetcher().wait((spreadsheet_name, worksheet_title), wait_s)
+
+def read_stats(spreadsheet_name: str = SHEET_NAME) -> Dict[str, Dict]:
+    """Último refresco por worksheet: completo o incremental, celdas y bytes bajados."""
+    backend = get_backend(spreadsheet_name)
+    delta = getattr(backend, "delta", None)
+    return dict(delta.last_stats) if delta else {}
+
+# --- Leer varias worksheets a la vez ---
+MAX_PARALLEL_READS = 4
+
+def iter_ws_dfs(
+    worksheet_titles: List[str], spreadsheet_name: str = SHEET_NAME
+) -> Iterator[Tuple[str, pd.DataFrame, float]]:
+    """
+    Entrega (título, DataFrame, segundos de lectura) conforme llegan.
+    Las que ya están en el caché de DataFrames salen primero (sin copiar: son
+    de sólo lectura). Las demás se piden en un solo values_batch_get; si el
+    backend no lo soporta o la llamada falla, un pool acotado de hilos usa read_ws_df.
+    """
+    backend = get_backend(spreadsheet_name)
+    cache = get_frame_cache()
+    # En frío, lo que haya en disco sale de inmediato (se revalida en segundo plano)
+    pendientes = []
+    for title in worksheet_titles:
+        servido = _serve_snapshot(spreadsheet_name, title)
+        if servido is None:
+            pendientes.append(title)
+        else:
+            yield title, servido[0], 0.0
+    versiones = {t: data_version([t], spreadsheet_name) for t in pendientes}
+    faltan = []
+    for title in pendientes:
+        df = cache.get(("ws", spreadsheet_name, title), versiones[title])
+        if df is None:
+            faltan.append(title)
+        else:
+            yield title, df, 0.0
+    worksheet_titles = faltan
+
+    if hasattr(backend, "read_many") and worksheet_titles:
+        t0 = time.perf_counter()
+        llave = ("many", spreadsheet_name, tuple(worksheet_titles), data_version(worksheet_titles, spreadsheet_name))
+        try:
+            frames = get_flights().do(llave, lambda: backend.read_many(list(worksheet_titles)))
+        except (gspread.exceptions.APIError, gspread.exceptions.WorksheetNotFound):
+            frames = None
+        if frames is not None:
+            segundos = time.perf_counter() - t0
+            for title in worksheet_titles:
+                cache.put(("ws", spreadsheet_name, title), versiones[title], frames[title])
+                get_snapshot_store().save(spreadsheet_name, title, frames[title], versiones[title])
+                yield title, frames[title], segundos
+            return
+
+    def leer(title):
+        t0 = time.perf_counter()
+        return title, read_ws_df(spreadsheet_name, title), time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_READS) as pool:
+        # Cada hilo hereda el carril (capture/dashboard) de quien llama
+        futuros = [
+            pool.submit(contextvars.copy_context().run, leer, title)
+            for title in worksheet_titles
+        ]
+        for fut in as_completed(futuros):
+            yield fut.result()
+
+def invalidate_ws_data(worksheet_titles: Optional[List[str]] = None, spreadsheet_name: str = SHEET_NAME) -> None:
+    """
+    Después de escribir: sube la versión de esas worksheets (None = todas), así
+    la siguiente lectura ya no usa el DataFrame anterior.
+    """
+    clock = get_version_clock(spreadsheet_name)
+    if worksheet_titles is None:
+        clock.bump_all()
+    else:
+        clock.bump(worksheet_titles)
+
+def read_header(worksheet_title: str, spreadsheet_name: str = SHEET_NAME) -> List[str]:
+    """Fila 1 (encabezados) de la worksheet."""
+    return get_backend(spreadsheet_name).read_header(worksheet_title)
+
+# --- Escritura de una columna de asistencia en una sola llamada ---
+def write_attendance_column(
+    worksheet_title: str, header: str, values: List[str], spreadsheet_name: str = SHEET_NAME
+) -> Dict:
+    """
+    Escribe el encabezado y toda la columna de asistencia con UN solo
+    update de rango (fila 1 = encabezado, filas 2.. = alumnos).
+    Si la columna ya existe se reutiliza.
+    Regresa métricas: columna usada, llamadas a la API y segundos.
+    """
+    t0 = time.perf_counter()
+    backend = get_backend(spreadsheet_name)
+    # Escritura + resumen bajo el mismo candado que la reconstrucción, para que
+    # una reconstrucción no vea la columna nueva y además reciba su delta
+    with _SUMMARY_LOCK:
+        antes = _read_before_write(backend, worksheet_title)
+        stats = backend.write_column(worksheet_title, header, values)
+        invalidate_ws_data([worksheet_title], spreadsheet_name)
+        if antes is not None:
+            viejos = antes[header].tolist() if header in antes.columns else None
+            _update_summary(backend, summary_sheet.column_deltas(
+                worksheet_title, header, summary_sheet.student_keys(antes), viejos, values,
+            ), spreadsheet_name)
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+# --- Escritura de celdas sueltas en un solo batch_update ---
+def update_cells(
+    worksheet_title: str, cells: Dict[Tuple[int, int], str], spreadsheet_name: str = SHEET_NAME
+) -> Dict:
+    """
+    Escribe varias celdas {(fila, columna): valor} en UN solo batch_update.
+    Las coordenadas son base 1 y se convierten a A1 (funciona más allá de la Z).
+    Regresa métricas: celdas escritas, llamadas a la API y segundos.
+    """
+    t0 = time.perf_counter()
+    backend = get_backend(spreadsheet_name)
+    with _SUMMARY_LOCK:
+        antes = _read_before_write(backend, worksheet_title)
+        stats = backend.update_cells(worksheet_title, cells)
+        if stats["cells"]:
+            invalidate_ws_data([worksheet_title], spreadsheet_name)
+        if antes is not None:
+            _update_summary(backend, summary_sheet.frame_deltas(worksheet_title, antes, cells), spreadsheet_name)
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+def read_values(worksheet_title: str, spreadsheet_name: str = SHEET_NAME) -> List[List[str]]:
+    """Cuadrícula completa tal como está en la hoja (sin caché)."""
+    return get_backend(spreadsheet_name).get_all_values(worksheet_title)
+
+def delete_rows(worksheet_title: str, rows: List[int], spreadsheet_name: str = SHEET_NAME) -> Dict:
+    """Borra filas completas (base 1); las de abajo suben junto con su asistencia."""
+    t0 = time.perf_counter()
+    stats = get_backend(spreadsheet_name).delete_rows(worksheet_title, rows)
+    if stats["rows"]:
+        invalidate_ws_data([worksheet_title], spreadsheet_name)
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+def replace_worksheet(
+    worksheet_title: str, values: List[List[str]], spreadsheet_name: str = SHEET_NAME
+) -> None:
+    """Crea o reemplaza una pestaña completa (encabezados + filas)."""
+    get_backend(spreadsheet_name).replace_worksheet(worksheet_title, values)
+    invalidate_worksheets()
+    invalidate_ws_data([worksheet_title], spreadsheet_name)
+
+def replace_worksheets(
+    sheets: Dict[str, List[List[str]]], spreadsheet_name: str = SHEET_NAME
+) -> Dict:
+    """Crea o reemplaza varias pestañas en lote ({título: encabezados + filas})."""
+    t0 = time.perf_counter()
+    out = get_backend(spreadsheet_name).replace_worksheets(sheets)
+    invalidate_worksheets()
+    invalidate_ws_data(list(sheets), spreadsheet_name)
+    out["seconds"] = time.perf_counter() - t0
+    return out
+
+# =========================
+# HOJA DE RESUMEN "_resumen" (ver summary_sheet.py)
+# =========================
+# Las escrituras de asistencia (captura y corrección) aplican su delta al
+# resumen. Si el resumen falla, la captura NO se repite (ya quedó escrita):
+# se anota el error y el resumen se puede reconstruir desde diagnóstico.
+
+_SUMMARY_LOCK = threading.RLock()   # escrituras a materias + resumen + reconstrucción
+# stale: un delta no se pudo aplicar; el resumen no es confiable hasta reconstruirlo
+_SUMMARY_STATS = {
+    "updates": 0, "rows_touched": 0, "rows_added": 0, "rebuilds": 0, "stale": False, "last_error": None,
+}
+_summary_rebuilding = threading.Event()
+
+def _read_before_write(backend, worksheet_title: str) -> Optional[pd.DataFrame]:
+    """Vista ancha antes de escribir (para calcular el delta); None si no se pudo leer."""
+    if worksheet_title.startswith("_"):
+        return None
+    try:
+        return backend.read_df(worksheet_title)
+    except Exception as e:
+        _SUMMARY_STATS["last_error"] = f"{type(e).__name__}: {e}"
+        return None
+
+def _read_summary_df(base) -> pd.DataFrame:
+    try:
+        return base.read_df(summary_sheet.SUMMARY_TITLE)
+    except gspread.exceptions.WorksheetNotFound:
+        return pd.DataFrame()
+
+def _rebuild_summary_in_background(spreadsheet_name: str) -> None:
+    """Una sola reconstrucción en segundo plano a la vez; si falla, el resumen sigue marcado."""
+    if _summary_rebuilding.is_set():
+        return
+    _summary_rebuilding.set()
+
+    def correr():
+        try:
+            rebuild_summary(spreadsheet_name)
+        except Exception as e:
+            _SUMMARY_STATS["last_error"] = f"{type(e).__name__}: {e}"
+        finally:
+            _summary_rebuilding.clear()
+
+    threading.Thread(target=correr, name="summary-rebuild", daemon=True).start()
+
+def _update_summary(backend, deltas: Dict, spreadsheet_name: str = SHEET_NAME) -> None:
+    """
+    Aplica los deltas tocando sólo las filas del resumen que cambian. Si el
+    resumen no existe o quedó marcado como no confiable, se reconstruye completo
+    (la escritura que originó el delta ya está en la materia).
+    """
+    if not deltas:
+        return
+    base = _storage(backend)
+    try:
+        with _SUMMARY_LOCK:
+            actual = None if _SUMMARY_STATS["stale"] else _read_summary_df(base)
+            if actual is None or (actual.empty and not len(actual.columns)):
+                rebuild_summary(spreadsheet_name)
+                return
+            cells, nuevas = summary_sheet.plan_summary_update(actual, deltas)
+            if cells:
+                base.update_cells(summary_sheet.SUMMARY_TITLE, cells)
+            if nuevas:
+                base.append_rows(summary_sheet.SUMMARY_TITLE, nuevas)
+            _SUMMARY_STATS["updates"] += 1
+            _SUMMARY_STATS["rows_touched"] += len({row for row, _ in cells})
+            _SUMMARY_STATS["rows_added"] += len(nuevas)
+        invalidate_ws_data([summary_sheet.SUMMARY_TITLE], spreadsheet_name)
+    except Exception as e:
+        # El delta se perdió: el resumen ya no cuadra hasta reconstruirlo
+        _SUMMARY_STATS["last_error"] = f"{type(e).__name__}: {e}"
+        _SUMMARY_STATS["stale"] = True
+        _rebuild_summary_in_background(spreadsheet_name)
+
+def summary_ready() -> bool:
+    """False mientras el resumen está marcado como no confiable (falta reconstruirlo)."""
+    return not _SUMMARY_STATS["stale"]
+
+def read_summary(spreadsheet_name: str = SHEET_NAME) -> pd.DataFrame:
+    """Hoja "_resumen" completa (una fila por materia × unidad × alumno)."""
+    df = cached_read(
+        ("ws", spreadsheet_name, summary_sheet.SUMMARY_TITLE),
+        data_version([summary_sheet.SUMMARY_TITLE], spreadsheet_name),
+        lambda: _read_summary_df(_storage(get_backend(spreadsheet_name))),
+    )
+    return df.copy()
+
+def rebuild_summary(spreadsheet_name: str = SHEET_NAME) -> Dict:
+    """Recalcula "_resumen" desde todas las materias y lo reemplaza completo."""
+    t0 = time.perf_counter()
+    conteos = {}
+    # Con el candado tomado ninguna escritura a una materia queda a medias
+    # entre la lectura y el reemplazo del resumen
+    with _SUMMARY_LOCK, lane("interactive"):
+        materias = _fetch_titles(spreadsheet_name)   # lista vigente, no la del snapshot
+        for title, df, _ in iter_ws_dfs(materias, spreadsheet_name):
+            conteos.update(summary_sheet.summary_from_wide(title, df))
+        _storage(get_backend(spreadsheet_name)).replace_worksheet(
+            summary_sheet.SUMMARY_TITLE,
+            [summary_sheet.SUMMARY_HEADER] + summary_sheet.summary_rows(conteos),
+        )
+        invalidate_worksheets()
+        invalidate_ws_data([summary_sheet.SUMMARY_TITLE], spreadsheet_name)
+        _SUMMARY_STATS["stale"] = False
+        _SUMMARY_STATS["rebuilds"] += 1
+        _SUMMARY_STATS["last_error"] = None
+    return {"materias": len(materias), "rows": len(conteos), "seconds": time.perf_counter() - t0}
+
+def summary_stats() -> Dict:
+    return dict(_SUMMARY_STATS)
+
+# =========================
+# ESCRITURA DIFERIDA (BITÁCORA LOCAL)
+# =========================
+#   [journal]
+#   path = "data/journal.jsonl"
+
+def _apply_journal_batch(lote: Dict) -> None:
+    """Aplica un lote agrupado de la bitácora sobre el backend configurado."""
+    with lane("capture"):
+        if lote["kind"] == "column":
+            write_attendance_column(lote["worksheet"], lote["header"], lote["values"])
+        else:
+            update_cells(lote["worksheet"], lote["cells"])
+
+def _is_retryable(error: BaseException) -> bool:
+    """Sólo 429, timeouts y fallas de red se reintentan; lo demás va a la lista de muertos."""
+    if isinstance(error, RateLimitExceeded):
+        return True
+    if isinstance(error, gspread.exceptions.APIError):
+        return "429" in str(error)
+    if isinstance(error, sqlite3.OperationalError):
+        return "locked" in str(error) or "busy" in str(error)
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          google.auth.exceptions.TransportError)):
+        return True
+    return is_transient(error)
+
+@st.cache_resource
+def get_journal() -> WriteJournal:
+    """Bitácora compartida por el proceso; su hilo vacía los pendientes al backend."""
+    cfg = st.secrets.get("journal", {})
+    return WriteJournal(
+        cfg.get("path", "data/journal.jsonl"), _apply_journal_batch, is_retryable=_is_retryable,
+    ).start()
+
+def enqueue_attendance_column(worksheet_title: str, header: str, values: List[str]) -> Dict:
+    """
+    Guarda la captura en la bitácora local (fsync) y regresa de inmediato.
+    El hilo de la bitácora la escribe después en el backend con reintentos.
+    """
+    t0 = time.perf_counter()
+    journal = get_journal()
+    entry_id = journal.append("column", worksheet_title, header=header, values=list(values))
+    stats = journal.backlog()
+    stats["id"] = entry_id
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+def read_ws_df_pending(spreadsheet_name: str, worksheet_title: str) -> pd.DataFrame:
+    """
+    Como read_ws_df, pero con las capturas de la bitácora que aún no se suben
+    encima (en su orden): una columna nueva va al final, como la agrega
+    write_column, y las celdas se aplican por posición.
+    """
+    df = read_ws_df(spreadsheet_name, worksheet_title)
+    for e in get_journal().pending(worksheet_title):
+        if e["kind"] == "column":
+            valores = [str(v) for v in e["values"]][:len(df)]
+            df[e["header"]] = valores + [""] * (len(df) - len(valores))
+        else:
+            for row, col, value in e["cells"]:
+                if 2 <= row < len(df) + 2 and 1 <= col <= len(df.columns):
+                    df.iat[row - 2, col - 1] = value
+    return df
+
+def enqueue_attendance_cells(worksheet_title: str, cells: Dict[Tuple[int, int], str]) -> Dict:
+    """
+    Correcciones de celdas {(fila, columna): valor} a la bitácora; el hilo las
+    aplica después de las capturas que ya estaban en cola (en orden).
+    """
+    t0 = time.perf_counter()
+    journal = get_journal()
+    celdas = [[row, col, value] for (row, col), value in sorted(cells.items())]
+    entry_id = journal.append("cells", worksheet_title, cells=celdas) if celdas else None
+    stats = journal.backlog()
+    stats["id"] = entry_id
+    stats["cells"] = len(celdas)
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+def read_attendance_column(
+    worksheet_title: str, header: str, spreadsheet_name: str = SHEET_NAME
+) -> Optional[List[str]]:
+    """
+    Columna de asistencia tal como quedará guardada: lo que ya está en el
+    backend más lo que la bitácora aún no sube. None si no existe en ninguno.
+    """
+    df = read_ws_df_pending(spreadsheet_name, worksheet_title)
+    return df[header].fillna("").astype(str).tolist() if header in df.columns else None
+
+def read_attendance_by_student(
+    worksheet_title: str, header: str, spreadsheet_name: str = SHEET_NAME
+) -> Optional[Dict[str, str]]:
+    """
+    Como read_attendance_column, pero {No de control: valor}: sirve cuando la
+    lista de alumnos ya no coincide fila por fila con la columna guardada.
+    """
+    df = read_ws_df_pending(spreadsheet_name, worksheet_title)
+    if header not in df.columns:
+        return None
+    return dict(zip(summary_sheet.student_keys(df), df[header].fillna("").astype(str)))
+
+def enqueue_attendance_changes(
+    worksheet_title: str, header: str, values: List[str], spreadsheet_name: str = SHEET_NAME
+) -> Dict:
+    """
+    Vuelve a guardar una captura: compara contra la columna guardada y manda a
+    la bitácora sólo las celdas que cambiaron. Si la columna todavía no está en
+    la hoja (o cambió el número de alumnos) se escribe completa.
+    """
+    t0 = time.perf_counter()
+    df = read_ws_df_pending(spreadsheet_name, worksheet_title)
+    if header not in df.columns or len(df) != len(values):
+        stats = enqueue_attendance_column(worksheet_title, header, values)
+        stats["mode"] = "column"
+        stats["cells"] = len(values)
+        return stats
+
+    col = list(df.columns).index(header) + 1
+    guardados = df[header].fillna("").astype(str).tolist()
+    stats = enqueue_attendance_cells(worksheet_title, {
+        (i, col): nuevo
+        for i, (viejo, nuevo) in enumerate(zip(guardados, values), start=2)  # fila 1 = encabezados
+        if viejo != nuevo
+    })
+    stats["mode"] = "cells"
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+def migrate_to_log(spreadsheet_name: str = SHEET_NAME) -> Dict[str, int]:
+    """
+    Copia la asistencia de las hojas anchas a la bitácora "_log" (se puede
+    repetir; no borra nada). Después se activa con [storage] layout = "log".
+    """
+    import attendance_log
+
+    backend = get_backend(spreadsheet_name)
+    if not isinstance(backend, attendance_log.LogLayout):
+        backend = attendance_log.LogLayout(backend)
+    with lane("interactive"):
+        resumen = attendance_log.migrate_to_log(backend, list_worksheets(spreadsheet_name))
+    invalidate_worksheets()
+    invalidate_ws_data(spreadsheet_name=spreadsheet_name)
+    return resumen
+
+def copy_to_sqlite(spreadsheet_name: str = SHEET_NAME) -> Dict:
+    """
+    Copia todas las pestañas de Google Sheets al archivo [storage] sqlite_path
+    (las que ya existan ahí se reemplazan). Después se activa con backend = "sqlite".
+    """
+    from sqlite_backend import SQLiteBackend
+
+    t0 = time.perf_counter()
+    path = st.secrets.get("storage", {}).get("sqlite_path", "data/asistencia.db")
+    with lane("interactive"):
+        titles = SQLiteBackend(path).import_from(SheetsBackend(spreadsheet_name))
+    return {"path": path, "worksheets": len(titles), "seconds": time.perf_counter() - t0}
+
+def journal_backlog() -> Dict:
+    """Pendientes por sincronizar, antigüedad del más viejo y último error."""
+    return get_journal().backlog()
+
+def journal_dead() -> List[Dict]:
+    """Capturas apartadas por un error permanente (pestaña renombrada, 400 de la API...)."""
+    return get_journal().dead()
+
+def retry_journal_dead(ids: Optional[List[str]] = None) -> int:
+    """Vuelve a poner en cola las capturas muertas (None = todas)."""
+    return get_journal().retry_dead(ids)
+
+def discard_journal_dead(ids: Optional[List[str]] = None) -> int:
+    """Descarta capturas muertas (None = todas) sin aplicarlas."""
+    return get_journal().discard_dead(ids)
+
+def scheduler_stats() -> Dict:
+    """Tokens disponibles, peticiones en cola y espera/rechazos por carril."""
+    return get_scheduler().stats()
@@ -0,0 +1,171 @@
+import re
+import datetime
+import functools
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# =========================
+# ÍNDICE DE ENCABEZADOS DE ASISTENCIA
+# =========================
+# Cada encabezado ('Unidad 2 - 15/10/2025 10:00') se interpreta UNA sola vez
+# por proceso y cada fila de encabezados distinta arma su índice una sola vez.
+# Las páginas consultan el índice en vez de volver a correr regex/strptime.
+
+_UNIDAD_RE = re.compile(r"(?:unidad|u)\s*-?\s*(\d+)")
+_FORMATOS_FECHA = ["%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y"]
+
+class ColumnInfo(NamedTuple):
+    position: int                         # posición en la fila de encabezados (base 0)
+    header: str
+    is_attendance: bool
+    unit: str                             # 'Unidad 3', 'Propedéutico', 'Tutoría', 'Asesoría', ...
+    kind: str                             # 'unidad' | 'propedeutico' | 'tutoria' | 'asesoria' | 'otro'
+    unit_number: Optional[int]
+    dt: Optional[datetime.datetime]
+
+def _sin_acentos(x: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", x)
+        if unicodedata.category(c) != "Mn"
+    ).lower()
+
+def is_attendance_column(col: str) -> bool:
+    """
+    Decide si una columna es una sesión de asistencia.
+    Heurística: columnas que empiezan con 'Unidad', 'U', 'Proped', 'Tutor'
+    Ejemplo real:
+    'Unidad 2 - 15/10/2025 10:00'
+    """
+    if not isinstance(col, str):
+        return False
+    low = col.lower().strip()
+    if low.startswith("unidad"):
+        return True
+    if low.startswith("u") and any(ch.isdigit() for ch in low):
+        return True
+    if low.startswith("proped"):
+        return True
+    if low.startswith("tutor"):
+        return True
+    return False
+
+def _parse_unidad(col_name: str) -> Tuple[str, str, Optional[int]]:
+    txt = str(col_name or "")
+    # Parte antes del primer " - "
+    prefix = txt.split(" - ", 1)[0].strip()
+    n = _sin_acentos(prefix)
+
+    if "propedeutico" in n:
+        return "Propedéutico", "propedeutico", None
+    if "tutoria" in n:
+        return "Tutoría", "tutoria", None
+    if "asesoria" in n:
+        return "Asesoría", "asesoria", None
+
+    # Buscar unidad numérica: "unidad 3", "u3", etc.
+    m = _UNIDAD_RE.search(n)
+    if m:
+        num = int(m.group(1))
+        return f"Unidad {num}", "unidad", num
+
+    # Si no encontramos nada claro, devolvemos el prefijo tal cual
+    return prefix, "otro", None
+
+def parse_unidad(col_name: str) -> str:
+    """
+    Extrae la 'unidad' a partir del nombre de la columna.
+    Ejemplos que intentamos mapear:
+    - 'Unidad 3 - 15/10/2025 10:00' -> 'Unidad 3'
+    - 'Propedéutico - 12/09/2025' -> 'Propedéutico'
+    - 'Tutoría - 20/09/2025' -> 'Tutoría'
+    - 'Unidad Asesoria - 20/09/2025' -> 'Asesoría'
+    - 'U4 - 01/10/2025' -> 'Unidad 4'
+    """
+    return parse_header(str(col_name or "")).unit
+
+def parse_datetime_from_col(col_name: str) -> Optional[datetime.datetime]:
+    """
+    Intenta extraer la fecha/hora de la parte después de ' - ' en el header.
+    Ejemplo: 'Unidad 2 - 15/10/2025 10:00'
+    Devuelve un datetime (o None si no se puede).
+    """
+    return parse_header(str(col_name or "")).dt
+
+def _parse_datetime(txt: str) -> Optional[datetime.datetime]:
+    # Parte DESPUÉS del primer " - "
+    parts = txt.split(" - ", 1)
+    if len(parts) < 2:
+        return None
+    fecha_txt = parts[1].strip()
+    for fmt in _FORMATOS_FECHA:
+        try:
+            return datetime.datetime.strptime(fecha_txt, fmt)
+        except ValueError:
+            pass
+    return None
+
+@functools.lru_cache(maxsize=None)
+def parse_header(header: str) -> ColumnInfo:
+    """Interpreta un encabezado una sola vez (la posición se fija en el índice)."""
+    unit, kind, num = _parse_unidad(header)
+    return ColumnInfo(
+        position=-1,
+        header=header,
+        is_attendance=is_attendance_column(header),
+        unit=unit,
+        kind=kind,
+        unit_number=num,
+        dt=_parse_datetime(header),
+    )
+
+class HeaderIndex:
+    """Metadatos por columna de una fila de encabezados, con búsquedas por unidad y fecha."""
+
+    def __init__(self, headers: Sequence[str]):
+        self.headers = list(headers)
+        self.columns: List[ColumnInfo] = [
+            parse_header(str(h))._replace(position=i) for i, h in enumerate(self.headers)
+        ]
+        self.attendance: List[ColumnInfo] = [c for c in self.columns if c.is_attendance]
+        self._by_unit: Dict[str, List[ColumnInfo]] = {}
+        for c in self.attendance:
+            self._by_unit.setdefault(c.unit, []).append(c)
+
+    def attendance_headers(self) -> List[str]:
+        return [c.header for c in self.attendance]
+
+    def units(self) -> List[str]:
+        """Unidades presentes, en orden de aparición."""
+        return list(self._by_unit.keys())
+
+    def by_unit(self, unit: str) -> List[ColumnInfo]:
+        """Columnas de una unidad ('3', 'Unidad 3', 'Asesoria', 'Propedéutico'...)."""
+        nombre = unit if unit in self._by_unit else parse_header(f"Unidad {unit}").unit
+        return list(self._by_unit.get(nombre, []))
+
+    def between(
+        self,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        unit: Optional[str] = None,
+    ) -> List[ColumnInfo]:
+        """Columnas de asistencia con fecha en [start, end) (opcionalmente de una unidad)."""
+        cols = self.by_unit(unit) if unit is not None else self.attendance
+        return [
+            c for c in cols
+            if c.dt is not None
+            and (start is None or c.dt >= start)
+            and (end is None or c.dt < end)
+        ]
+
+    def on_date(self, day: datetime.date, unit: Optional[str] = None) -> List[ColumnInfo]:
+        inicio = datetime.datetime.combine(day, datetime.time.min)
+        return self.between(inicio, inicio + datetime.timedelta(days=1), unit=unit)
+
+@functools.lru_cache(maxsize=256)
+def _build_index(headers: Tuple[str, ...]) -> HeaderIndex:
+    return HeaderIndex(headers)
+
+def header_index(headers: Sequence[str]) -> HeaderIndex:
+    """Índice compartido por cada fila de encabezados distinta."""
+    return _build_index(tuple(str(h) for h in headers))
@@ -1,20 +1,13 @@
 import streamlit as st
-import gspread
-import pandas as pd
-import json
 from datetime import datetime
-from oauth2client.service_account import ServiceAccountCredentials
 import pytz
 
-# === CONFIGURACIÓN DE ACCESO A GOOGLE SHEETS CON SECRETS ===
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-service_account_info = st.secrets["service_account"]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["service_account"], scope)
+# === ACCESO A GOOGLE SHEETS (cliente y hoja compartidos en gsheets_utils) ===
+from gsheets_utils import list_worksheets, prefetch_materia
+from rate_limiter import set_lane
 
-client = gspread.authorize(creds)
-
-SHEET_NAME = "Seguimiento_Asistencia_2025_2"
-sh = client.open(SHEET_NAME)
+# El hilo del script se reutiliza entre páginas: el carril se fija en cada rerun
+set_lane("interactive")
 
 # === INTERFAZ DE USUARIO ===
 st.set_page_config(page_title="Inicio - Registro de Asistencia", layout="wide")
@@ -22,7 +15,13 @@ st.title(" Plataforma de Registro de Asistencia ITESP ")
 
 # === SELECCIÓN DE MATERIA Y UNIDAD ===
 st.subheader("Selecciona la materia que impartes")
-materia = st.selectbox("Materia:", [ws.title for ws in sh.worksheets()])
+materia = st.selectbox("Materia:", list_worksheets())
+
+# [NUEVO] Mientras se elige la unidad, un hilo ya va cargando la materia para la captura
+# (sólo cuando cambia la materia, no en cada rerun de la página)
+if materia and st.session_state.get("materia_precargada") != materia:
+    prefetch_materia(materia)
+    st.session_state["materia_precargada"] = materia
 
 st.subheader("Selecciona la unidad de captura")
 unidad = st.selectbox("Unidad:", ["1", "2", "3", "4", "5","6", "7", "8","Asesoria","Propedéutico"])
@@ -0,0 +1,127 @@
+import itertools
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from attendance_matrix import count_rates
+
+# =========================
+# CUBO OLAP DE ASISTENCIA
+# =========================
+# Conteos ✓ / ~ / ✗ (y total de celdas) por:
+#   materia × unidad × semana ISO × grupo × docente
+# Sólo se guardan las combinaciones que existen (una materia tiene un grupo y
+# un docente, así que la cuadrícula densa sería casi toda ceros). Al construir
+# el cubo de la hoja completa se precalculan los 32 roll-ups posibles, así que
+# agregar por cualquier combinación de dimensiones es una búsqueda en un
+# diccionario; los sub-cubos (slice) calculan los suyos al pedirlos.
+
+DIMENSIONS = ("materia", "unidad", "semana", "grupo", "docente")
+MEASURES = ("present", "tardy", "absent", "total")
+RATES = {"present_rate": "present", "tardy_rate": "tardy", "absent_rate": "absent"}
+
+SIN_FECHA = "Sin fecha"
+
+def iso_week_labels(dt: pd.Series) -> pd.Categorical:
+    """'2025-W42' por fila (NaT -> 'Sin fecha'); cada fecha distinta se calcula una vez."""
+    codes, uniques = pd.factorize(dt, use_na_sentinel=True)
+    iso = pd.DatetimeIndex(uniques).isocalendar()
+    etiquetas = [f"{y}-W{w:02d}" for y, w in zip(iso["year"], iso["week"])] + [SIN_FECHA]
+    cats, lut = np.unique(np.asarray(etiquetas, dtype=object), return_inverse=True)
+    return pd.Categorical.from_codes(lut[codes], cats)
+
+def _with_rates(df: pd.DataFrame) -> pd.DataFrame:
+    for rate, valores in count_rates(df["present"], df["tardy"], df["absent"], df["total"]).items():
+        df[rate] = valores
+    return df
+
+class AttendanceCube:
+    """Hechos por combinación observada de dimensiones + roll-ups memorizados."""
+
+    def __init__(self, facts: pd.DataFrame, precompute: bool = False):
+        self.facts = facts
+        self._rollups: Dict[Tuple[str, ...], pd.DataFrame] = {}
+        if precompute:
+            for n in range(len(DIMENSIONS) + 1):
+                for dims in itertools.combinations(DIMENSIONS, n):
+                    self._rollups[dims] = self._aggregate(dims)
+
+    @classmethod
+    def from_long(cls, long_df: pd.DataFrame) -> "AttendanceCube":
+        """
+        `long_df` es el formato largo de comparativo.py (materia, unidad, grupo,
+        docente como categorías; dt datetime64; status int8 0..3).
+        """
+        columnas = {
+            "materia": long_df["materia"].astype("category"),
+            "unidad": long_df["unidad"].astype("category"),
+            "semana": pd.Series(iso_week_labels(long_df["dt"])),
+            "grupo": long_df["grupo"].astype("category"),
+            "docente": long_df["docente"].astype("category"),
+        }
+        codes = [columnas[d].cat.codes.to_numpy().astype(np.int64) for d in DIMENSIONS]
+        sizes = [max(len(columnas[d].cat.categories), 1) for d in DIMENSIONS]
+
+        # una llave entera por combinación observada y un bincount por estado
+        llave = np.ravel_multi_index(codes, sizes) if len(long_df) else np.zeros(0, dtype=np.int64)
+        combos, inv = np.unique(llave, return_inverse=True)
+        status = long_df["status"].to_numpy().astype(np.int64)
+        conteo = np.bincount(inv * 4 + status, minlength=len(combos) * 4).reshape(len(combos), 4)
+
+        facts = pd.DataFrame({
+            d: pd.Categorical.from_codes(c, columnas[d].cat.categories)
+            for d, c in zip(DIMENSIONS, np.unravel_index(combos, sizes))
+        })
+        facts["present"] = conteo[:, 1]
+        facts["tardy"] = conteo[:, 2]
+        facts["absent"] = conteo[:, 3]
+        facts["total"] = conteo.sum(axis=1)
+        return cls(facts, precompute=True)
+
+    def _aggregate(self, dims: Tuple[str, ...]) -> pd.DataFrame:
+        if not dims:
+            out = self.facts[list(MEASURES)].sum().to_frame().T
+        else:
+            out = (
+                self.facts.groupby(list(dims), observed=True)[list(MEASURES)]
+                .sum()
+                .reset_index()
+            )
+        return _with_rates(out)
+
+    def memory_usage(self) -> int:
+        """Bytes de los hechos y de los roll-ups ya calculados."""
+        frames = [self.facts] + list(self._rollups.values())
+        return int(sum(df.memory_usage(deep=True, index=True).sum() for df in frames))
+
+    def members(self, dim: str) -> List[str]:
+        """Valores presentes de una dimensión."""
+        return self.rollup(dim)[dim].astype(str).tolist()
+
+    def rollup(self, *dims: str) -> pd.DataFrame:
+        """Agregado por las dimensiones pedidas (en cualquier orden); lo demás se suma."""
+        desconocidas = set(dims) - set(DIMENSIONS)
+        if desconocidas:
+            raise ValueError(f"Dimensiones desconocidas: {', '.join(sorted(desconocidas))}")
+        key = tuple(d for d in DIMENSIONS if d in dims)
+        if key not in self._rollups:
+            self._rollups[key] = self._aggregate(key)
+        return self._rollups[key][list(dims) + list(MEASURES) + list(RATES)].copy()
+
+    def slice(self, **filters: Optional[Sequence[str]]) -> "AttendanceCube":
+        """Sub-cubo con sólo los valores dados por dimensión (None / vacío = todos)."""
+        mask = np.ones(len(self.facts), dtype=bool)
+        for dim, valores in filters.items():
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Dimensión desconocida: {dim}")
+            if not valores:
+                continue
+            cat = self.facts[dim].cat
+            seleccion = np.flatnonzero(cat.categories.isin(list(valores)))
+            mask &= np.isin(cat.codes.to_numpy(), seleccion)
+        return AttendanceCube(self.facts[mask].reset_index(drop=True))
+
+    def pivot(self, rows: str, cols: Optional[str] = None, value: str = "present_rate") -> pd.DataFrame:
+        """Tabla dinámica: filas × columnas con una medida o tasa."""
+        if cols is None or cols == rows:
+            return self.rollup(rows).set_index(rows)[[value]]
+        return self.rollup(rows, cols).pivot(index=rows, columns=cols, values=value)
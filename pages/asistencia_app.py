@@ -1,10 +1,25 @@
 import streamlit as st
-import gspread
 import pandas as pd
-import json
+import time
 from datetime import datetime
-from oauth2client.service_account import ServiceAccountCredentials
 import pytz
+import sys, os
+
+# ---  Hacemos que Python vea la carpeta raíz del proyecto ---
+CURRENT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from gsheets_utils import (
+    enqueue_attendance_changes, enqueue_attendance_column, journal_backlog, prefetch_report,
+    read_attendance_by_student, read_attendance_column, read_students,
+)
+from rate_limiter import set_lane
+from attendance_matrix import merge_marks
+
+# Las peticiones de la captura tienen prioridad sobre las de los tableros
+set_lane("capture")
 
 
 # === Validación de acceso desde home.py ===
@@ -27,22 +42,49 @@ st.title(f" Asistencia: {materia}")
 ultima_hora = st.session_state.get("ultima_hora_captura", "—")
 st.caption(f"Unidad: {unidad} | Última captura: {ultima_hora}")
 
-
-# === Configuración de acceso a Google Sheets desde secrets ===
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-service_account_info = st.secrets["service_account"]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["service_account"], scope)
-client = gspread.authorize(creds)
-
-
-
-SHEET_NAME = "Seguimiento_Asistencia_2025_2"
-sh = client.open(SHEET_NAME)
-ws = sh.worksheet(materia)
-
-
-# === Cargar datos ===
-df = pd.DataFrame(ws.get_all_records())
+# [NUEVO] Capturas guardadas localmente que aún no llegan a Google Sheets
+backlog = journal_backlog()
+if backlog["pending"]:
+    st.caption(
+        f"⏳ Pendientes de sincronizar: {backlog['pending']} "
+        f"(la más antigua hace {backlog['oldest_age_s']:.0f} s)"
+    )
+    if backlog["last_error"]:
+        st.caption(f"Último error al sincronizar (se reintenta solo): {backlog['last_error']}")
+if backlog["dead"]:
+    st.warning(
+        f"{backlog['dead']} captura(s) no se pudieron escribir y quedaron apartadas; "
+        "revísalas en la página de diagnóstico."
+    )
+
+
+# === Cargar datos (backend configurado en gsheets_utils) ===
+# [CAMBIO] home.py ya dejó la lista de alumnos en el caché compartido; si la
+#          precarga sigue en curso se espera a ella en vez de repetir la lectura.
+t0 = time.perf_counter()
+precarga = prefetch_report(materia)
+espera_precarga = time.perf_counter() - t0
+df = read_students(materia)
+espera_total = time.perf_counter() - t0
+
+with st.expander("Tiempos de carga"):
+    if precarga is None:
+        st.caption(f"Sin precarga: la lista se cargó aquí en {espera_total * 1000:.0f} ms.")
+    else:
+        en_segundo_plano = sum(precarga["stages"].values())
+        st.dataframe(
+            pd.DataFrame([
+                {"Etapa": etapa, "ms": round(seg * 1000)} for etapa, seg in precarga["stages"].items()
+            ]),
+            hide_index=True,
+        )
+        st.caption(
+            f"Precarga: {en_segundo_plano * 1000:.0f} ms | "
+            f"esperados en esta página: {espera_total * 1000:.0f} ms | "
+            f"latencia oculta: {max(en_segundo_plano - espera_precarga, 0) * 1000:.0f} ms"
+        )
+        if precarga["error"]:
+            st.caption(f"La precarga falló ({precarga['error']}); se leyó de nuevo aquí.")
 
 if df.empty:
     st.info("No hay alumnos registrados.")
@@ -59,22 +101,98 @@ zona = pytz.timezone("America/Mexico_City")
 
 
 
+# === Captura en curso ===
+# [NUEVO] Después del primer guardado la captura queda abierta: volver a guardar
+#         corrige esa misma columna mandando sólo las celdas que cambiaron.
+captura = st.session_state.get("captura_actual")
+if captura and (captura["materia"], captura["unidad"]) != (materia, unidad):
+    captura = None
+guardados = read_attendance_column(materia, captura["columna"]) if captura else None
+if guardados is not None and len(guardados) != len(df):
+    guardados = None  # cambió la lista de alumnos: se vuelve a escribir completa
+# Sin columna legible fila por fila: lo ya guardado se alinea por No de control
+previos = None
+if captura and guardados is None:
+    por_alumno = read_attendance_by_student(materia, captura["columna"]) or {}
+    previos = [por_alumno.get(nc.strip(), "") for nc in df["No de control"]]
+
+# Marcas base de la cuadrícula (las acciones masivas las reemplazan)
+clave = f"marcas|{materia}|{unidad}|{captura['columna'] if captura else ''}"
+base = guardados if guardados is not None else previos
+if len(st.session_state.get(clave, [])) != len(df):
+    st.session_state[clave] = [v == "✓" for v in base] if base else [False] * len(df)
+    st.session_state[f"{clave}|v"] = 0
+editor_key = f"grid|{clave}|{st.session_state[f'{clave}|v']}"
+
+def _marcas_actuales():
+    """Marcas base + lo editado en la cuadrícula."""
+    marcas = list(st.session_state[clave])
+    for fila, cambios in st.session_state.get(editor_key, {}).get("edited_rows", {}).items():
+        if "Presente" in cambios:
+            marcas[int(fila)] = bool(cambios["Presente"])
+    return marcas
+
+def _accion_masiva(accion):
+    marcas = _marcas_actuales()
+    st.session_state[clave] = [True] * len(marcas) if accion == "todos" else [not m for m in marcas]
+    st.session_state[f"{clave}|v"] += 1  # editor nuevo sobre las marcas nuevas
+
 # === Lista de asistencia ===
-# [NUEVO] Usamos st.form para que la app NO ejecute guardados hasta pulsar el botón.
-with st.form(key="form_asistencia", clear_on_submit=False):
-    st.subheader(" Lista de alumnos")
-    asistencia = []
-    for i, row in df.iterrows():
-        nombre = row["Nombre"]
-        nc = row["No de control"]
-        # [CAMBIO] clave única por alumno para evitar colisiones al re-renderizar
-        marcado = st.checkbox(f"{nc} - {nombre}", key=f"al_{i}")
-        asistencia.append("✓" if marcado else "✗")
-
- # === Guardar resultado ===
-    btn_guardar = st.form_submit_button("✅ Guardar asistencia")
-
-if btn_guardar:
+# [CAMBIO] Una sola cuadrícula (st.data_editor) en lugar de un checkbox por alumno.
+st.subheader(" Lista de alumnos")
+b1, b2, _ = st.columns([1, 1, 4])
+b1.button("Marcar todos presentes", on_click=_accion_masiva, args=("todos",))
+b2.button("Invertir", on_click=_accion_masiva, args=("invertir",))
+
+tabla = df[["No de control", "Nombre"]].copy()
+tabla["Presente"] = st.session_state[clave]
+editado = st.data_editor(
+    tabla,
+    key=editor_key,
+    hide_index=True,
+    use_container_width=True,
+    disabled=["No de control", "Nombre"],
+    column_config={"Presente": st.column_config.CheckboxColumn("Presente")},
+)
+marcas = editado["Presente"].fillna(False).astype(bool).tolist()
+st.caption(f"Presentes: {sum(marcas)} de {len(marcas)}")
+
+c1, c2, _ = st.columns([1, 1, 4])
+btn_guardar = c1.button("✅ Guardar cambios" if captura else "✅ Guardar asistencia")
+if captura and c2.button("Nueva captura"):
+    st.session_state.pop("captura_actual", None)
+    st.session_state.pop(f"marcas|{materia}|{unidad}|", None)  # la nueva empieza en blanco
+    st.rerun()
+
+if btn_guardar and captura and guardados is not None:
+    # === Volver a guardar: sólo las celdas que cambiaron ===
+    # Una marca sin cambio conserva el valor guardado (p. ej. un retardo "~")
+    stats = enqueue_attendance_changes(materia, captura["columna"], merge_marks(guardados, marcas))
+    st.session_state[clave] = marcas
+    st.session_state[f"{clave}|v"] += 1
+    if stats["cells"]:
+        st.success(f"✅ {stats['cells']} cambio(s) guardados en: {captura['columna']}")
+    else:
+        st.info("Sin cambios respecto a lo guardado.")
+    st.caption(
+        f"Guardado local en {stats['seconds'] * 1000:.0f} ms | "
+        f"Pendientes de sincronizar: {stats['pending']}"
+    )
+
+elif btn_guardar and captura:
+    # === Captura abierta pero sin columna legible (cambió la lista o no se encontró) ===
+    # Se reescribe completa la MISMA columna en vez de crear una nueva; cada
+    # alumno conserva lo ya guardado (p. ej. un retardo "~") si su casilla no cambió
+    stats = enqueue_attendance_column(materia, captura["columna"], merge_marks(previos, marcas))
+    st.session_state[clave] = marcas
+    st.session_state[f"{clave}|v"] += 1
+    st.success(f"✅ Asistencia reescrita en: {captura['columna']}")
+    st.caption(
+        f"Guardado local en {stats['seconds'] * 1000:.0f} ms | "
+        f"Pendientes de sincronizar: {stats['pending']}"
+    )
+
+elif btn_guardar:
     # [NUEVO] Tomar la hora local SOLO aquí (se “congela” en el clic)
     ahora = datetime.now(zona)  # hora MX
     hora_captura = ahora.strftime("%H:%M")
@@ -85,23 +203,24 @@ if btn_guardar:
     st.session_state["ultima_hora_captura"] = hora_captura
     st.session_state["ultima_columna"] = fecha_col
 
-    # === Crear columna si no existe ===
-    # [MOVIDO] Este chequeo estaba antes de la UI y creaba columnas por minuto.
-    #          Ahora se hace aquí, solo al guardar.
-    headers = ws.row_values(1)
-    if fecha_col in headers:
-        col_idx = headers.index(fecha_col) + 1
-    else:
-        col_idx = len(headers) + 1
-        ws.update_cell(1, col_idx, fecha_col)
+    # === Guardar encabezado + columna completa ===
+    # [CAMBIO] La captura se escribe primero en la bitácora local (fsync) y se confirma
+    #          de inmediato; un hilo la sube a Sheets en un solo update de rango con reintentos.
+    asistencia = ["✓" if m else "✗" for m in marcas]
+    stats = enqueue_attendance_column(materia, fecha_col, asistencia)
 
-    # === Guardar asistencia en la hoja ===
-    # Las filas de datos empiezan en la 2 (fila 1 = encabezados)
-    for i, valor in enumerate(asistencia, start=2):
-        ws.update_cell(i, col_idx, valor)
+    # La captura queda abierta para corregirla con "Guardar cambios"
+    st.session_state["captura_actual"] = {"materia": materia, "unidad": unidad, "columna": fecha_col}
+    st.session_state[f"marcas|{materia}|{unidad}|{fecha_col}"] = marcas
+    st.session_state[f"marcas|{materia}|{unidad}|{fecha_col}|v"] = 0
 
     st.success(f"✅ Asistencia guardada correctamente en: {fecha_col} (hora: {hora_captura})")
+    st.caption(
+        f"Guardado local en {stats['seconds'] * 1000:.0f} ms | "
+        f"Pendientes de sincronizar: {stats['pending']}"
+    )
 
 # --- NOTAS ---
-# 1) El uso de st.form impide que cada interacción con los checkboxes regenere la columna.
-# 2) La hora/columna se calculan SOLO cuando presionas “Guardar asistencia”.  
\ No newline at end of file
+# 1) La cuadrícula guarda las marcas en el navegador; nada se escribe hasta pulsar Guardar.
+# 2) La hora/columna se calculan SOLO cuando presionas “Guardar asistencia”.
+# 3) "Guardar cambios" compara contra la columna guardada (incluida la bitácora) y sólo manda las diferencias.
@@ -1,11 +1,28 @@
 import streamlit as st
-import fitz  # PyMuPDF
-import re
 import pandas as pd
-import gspread
 import os
-from google.oauth2.service_account import Credentials
-from gspread.exceptions import WorksheetNotFound, APIError
+import sys
+from typing import List, Optional, Tuple
+from gspread.exceptions import APIError, WorksheetNotFound
+
+# ---  Hacemos que Python vea la carpeta raíz del proyecto ---
+CURRENT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from gsheets_utils import (
+    delete_rows, list_worksheets, read_header, read_values, replace_worksheet, replace_worksheets,
+    update_cells,
+)
+from rate_limiter import set_lane
+from roster_merge import RosterPlan, plan_roster_update
+from roster_parser import (
+    ROSTER_COLUMNS, ParsedFile, Roster, expand_uploads, parse_many, parse_roster, roster_sha256,
+)
+
+# El hilo del script se reutiliza entre páginas: el carril se fija en cada rerun
+set_lane("interactive")
 
 # === Config de página ===
 st.set_page_config(page_title="Cargar Lista de Alumnos", layout="wide")
@@ -17,49 +34,55 @@ def sanitize_title(title: str) -> str:
         title = title.replace(ch, "-")
     return title.strip()[:95]
 
-def create_or_replace_worksheet(sh, title: str, df: pd.DataFrame):
+def sheet_values(df: pd.DataFrame) -> List[List[str]]:
+    """Encabezados + filas como texto, listos para escribir en la hoja."""
+    return [list(df.columns)] + df.astype(str).values.tolist()
+
+def create_or_update_worksheet(
+    title: str, df: pd.DataFrame, delete_removed: bool = False
+) -> Tuple[str, Optional[RosterPlan]]:
+    """
+    Si la pestaña ya existe, aplica sólo las diferencias por No de control
+    (las columnas de asistencia se quedan alineadas); si no, la crea completa.
+    """
     title = sanitize_title(title)
     try:
-        ws = sh.worksheet(title)
-        ws.clear()
+        grid = read_values(title)
     except WorksheetNotFound:
-        rows = max(len(df) + 5, 100)
-        cols = max(len(df.columns) + 5, 20)
-        ws = sh.add_worksheet(title=title, rows=rows, cols=cols)
-
-    # escribe encabezados + datos
-    values = [list(df.columns)] + df.astype(str).values.tolist()
-    ws.update("A1", values)
-    return ws
-
-def _get_spreadsheet_id():
-    # Acepta [general].spreadsheet_id o raíz
-    if "general" in st.secrets and "spreadsheet_id" in st.secrets["general"]:
-        return st.secrets["general"]["spreadsheet_id"]
-    if "spreadsheet_id" in st.secrets:
-        return st.secrets["spreadsheet_id"]
-    disponibles = list(st.secrets.keys())
-    raise KeyError(
-        f'No encontré "spreadsheet_id" en secrets. Claves disponibles: {disponibles}. '
-        'En Cloud agrega [general]\\nspreadsheet_id="..." en Settings → Secrets.'
+        grid = []
+    plan = plan_roster_update(grid, df, delete_removed=delete_removed)
+    if plan is None:
+        replace_worksheet(title, sheet_values(df))
+        return title, None
+    if plan.delete_rows:
+        delete_rows(title, plan.delete_rows)
+    if plan.cells:
+        update_cells(title, plan.cells)
+    return title, plan
+
+def describe_plan(plan: RosterPlan, delete_removed: bool) -> str:
+    salen = "borrados" if delete_removed else "conservados (ya no vienen en la lista)"
+    return (
+        f"{len(plan.added)} nuevos · {len(plan.removed)} {salen} · "
+        f"{len(plan.renamed)} con nombre corregido · {len(plan.updated)} con grupo/docente distinto"
     )
 
-def subir_a_google_sheets(nombre_hoja: str, df: pd.DataFrame):
+def subir_a_google_sheets(nombre_hoja: str, df: pd.DataFrame, delete_removed: bool = False):
     try:
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
-        creds = Credentials.from_service_account_info(
-            st.secrets["service_account"], scopes=scopes
-        )
-        client = gspread.authorize(creds)
-
-        spreadsheet_id = _get_spreadsheet_id()
-        sh = client.open_by_key(spreadsheet_id)
-
-        ws = create_or_replace_worksheet(sh, nombre_hoja, df)
-        st.success(f"✅ Hoja '{ws.title}' creada/actualizada en Google Sheets.")
+        titulo, plan = create_or_update_worksheet(nombre_hoja, df, delete_removed)
+        if plan is None:
+            st.success(f"✅ Hoja '{titulo}' creada en Google Sheets.")
+        elif plan.is_empty:
+            st.success(f"✅ Hoja '{titulo}' sin cambios: la lista ya estaba al día.")
+        else:
+            st.success(f"✅ Hoja '{titulo}' actualizada: {describe_plan(plan, delete_removed)}.")
+            if plan.renamed:
+                st.dataframe(
+                    pd.DataFrame(plan.renamed, columns=["No de control", "Antes", "Ahora"]),
+                    hide_index=True,
+                )
+            if plan.removed and not delete_removed:
+                st.info(f"Alumnos que ya no vienen en la lista: {', '.join(plan.removed)}")
 
         # Limpieza opcional del PDF temporal
         if os.path.exists("doc.pdf"):
@@ -71,6 +94,94 @@ def subir_a_google_sheets(nombre_hoja: str, df: pd.DataFrame):
     except Exception as e:
         st.error(f"❌ Error inesperado: {e}")
 
+# Interpreta el PDF una sola vez por contenido (SHA-256): los reruns (p. ej. "Verificar")
+# reutilizan la lista ya interpretada
+@st.cache_data(show_spinner=False, max_entries=32)
+def leer_lista(sha256: str, _data: bytes) -> Roster:
+    return parse_roster(_data, sha256)
+
+# Varios PDF (o ZIP): se interpretan en paralelo en un pool de procesos
+@st.cache_data(show_spinner=False, max_entries=8)
+def leer_listas(llave: Tuple[Tuple[str, str], ...], _archivos: List[Tuple[str, bytes]]) -> List[ParsedFile]:
+    return parse_many(expand_uploads(_archivos))
+
+def carga_masiva():
+    archivos = st.file_uploader(
+        "📎 Sube varias listas en PDF o un ZIP con ellas:",
+        type=["pdf", "zip"],
+        accept_multiple_files=True,
+    )
+    if not archivos:
+        st.info("Sube uno o más PDF (o un ZIP) para continuar.")
+        st.stop()
+
+    datos = [(a.name, a.getvalue()) for a in archivos]
+    llave = tuple((nombre, roster_sha256(b)) for nombre, b in datos)
+    with st.spinner(f"Interpretando {len(datos)} archivo(s)..."):
+        resultados = leer_listas(llave, datos)
+
+    # === Vista previa consolidada ===
+    listas = {}
+    filas = []
+    for r in resultados:
+        titulo = sanitize_title(r.roster.title) if r.roster else ""
+        filas.append({
+            "Archivo": r.name,
+            "Pestaña": titulo,
+            "Materia": r.roster.materia if r.roster else "",
+            "Grupo": r.roster.grupo if r.roster else "",
+            "Docente": r.roster.docente if r.roster else "",
+            "Alumnos": len(r.roster.students) if r.roster else 0,
+            "Error": r.error or ("" if r.roster and r.roster.students else "Sin alumnos detectados"),
+        })
+        if r.roster and r.roster.students:
+            listas[titulo] = r.roster  # si dos PDF dan la misma pestaña, gana el último
+
+    resumen = pd.DataFrame(filas)
+    st.success(f" {len(listas)} listas listas para subir ({int(resumen['Alumnos'].sum())} alumnos)")
+    st.dataframe(resumen, use_container_width=True, hide_index=True)
+
+    repetidas = resumen.loc[resumen["Pestaña"].ne("") & resumen["Pestaña"].duplicated(), "Pestaña"].unique()
+    if len(repetidas):
+        st.warning(f"Pestañas repetidas (se usa el último archivo): {', '.join(repetidas)}")
+
+    with st.expander("Alumnos de todas las listas"):
+        if listas:
+            st.dataframe(
+                pd.concat([l.to_df().assign(Pestaña=t) for t, l in listas.items()], ignore_index=True),
+                use_container_width=True,
+            )
+
+    if listas and st.button(f" Crear/actualizar {len(listas)} pestañas en Google Sheets"):
+        try:
+            # Nuevas: todas en lote. Existentes: sólo diferencias (no se pierde la asistencia)
+            existentes = set(list_worksheets())
+            nuevas = {t: sheet_values(l.to_df()) for t, l in listas.items() if t not in existentes}
+            if nuevas:
+                res = replace_worksheets(nuevas)
+                st.success(
+                    f"✅ {res['created']} pestañas creadas "
+                    f"({res['api_calls']} llamadas a la API, {res['seconds']:.1f} s)."
+                )
+            for t, l in listas.items():
+                if t in existentes:
+                    _, plan = create_or_update_worksheet(t, l.to_df())
+                    if plan is not None and not plan.is_empty:
+                        st.write(f"'{t}': {describe_plan(plan, False)}")
+            if len(nuevas) < len(listas):
+                st.success(f"✅ {len(listas) - len(nuevas)} pestañas existentes actualizadas.")
+        except KeyError as e:
+            st.error(f"❌ Falta clave en secrets: {e}")
+        except APIError as e:
+            st.error(f"❌ Error Google API (revisa ID y permisos): {e}")
+        except Exception as e:
+            st.error(f"❌ Error inesperado: {e}")
+
+modo = st.radio("Modo", ["Una lista", "Carga masiva (varios PDF o ZIP)"], horizontal=True)
+if modo != "Una lista":
+    carga_masiva()
+    st.stop()
+
 # === Subir archivo PDF ===
 archivo_pdf = st.file_uploader("📎 Sube la lista en PDF descargada del SII:", type=["pdf"])
 
@@ -79,86 +190,11 @@ if not archivo_pdf:
     st.info("Sube un PDF para continuar.")
     st.stop()
 
-# Abre y lee el PDF
-doc = fitz.open(stream=archivo_pdf.read(), filetype="pdf")
-texto = "".join(p.get_text() for p in doc)
-lineas = texto.split("\n")
-
-materia, grupo, docente = "", "", ""
-
-# === Analizar encabezado ===
-for i, linea in enumerate(lineas):
-    u = linea.upper().strip()
-    if "MATERIA" in u and i + 3 < len(lineas):
-        materia = lineas[i + 3].strip()
-    elif "GRUPO" in u:
-        for l in lineas[i:i + 5]:
-            s = l.strip()
-            if re.match(r"^\d{3}$", s):  # p. ej. 611, 053
-                grupo = s
-                break
-    elif "CATEDRATICO" in u and i + 2 < len(lineas):
-        docente = lineas[i + 2].strip()
-
-# === Extraer alumnos (robusto con R/E/**, etc.) ===
-alumnos = []
-
-# Patrones
-NUM_RE = re.compile(r"^\d+$")                                     # "1", "2", ...
-NUM_MAS_MARCA_RE = re.compile(r"^\d+\s+(?:[A-ZÁÉÍÓÚÑ]|\*{1,3})$")  # "10 R" o "20 **"
-MARCA_SOLO_RE = re.compile(r"^(?:[A-ZÁÉÍÓÚÑ]|\*{1,3})$")          # "R", "E", "*", "**", "***"
-NC_RE = re.compile(r"^[C]?\d{8}$")                                # Cdddddddd o dddddddd
-
-i, N = 0, len(lineas)
-while i < N:
-    linea = lineas[i].strip()
-
-    # Inicio de fila por número o "número + marca"
-    if NUM_RE.match(linea) or NUM_MAS_MARCA_RE.match(linea):
-        i += 1
-        if i >= N:
-            break
-
-        # Saltar marcas sueltas en la columna intermedia
-        while i < N and MARCA_SOLO_RE.match(lineas[i].strip()):
-            i += 1
-            if i >= N:
-                break
-        if i >= N:
-            break
-
-        # Nombre (tolerar línea vacía extra)
-        nombre = lineas[i].strip()
-        if nombre == "" and i + 1 < N:
-            i += 1
-            nombre = lineas[i].strip()
-
-        # Limpiar marca pegada al nombre (p. ej. "R ORTIZ..." o "** TORRES...")
-        nombre = re.sub(r"^(?:[A-ZÁÉÍÓÚÑ]|\*{1,3})\s+", "", nombre)
-        # Colapsar espacios dobles
-        nombre = re.sub(r"\s{2,}", " ", nombre).strip()
-
-        # Buscar No. de control en las siguientes 3 líneas
-        no_control = ""
-        j = i + 1
-        while j < min(N, i + 4) and no_control == "":
-            cand = lineas[j].strip()
-            if NC_RE.match(cand):
-                no_control = cand
-                i = j + 1
-                break
-            j += 1
-
-        if no_control:
-            alumnos.append({"nombre": nombre, "no_control": no_control})
-            continue
-        else:
-            i += 1
-            continue
-    else:
-        i += 1
-
-# ---------- A PARTIR DE AQUÍ TODO VA *FUERA* DEL WHILE ----------
+# Lee el PDF (página por página, memorizado por SHA-256)
+data = archivo_pdf.getvalue()
+lista = leer_lista(roster_sha256(data), data)
+materia, grupo, docente = lista.materia, lista.grupo, lista.docente
+alumnos = lista.students
 
 st.success(f" Lista detectada con éxito: {len(alumnos)} alumnos")
 st.write(f" Materia: `{materia}`")
@@ -166,29 +202,25 @@ st.write(f" Grupo: `{grupo}`")
 st.write(f" Docente: `{docente}`")
 
 # === DataFrame con ENCABEZADOS EXACTOS que esperan tus gráficas ===
-df = pd.DataFrame(
-    [["", "", "", a["no_control"], a["nombre"], grupo, docente] for a in alumnos],
-    columns=["Dirección", "Telefono", "Correo", "No de control", "Nombre", "Grupo", "Docente"]
-)
+df = lista.to_df()
 st.dataframe(df, use_container_width=True)
 
 # === Subir a Google Sheets (NOMBRE DE PESTAÑA = grupo - materia) ===
-titulo_hoja = f"{grupo} - {materia}".strip()
+titulo_hoja = lista.title
 
+borrar_bajas = st.checkbox(
+    "Borrar las filas de alumnos que ya no vienen en la lista (se pierde su asistencia)",
+    value=False,
+    key=f"chk_bajas_{titulo_hoja}",
+)
 if st.button(" Crear/actualizar pestaña en Google Sheets", key=f"btn_subir_{titulo_hoja}"):
-    subir_a_google_sheets(nombre_hoja=titulo_hoja, df=df)
+    subir_a_google_sheets(nombre_hoja=titulo_hoja, df=df, delete_removed=borrar_bajas)
 
 # (Opcional) Verificar encabezados sin modificar nada
 if st.button(" Verificar en Google Sheets", key=f"btn_verificar_{titulo_hoja}"):
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        creds = Credentials.from_service_account_info(st.secrets["service_account"], scopes=scopes)
-        client = gspread.authorize(creds)
-        sh = client.open_by_key(_get_spreadsheet_id())
-        ws = sh.worksheet(titulo_hoja)
-        headers = ws.row_values(1)
+        headers = read_header(sanitize_title(titulo_hoja))
         st.write("**Encabezados en A1..:**", headers)
-        st.write("**(Deben ser exactamente)**:",
-                 ["Dirección","Telefono","Correo","No de control","Nombre","Grupo","Docente"])
+        st.write("**(Deben ser exactamente)**:", ROSTER_COLUMNS)
     except Exception as e:
         st.error(f"❌ No se pudo verificar: {e}")
@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
-from typing import List, Dict
+from pandas.api.types import union_categoricals
+from typing import Dict, List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys, os
 
 # ---  Hacemos que Python vea la carpeta raíz del proyecto ---
@@ -11,13 +15,23 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 # ---  Importamos las funciones que ya usas para leer Google Sheets ---
-from gsheets_utils import get_sheet, read_ws_df
+from attendance_matrix import AttendanceMatrix
+from header_index import header_index
+from olap_cube import DIMENSIONS, RATES, AttendanceCube
+from summary_sheet import materia_rates
+from gsheets_utils import (
+    SHEET_NAME, RateLimitExceeded, cached_read, data_version, get_frame_cache, list_worksheets, iter_ws_dfs,
+    read_summary, summary_ready,
+)
+from rate_limiter import set_lane
+
+# Las lecturas de tableros ceden el paso a las capturas de asistencia
+set_lane("dashboard")
 
 # =========================
 # CONFIG APP
 # =========================
 # st.set_page_config(page_title="Comparativo de Materias", layout="wide")
-SHEET_NAME = st.secrets.get("SHEET_NAME", "Seguimiento_Asistencia_2025_2")
 
 st.title(" Comparativo de Asistencia por Materia")
 
@@ -25,224 +39,158 @@ st.title(" Comparativo de Asistencia por Materia")
 # HELPERS
 # =========================
 
-@st.cache_data(ttl=300, show_spinner=False)
 def get_worksheet_titles(spreadsheet_name: str) -> List[str]:
     """Regresa lista de worksheets (cada una es una materia)."""
-    sh = get_sheet(spreadsheet_name)
-    return [ws.title for ws in sh.worksheets()]
-
-def is_attendance_column(col: str) -> bool:
-    """
-    Decide si una columna es una sesión de asistencia.
-    Heurística: columnas que empiezan con 'Unidad', 'U', 'Proped', 'Tutor'
-    Ejemplo real:
-    'Unidad 2 - 15/10/2025 10:00'
-    """
-    if not isinstance(col, str):
-        return False
-    low = col.lower().strip()
-    if low.startswith("unidad"):
-        return True
-    if low.startswith("u") and any(ch.isdigit() for ch in low):
-        return True
-    if low.startswith("proped"):
-        return True
-    if low.startswith("tutor"):
-        return True
-    return False
-
-def normalize_attendance(value: str) -> Dict[str, int]:
-    """
-    Convierte ✓, ~ / r, ✗ en indicadores binarios.
-    """
-    if not isinstance(value, str):
-        return {"present": 0, "tardy": 0, "absent": 0}
-    v = value.strip().lower()
-    if v == "✓":
-        return {"present": 1, "tardy": 0, "absent": 0}
-    if v in ("~", "r"):
-        return {"present": 0, "tardy": 1, "absent": 0}
-    if v == "✗":
-        return {"present": 0, "tardy": 0, "absent": 1}
-    return {"present": 0, "tardy": 0, "absent": 0}
-
-def parse_unidad(col_name: str) -> str:
-    """
-    Extrae la 'unidad' a partir del nombre de la columna.
-    Ejemplos que intentamos mapear:
-    - 'Unidad 3 - 15/10/2025 10:00' -> 'Unidad 3'
-    - 'Propedéutico - 12/09/2025' -> 'Propedéutico'
-    - 'Tutoría - 20/09/2025' -> 'Tutoría'
-    - 'U4 - 01/10/2025' -> 'Unidad 4'
-    """
-    import re
-    import unicodedata
-
-    txt = str(col_name or "")
-    # Parte antes del primer " - "
-    prefix = txt.split(" - ", 1)[0].strip()
-
-    # normalizar sin acentos
-    def norm(x):
-        return "".join(
-            c for c in unicodedata.normalize("NFD", x)
-            if unicodedata.category(c) != "Mn"
-        ).lower()
-
-    n = norm(prefix)
-
-    if "propedeutico" in n:
-        return "Propedéutico"
-    if "tutoria" in n:
-        return "Tutoría"
-
-    # Buscar unidad numérica: "unidad 3", "u3", etc.
-    m = re.search(r"(?:unidad|u)\s*-?\s*(\d+)", n)
-    if m:
-        return f"Unidad {int(m.group(1))}"
-
-    # Si no encontramos nada claro, devolvemos el prefijo tal cual
-    return prefix
-
-def parse_datetime_from_col(col_name: str):
-    """
-    Intenta extraer la fecha/hora de la parte después de ' - ' en el header.
-    Ejemplo: 'Unidad 2 - 15/10/2025 10:00'
-    Devuelve un datetime (o None si no se puede).
-    """
-    import datetime
-
-    txt = str(col_name or "")
-    # Parte DESPUÉS del primer " - "
-    parts = txt.split(" - ", 1)
-    if len(parts) < 2:
-        return None
-
-    fecha_txt = parts[1].strip()
-
-    # Probamos algunos formatos comunes
-    formatos = [
-        "%d/%m/%Y %H:%M",
-        "%d/%m/%Y %H:%M:%S",
-        "%d/%m/%Y",
-    ]
-    for fmt in formatos:
-        try:
-            return datetime.datetime.strptime(fecha_txt, fmt)
-        except Exception:
-            pass
-    return None
+    return list_worksheets(spreadsheet_name)
+
+# Formato largo compacto: textos repetidos como categorías, un solo código
+# de estado int8 (0 sin dato, 1 ✓, 2 ~, 3 ✗) y dt como datetime64.
+LONG_COLUMNS = ["materia", "No de control", "Nombre", "grupo", "docente", "unidad", "fecha_col", "dt", "status"]
+CATEGORY_COLUMNS = ["materia", "No de control", "Nombre", "grupo", "docente", "unidad", "fecha_col"]
+# columnas por alumno en la hoja -> columna en formato largo
+STUDENT_COLUMNS = {"No de control": "No de control", "Nombre": "Nombre", "Grupo": "grupo", "Docente": "docente"}
+
+def empty_long() -> pd.DataFrame:
+    """DataFrame largo vacío con los mismos tipos que melt_attendance."""
+    out = pd.DataFrame({c: pd.Categorical([]) for c in CATEGORY_COLUMNS})
+    out["dt"] = pd.Series([], dtype="datetime64[ns]")
+    out["status"] = pd.Series([], dtype="int8")
+    return out[LONG_COLUMNS]
 
 def melt_attendance(df: pd.DataFrame, materia: str) -> pd.DataFrame:
     """
-    Pasa una hoja (wide) a formato largo estándar:
+    Pasa una hoja (wide) a formato largo estándar (orden por sesión, igual que melt):
     columnas finales:
-    - materia
-    - No de control
-    - Nombre
-    - unidad
-    - fecha_col  (el nombre original de la columna de asistencia)
-    - dt         (datetime parseado del header si existe)
-    - present / tardy / absent
+    - materia, No de control, Nombre, grupo, docente, unidad, fecha_col  (category)
+    - dt      (datetime64 parseado del header; NaT si no tiene fecha)
+    - status  (int8: 0 sin dato, 1 ✓, 2 ~ / r, 3 ✗)
     """
-    # columnas base mínimas
-    id_cols = []
-    if "No de control" in df.columns:
-        id_cols.append("No de control")
-    if "Nombre" in df.columns:
-        id_cols.append("Nombre")
-
-    # columnas de asistencia
-    att_cols = [c for c in df.columns if is_attendance_column(c)]
-
-    if not att_cols or not id_cols:
-        return pd.DataFrame(
-            columns=[
-                "materia", "No de control", "Nombre",
-                "unidad", "fecha_col", "dt",
-                "present", "tardy", "absent",
-            ]
-        )
-
-    # pasamos a formato largo
-    long_df = df[id_cols + att_cols].melt(
-        id_vars=id_cols,
-        value_vars=att_cols,
-        var_name="fecha_col",
-        value_name="raw",
-    )
-
-    # normalizamos asistencia
-    norm_vals = long_df["raw"].apply(normalize_attendance).apply(pd.Series)
-    long_df = pd.concat([long_df.drop(columns=["raw"]), norm_vals], axis=1)
-
-    # agregar materia
-    long_df["materia"] = materia
-
-    # unidad
-    long_df["unidad"] = long_df["fecha_col"].apply(parse_unidad)
+    # columnas base mínimas (si falta alguna se llena con "")
+    id_cols = [c for c in ("No de control", "Nombre") if c in df.columns]
+
+    # columnas de asistencia (índice de encabezados: cada header se interpreta una vez)
+    idx = header_index(df.columns)
+    att_info = idx.attendance
+    att_cols = [df.columns[c.position] for c in att_info]
+
+    if not id_cols or not att_cols:
+        return empty_long()
+
+    n_alumnos, n_sesiones = len(df), len(att_cols)
+    n = n_alumnos * n_sesiones
+
+    # normalizamos asistencia: ✓, ~ / r, ✗ -> matriz int8 alumnos × sesiones en
+    # una sola pasada (la misma de graficas); orden por columnas, igual que melt
+    codes = AttendanceMatrix.from_df(df, att_cols).codes.ravel(order="F")
+
+    # por sesión: se repite para cada alumno; por alumno: se repite para cada sesión
+    sesion = np.repeat(np.arange(n_sesiones, dtype=np.int32), n_alumnos)
+    unidades = pd.Categorical([c.unit for c in att_info])
+    fechas = pd.to_datetime(pd.Series([c.dt for c in att_info], dtype=object)).to_numpy(dtype="datetime64[ns]")
+
+    out = {"materia": pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [materia])}
+    for col, destino in STUDENT_COLUMNS.items():
+        alumnos = pd.Categorical(df[col].astype(str) if col in df.columns else [""] * n_alumnos)
+        out[destino] = pd.Categorical.from_codes(np.tile(alumnos.codes, n_sesiones), alumnos.categories)
+    out["unidad"] = pd.Categorical.from_codes(unidades.codes[sesion], unidades.categories)
+    out["fecha_col"] = pd.Categorical.from_codes(sesion, pd.Index([str(c) for c in att_cols]))
+    out["dt"] = fechas[sesion]
+    out["status"] = codes
+
+    return pd.DataFrame(out)[LONG_COLUMNS]
+
+def concat_long(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatena frames largos sin perder las categorías (pd.concat las volvería object)."""
+    if not frames:
+        return empty_long()
+    out = {
+        c: union_categoricals([f[c] for f in frames], ignore_order=True)
+        for c in CATEGORY_COLUMNS
+    }
+    out["dt"] = np.concatenate([f["dt"].to_numpy() for f in frames])
+    out["status"] = np.concatenate([f["status"].to_numpy() for f in frames])
+    return pd.DataFrame(out)[LONG_COLUMNS]
 
-    # dt (datetime real del encabezado)
-    long_df["dt"] = long_df["fecha_col"].apply(parse_datetime_from_col)
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
 
-    return long_df
+TIEMPOS_COLUMNS = ["materia", "origen", "lectura_s", "normalizacion_s", "filas"]
 
-@st.cache_data(ttl=60, show_spinner=False)
-def load_materias_long(spreadsheet_name: str, materias: List[str]) -> pd.DataFrame:
+def load_materias_long(spreadsheet_name: str, materias: List[str]) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
     """
-    Lee varias worksheets (materias), convierte cada una con melt_attendance,
-    y concatena todo en un DataFrame largo.
+    Formato largo de varias materias con el caché de DataFrames del proceso:
+    cada materia se guarda una vez (por versión). Las que faltan se leen en un
+    solo lote y se convierten con melt_attendance en paralelo conforme llegan.
+    Regresa {materia: formato largo} (sin las vacías) y los tiempos por materia.
     """
-    frames = []
+    cache = get_frame_cache()
+    versiones = {m: data_version([m], spreadsheet_name) for m in materias}
+
+    frames = {}
+    tiempos = []
+    faltan = []
     for m in materias:
-        df_raw = read_ws_df(spreadsheet_name, m)  # viene cacheado desde utils
-        if df_raw is None or df_raw.empty:
-            continue
+        long_m = cache.get(("long", spreadsheet_name, m), versiones[m])
+        if long_m is None:
+            faltan.append(m)
+        else:
+            frames[m] = long_m
+            tiempos.append({"materia": m, "origen": "caché", "lectura_s": 0.0, "normalizacion_s": 0.0, "filas": len(long_m)})
+
+    def melt_timed(df_raw: pd.DataFrame, m: str):
+        t0 = time.perf_counter()
         long_m = melt_attendance(df_raw, m)
-        if long_m is not None and not long_m.empty:
-            frames.append(long_m)
-
-    if not frames:
-        return pd.DataFrame(
-            columns=[
-                "materia", "No de control", "Nombre",
-                "unidad", "fecha_col", "dt",
-                "present", "tardy", "absent",
-            ]
-        )
-
-    return pd.concat(frames, ignore_index=True)
-
-def build_summary(long_df: pd.DataFrame) -> pd.DataFrame:
+        return long_m, time.perf_counter() - t0
+
+    if faltan:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futuros = {}
+            for m, df_raw, lectura_s in iter_ws_dfs(faltan, spreadsheet_name):
+                if df_raw is None or df_raw.empty:
+                    long_m = empty_long()
+                    cache.put(("long", spreadsheet_name, m), versiones[m], long_m)
+                    tiempos.append({"materia": m, "origen": "hoja", "lectura_s": lectura_s, "normalizacion_s": 0.0, "filas": 0})
+                    continue
+                futuros[pool.submit(melt_timed, df_raw, m)] = (m, lectura_s)
+            for fut in as_completed(futuros):
+                m, lectura_s = futuros[fut]
+                long_m, norm_s = fut.result()
+                cache.put(("long", spreadsheet_name, m), versiones[m], long_m)
+                tiempos.append({"materia": m, "origen": "hoja", "lectura_s": lectura_s, "normalizacion_s": norm_s, "filas": len(long_m)})
+                if not long_m.empty:
+                    frames[m] = long_m
+
+    frames = {m: f for m, f in frames.items() if not f.empty}
+    orden = {m: i for i, m in enumerate(materias)}
+    tiempos_df = pd.DataFrame(tiempos, columns=TIEMPOS_COLUMNS)
+    tiempos_df = tiempos_df.sort_values("materia", key=lambda c: c.map(orden)).reset_index(drop=True)
+
+    return frames, tiempos_df
+
+def load_cube(spreadsheet_name: str, materias: List[str], frames: Dict[str, pd.DataFrame]) -> AttendanceCube:
     """
-    Calcula % de asistencia / retardo / ausencia por materia.
-    (promedio de las banderas binarias)
+    UN cubo materia × unidad × semana × grupo × docente con todas las materias
+    (por versión de la hoja); cada selección es un slice, no otro cubo.
     """
-    if long_df.empty:
-        return pd.DataFrame(columns=["materia","present_rate","tardy_rate","absent_rate"])
-
-    summary = (
-        long_df.groupby("materia", as_index=False)[["present","tardy","absent"]]
-        .mean()
-        .rename(columns={
-            "present": "present_rate",
-            "tardy":   "tardy_rate",
-            "absent":  "absent_rate",
-        })
+    return cached_read(
+        ("cube", spreadsheet_name, tuple(materias)),
+        data_version(materias, spreadsheet_name),
+        lambda: AttendanceCube.from_long(concat_long([frames[m] for m in materias if m in frames])),
     )
 
-    # asegurar float
-    for c in ["present_rate","tardy_rate","absent_rate"]:
-        summary[c] = pd.to_numeric(summary[c], errors="coerce").fillna(0.0).astype(float)
-
-    return summary
+def build_summary(cubo: AttendanceCube, unidades: List[str]) -> pd.DataFrame:
+    """
+    Calcula % de asistencia / retardo / ausencia por materia desde el cubo
+    (las celdas sin dato cuentan en el denominador).
+    """
+    return cubo.slice(unidad=unidades).rollup("materia")[["materia"] + list(RATES)]
 
-def build_unidades_sorted(long_df: pd.DataFrame) -> List[str]:
+def build_unidades_sorted(cubo: AttendanceCube) -> List[str]:
     """
     Devuelve lista de unidades únicas ordenadas lógicamente:
-    Unidad 1, Unidad 2, ..., Propedéutico, Tutoría, etc.
+    Unidad 1, Unidad 2, ..., Propedéutico, Tutoría, Asesoría, etc.
     """
-    raw = long_df["unidad"].dropna().unique().tolist()
+    raw = [u for u in cubo.members("unidad") if u]
 
     def sort_key(u):
         # Unidad X primero en orden numérico
@@ -257,6 +205,8 @@ def build_unidades_sorted(long_df: pd.DataFrame) -> List[str]:
             return (1, 0)
         if u == "Tutoría":
             return (1, 1)
+        if u == "Asesoría":
+            return (1, 2)
         # lo demás al final
         return (2, str(u))
 
@@ -271,6 +221,20 @@ if not ws_titles:
     st.error("No se encontraron materias / worksheets en la hoja.")
     st.stop()
 
+# =========================
+# Panorama de todas las materias (hoja "_resumen", sin bajar las materias)
+# =========================
+with st.expander("Panorama de todas las materias (hoja _resumen)"):
+    panorama = materia_rates(read_summary(SHEET_NAME)) if summary_ready() else None
+    if panorama is None:
+        st.caption("El resumen se está reconstruyendo después de un error; vuelve a abrirlo en unos momentos.")
+    elif panorama.empty:
+        st.caption('Aún no hay resumen; se llena con cada captura o desde "Diagnóstico".')
+    else:
+        for col in ["present_rate", "tardy_rate", "absent_rate"]:
+            panorama[col] = (panorama[col] * 100.0).round(1)
+        st.dataframe(panorama, use_container_width=True, hide_index=True)
+
 st.subheader("1. Selecciona las materias que quieres comparar")
 materias_sel = st.multiselect(
     "Materias",
@@ -285,10 +249,29 @@ if not materias_sel:
 # =========================
 # Cargar datos largos
 # =========================
-with st.spinner("Cargando y normalizando asistencia..."):
-    df_long = load_materias_long(SHEET_NAME, materias_sel)
+# El cubo se arma una vez con todas las materias; cambiar la selección sólo
+# hace un slice (los formatos largos de cada materia ya están en caché).
+try:
+    with st.spinner("Cargando y normalizando asistencia..."):
+        frames_long, tiempos_carga = load_materias_long(SHEET_NAME, ws_titles)
+        cubo_total = load_cube(SHEET_NAME, ws_titles, frames_long)
+except RateLimitExceeded:
+    st.warning("Google Sheets está saturado en este momento. Intenta de nuevo en unos segundos.")
+    st.stop()
+
+cubo = cubo_total.slice(materia=materias_sel)
 
-if df_long.empty:
+with st.expander("Tiempos de carga por materia"):
+    st.dataframe(tiempos_carga, use_container_width=True, hide_index=True)
+    filas = sum(len(f) for f in frames_long.values())
+    megas = sum(memory_mb(f) for f in frames_long.values())
+    st.caption(f"Formato largo (todas las materias): {filas:,} filas · {megas:.1f} MB en memoria")
+    st.caption(
+        f"Cubo: {len(cubo_total.facts):,} combinaciones materia × unidad × semana × grupo × docente "
+        f"({len(cubo.facts):,} en la selección)"
+    )
+
+if cubo.facts.empty:
     st.warning("No hay datos de asistencia en las materias seleccionadas.")
     st.stop()
 
@@ -296,7 +279,7 @@ if df_long.empty:
 # Filtro opcional por unidad
 # =========================
 st.subheader("2. Filtrar por Unidad (opcional)")
-unidades_disp = build_unidades_sorted(df_long)
+unidades_disp = build_unidades_sorted(cubo)
 
 unidad_sel = st.multiselect(
     "Unidades / bloques",
@@ -306,10 +289,8 @@ unidad_sel = st.multiselect(
 )
 
 if unidad_sel:
-    df_long_filtrado = df_long[df_long["unidad"].isin(unidad_sel)]
     st.caption(f"Mostrando sólo: {', '.join(unidad_sel)}")
 else:
-    df_long_filtrado = df_long.copy()
     st.caption("Mostrando TODAS las unidades.")
 
 # =========================
@@ -317,7 +298,7 @@ else:
 # =========================
 st.subheader("3. Resumen por materia")
 
-resumen = build_summary(df_long_filtrado)
+resumen = build_summary(cubo, unidad_sel)
 
 # Mostrar tabla porcentual
 tabla = resumen.copy()
@@ -375,5 +356,45 @@ else:
 
     st.altair_chart(bars + labels, use_container_width=True)
 
-st.success("Listo: selección de materias ✅, filtro por unidad ✅, resumen ✅, barra horizontal ✅.")
+# =========================
+# Tabla dinámica sobre el cubo
+# =========================
+st.subheader("5. Tabla dinámica (materia × unidad × semana × grupo × docente)")
+
+ETIQUETAS_DIM = {
+    "materia": "Materia",
+    "unidad": "Unidad",
+    "semana": "Semana ISO",
+    "grupo": "Grupo",
+    "docente": "Docente",
+}
+ETIQUETAS_MEDIDA = {
+    "present_rate": "% Asistencia",
+    "tardy_rate": "% Retardos",
+    "absent_rate": "% Faltas",
+    "present": "Asistencias",
+    "tardy": "Retardos",
+    "absent": "Faltas",
+    "total": "Registros",
+}
+
+c1, c2, c3 = st.columns(3)
+filas_dim = c1.selectbox("Filas", DIMENSIONS, format_func=ETIQUETAS_DIM.get)
+columnas_dim = c2.selectbox(
+    "Columnas", (None,) + DIMENSIONS, index=3,
+    format_func=lambda d: "(ninguna)" if d is None else ETIQUETAS_DIM[d],
+)
+medida = c3.selectbox("Medida", list(ETIQUETAS_MEDIDA), format_func=ETIQUETAS_MEDIDA.get)
+
+f1, f2 = st.columns(2)
+grupos_sel = f1.multiselect("Grupos", cubo.members("grupo"), placeholder="(Todos)")
+docentes_sel = f2.multiselect("Docentes", cubo.members("docente"), placeholder="(Todos)")
+
+sub_cubo = cubo.slice(unidad=unidad_sel, grupo=grupos_sel, docente=docentes_sel)
+pivote = sub_cubo.pivot(filas_dim, columnas_dim, value=medida)
+if medida in RATES:
+    pivote = (pivote * 100.0).round(1)
+st.dataframe(pivote, use_container_width=True)
+
+st.success("Listo: selección de materias ✅, filtro por unidad ✅, resumen ✅, barra horizontal ✅, tabla dinámica ✅.")
 
@@ -0,0 +1,230 @@
+import streamlit as st
+import pandas as pd
+import sys, os
+
+# ---  Hacemos que Python vea la carpeta raíz del proyecto ---
+CURRENT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from gsheets_utils import (
+    copy_to_sqlite, discard_journal_dead, journal_backlog, journal_dead, migrate_to_log,
+    retry_journal_dead, read_stats, rebuild_summary, scheduler_stats, summary_stats,
+    cache_stats, flight_stats, snapshot_stats, version_stats,
+)
+from rate_limiter import set_lane
+
+# El hilo del script se reutiliza entre páginas: el carril se fija en cada rerun
+set_lane("interactive")
+
+# === CONFIGURACIÓN DE STREAMLIT ===
+st.set_page_config(page_title="Diagnóstico", layout="wide")
+st.title("Diagnóstico de acceso a Google Sheets")
+
+# === CUOTA DE LA API (planificador global) ===
+st.subheader("Cuota de la API")
+stats = scheduler_stats()
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Tokens de lectura", stats["tokens"]["read"])
+c2.metric("Tokens de escritura", stats["tokens"]["write"])
+c3.metric("Lecturas en cola", stats["waiting"]["read"])
+c4.metric("Escrituras en cola", stats["waiting"]["write"])
+
+carriles = pd.DataFrame([
+    {
+        "Carril": nombre,
+        "Atendidas": s["acquired"],
+        "Rechazadas": s["rejected"],
+        "Espera promedio (s)": round(s["wait_avg_s"], 3),
+        "Espera máxima (s)": round(s["wait_max_s"], 3),
+    }
+    for nombre, s in stats["lanes"].items()
+])
+st.dataframe(carriles, use_container_width=True, hide_index=True)
+
+# === VERSIÓN DE LOS DATOS (llave de los cachés) ===
+st.subheader("Versión de los datos")
+version = version_stats()
+v1, v2, v3, v4 = st.columns(4)
+v1.metric("Consultas a Drive", version["checks"])
+v2.metric("Cambios detectados", version["remote_changes"])
+v3.metric("Ediciones externas", version["external_changes"])
+v4.metric("Escrituras de la app", version["local_writes"])
+st.caption(
+    f"modifiedTime: {version['remote'] or '—'}"
+    + (f" · consultado hace {version['age_s']:.0f} s" if version["age_s"] is not None else "")
+)
+if version["last_error"]:
+    st.caption(f"Último error al consultar la versión: {version['last_error']}")
+
+# === CACHÉ DE DATAFRAMES (LRU con límite de memoria) ===
+st.subheader("Caché de DataFrames")
+cache = cache_stats()
+k1, k2, k3, k4, k5 = st.columns(5)
+k1.metric("Aciertos", cache["hits"])
+k2.metric("Fallos", cache["misses"])
+k3.metric("Desalojos", cache["evictions"])
+k4.metric("Entradas", cache["entries"])
+k5.metric("MB residentes", f"{cache['resident_bytes'] / 1e6:.1f} / {cache['max_bytes'] / 1e6:.0f}")
+if cache["by_kind"]:
+    st.dataframe(
+        pd.DataFrame([
+            {"Tipo": tipo, "Entradas": t["entries"], "MB": round(t["bytes"] / 1e6, 2)}
+            for tipo, t in cache["by_kind"].items()
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+st.caption(
+    f"Versiones reemplazadas: {cache['replaced']} · "
+    f"demasiado grandes para guardarse: {cache['rejected']}"
+)
+
+# === SNAPSHOTS EN DISCO (arranque en frío) ===
+st.subheader("Snapshots en disco")
+snap = snapshot_stats()
+s1, s2, s3, s4, s5 = st.columns(5)
+s1.metric("Archivos", snap["files"])
+s2.metric("MB en disco", f"{snap['bytes'] / 1e6:.1f}")
+s3.metric("Servidos en frío", snap["served"])
+s4.metric("Adoptados sin releer", snap["adopted"])
+s5.metric("Releídos", snap["refreshed"])
+if snap["last_error"]:
+    st.caption(f"Último error con snapshots: {snap['last_error']}")
+
+# === LECTURAS COALESCIDAS (single-flight) ===
+st.subheader("Lecturas compartidas entre sesiones")
+vuelos = flight_stats()
+llaves = vuelos["keys"]
+f1, f2, f3 = st.columns(3)
+f1.metric("Lecturas pedidas", sum(s["calls"] for s in llaves.values()))
+f2.metric("Descargas reales", sum(s["executions"] for s in llaves.values()))
+f3.metric("Descargas ahorradas", sum(s["shared"] for s in llaves.values()))
+if llaves:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Tipo": k[0],
+                "Worksheet": ", ".join(k[2]) if isinstance(k[2], tuple) else k[2],
+                "Versión": k[-1],
+                "Pedidas": s["calls"],
+                "Descargas": s["executions"],
+                "Ahorradas": s["shared"],
+                "Errores": s["errors"],
+                "Última descarga (s)": round(s["last_s"], 3),
+            }
+            for k, s in reversed(list(llaves.items()))
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+st.caption(f"Descargas en curso: {vuelos['in_flight']}")
+
+# === LECTURAS INCREMENTALES ===
+st.subheader("Último refresco por materia")
+lecturas = read_stats()
+if lecturas:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Materia": titulo,
+                "Modo": s["mode"],
+                "Llamadas": s["api_calls"],
+                "Celdas bajadas": s["cells"],
+                "KB bajados": round((s["bytes"] or 0) / 1024, 1),
+            }
+            for titulo, s in lecturas.items()
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+else:
+    st.caption("Todavía no se ha leído ninguna materia en este proceso.")
+
+# === BITÁCORA DE CAPTURAS ===
+st.subheader("Capturas pendientes de sincronizar")
+backlog = journal_backlog()
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Pendientes", backlog["pending"])
+c2.metric("Más antigua (s)", f"{backlog['oldest_age_s']:.0f}")
+c3.metric("Sincronizadas", backlog["flushed"])
+c4.metric("Con error permanente", backlog["dead"])
+if backlog["last_error"]:
+    st.warning(f"Último error al sincronizar: {backlog['last_error']}")
+
+# Lotes apartados: no se reintentan solos para no bloquear las capturas de los demás
+muertas = journal_dead()
+if muertas:
+    st.error("Estas capturas no se pudieron escribir y quedaron apartadas:")
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Id": e["id"],
+                "Materia": e["worksheet"],
+                "Tipo": e["kind"],
+                "Columna": e.get("header", ""),
+                "Capturada": pd.Timestamp(e["ts"], unit="s", tz="UTC").tz_convert("America/Mexico_City").strftime("%d/%m/%Y %H:%M"),
+                "Error": e["error"],
+            }
+            for e in muertas
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+    m1, m2, _ = st.columns([1, 1, 4])
+    if m1.button("Reintentar todas"):
+        retry_journal_dead()
+        st.rerun()
+    if m2.button("Descartar todas"):
+        discard_journal_dead()
+        st.rerun()
+
+# === HOJA DE RESUMEN ===
+st.subheader("Hoja de resumen (_resumen)")
+resumen_stats = summary_stats()
+r1, r2, r3 = st.columns(3)
+r1.metric("Actualizaciones", resumen_stats["updates"])
+r2.metric("Filas reescritas", resumen_stats["rows_touched"])
+r3.metric("Filas agregadas", resumen_stats["rows_added"])
+if resumen_stats["stale"]:
+    st.warning("El resumen no está al día (falló una actualización); se está reconstruyendo.")
+if resumen_stats["last_error"]:
+    st.caption(f"Último error del resumen: {resumen_stats['last_error']}")
+if st.button("Reconstruir resumen"):
+    with st.spinner("Recalculando desde todas las materias..."):
+        res = rebuild_summary()
+    st.success(f"✅ {res['rows']} filas de {res['materias']} materias ({res['seconds']:.1f} s).")
+
+# === MIGRACIÓN A BITÁCORA (FORMATO LARGO) ===
+st.subheader("Migrar asistencia a formato bitácora")
+st.caption(
+    'Copia las columnas "Unidad …" de todas las materias a la pestaña "_log" '
+    '(una fila por alumno y sesión). No borra nada y se puede repetir; '
+    'después activa [storage] layout = "log" en secrets.'
+)
+if st.button("Migrar a bitácora"):
+    with st.spinner("Migrando..."):
+        resumen = migrate_to_log()
+    st.success(f"✅ {sum(resumen.values())} marcas copiadas a la bitácora.")
+    st.dataframe(
+        pd.DataFrame([{"Materia": m, "Marcas nuevas": n} for m, n in resumen.items()]),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+# === COPIA LOCAL EN SQLITE ===
+st.subheader("Copiar a SQLite")
+st.caption(
+    "Copia todas las pestañas de Google Sheets al archivo [storage] sqlite_path "
+    '(reemplaza las que ya tenga); después activa [storage] backend = "sqlite" en secrets.'
+)
+if st.button("Copiar a SQLite"):
+    with st.spinner("Copiando..."):
+        res = copy_to_sqlite()
+    st.success(f"✅ {res['worksheets']} pestañas copiadas a {res['path']} ({res['seconds']:.1f} s).")
+
+if st.button("Actualizar"):
+    st.rerun()
@@ -1,45 +1,47 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import plotly.express as px
-import re
-from collections import defaultdict
+import sys, os
+
+# ---  Hacemos que Python vea la carpeta raíz del proyecto ---
+CURRENT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from header_index import header_index
+from summary_cube import SummaryCube
+from gsheets_utils import SHEET_NAME, RateLimitExceeded, list_worksheets, read_ws_df_versioned
+from rate_limiter import set_lane
+
+# Las lecturas de tableros ceden el paso a las capturas de asistencia
+set_lane("dashboard")
 
 # === CONFIGURACIÓN DE STREAMLIT ===
 st.set_page_config(page_title="Gráficas de Asistencia", layout="wide")
 st.title("Visualización de Asistencia")
 
-# === AUTORIZACIÓN DE GOOGLE SHEETS DESDE SECRETS ===
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(
-    st.secrets["service_account"],
-    scope
-)
-client = gspread.authorize(creds)
-
 # === SELECCIÓN DE MATERIA ===
-SHEET_NAME = "Seguimiento_Asistencia_2025_2"
-sh = client.open(SHEET_NAME)
-materias = [ws.title for ws in sh.worksheets()]
+materias = list_worksheets()
 materia = st.selectbox("Selecciona la materia", materias)
 
 # === CARGAR DATOS ===
-ws = sh.worksheet(materia)
-df = pd.DataFrame(ws.get_all_records())
+try:
+    df, version = read_ws_df_versioned(SHEET_NAME, materia)
+except RateLimitExceeded:
+    st.warning("Google Sheets está saturado en este momento. Intenta de nuevo en unos segundos.")
+    st.stop()
 
 if df.empty:
     st.warning("No hay datos en esta materia.")
     st.stop()
 
 # === EXTRAER COLUMNAS DE ASISTENCIA ===
-asistencia_cols = [col for col in df.columns if col.startswith("Unidad")]
+indice = header_index(df.columns)
+asistencia_cols = indice.attendance_headers()
 
 if not asistencia_cols:
-    st.warning("No se encontraron columnas de asistencia que comiencen con 'Unidad'.")
+    st.warning("No se encontraron columnas de asistencia (p. ej. 'Unidad 1 - 15/10/2025 10:00').")
     st.stop()
 
 columnas_base = ["Nombre", "No de control"]
@@ -49,54 +51,36 @@ if len(columnas_existentes) < 2:
     st.error("Faltan columnas obligatorias: 'Nombre' y/o 'No de control'.")
     st.stop()
 
-df_asistencia = df[columnas_base + asistencia_cols].copy()
-
-# === CONVERTIR ✓ / ~ / ✗ A 1 / 0.5 / 0 ===
-def convertir_asistencia(valor):
-    if valor == "✓":
-        return 1
-    elif valor == "~":
-        return 0.5
-    else:
-        return 0
-
-df_numeric = df_asistencia.copy()
-for col in asistencia_cols:
-    df_numeric[col] = df_numeric[col].apply(convertir_asistencia)
-
-# === AGRUPAR COLUMNAS POR NOMBRE DE UNIDAD ===
-unidad_map = defaultdict(list)
-
-for col in asistencia_cols:
-    if "Propedéutico" in col:
-        unidad_map["Unidad 0 - Propedéutico"].append(col)
-    elif "Asesoría" in col:
-        unidad_map["Unidad A - Asesoría"].append(col)
-    else:
-        match = re.match(r"(Unidad \d+)", col)
-        if match:
-            unidad_base = match.group(1)
-            unidad_map[unidad_base].append(col)
-
-# === CALCULAR EL PROMEDIO DE ASISTENCIA POR UNIDAD (AGRUPADA) ===
-df_numeric_grouped = pd.DataFrame()
-df_numeric_grouped["Nombre"] = df["Nombre"]
-df_numeric_grouped["No de control"] = df["No de control"]
-
-for unidad, columnas in unidad_map.items():
-    # Aquí usamos df_numeric porque ya trae ✓=1, ~=0.5, demás=0
-    df_numeric_grouped[unidad] = df_numeric[columnas].mean(axis=1) * 100
+# === AGRUPAR COLUMNAS POR NOMBRE DE UNIDAD (desde el índice de encabezados) ===
+def etiqueta_unidad(info):
+    if info.kind == "propedeutico":
+        return "Unidad 0 - Propedéutico"
+    if info.kind == "asesoria":
+        return "Unidad A - Asesoría"
+    if info.kind == "unidad":
+        return info.unit
+    return None
+
+# === CUBO RESUMEN (uno por versión de la hoja) ===
+# ✓, ~, ✗ se codifican una sola vez; el puntaje sigue siendo ✓ = 1, ~ = 0.5, demás = 0.
+# La llave es (materia, versión del DataFrame): sale del VersionClock sin tocar
+# las celdas, y cambiar de alumno no vuelve a calcular nada.
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_cube(materia: str, version: str, _df: pd.DataFrame) -> SummaryCube:
+    indice = header_index(_df.columns)
+    unidades_por_col = [etiqueta_unidad(info) for info in indice.attendance]
+    return SummaryCube.from_df(_df, indice.attendance_headers(), unidades_por_col)
+
+cubo = build_cube(materia, version, df)
+nombres = cubo.students["Nombre"]
 
 # === GRÁFICA 1: PORCENTAJE DE ASISTENCIA POR UNIDAD (AGRUPADO) ===
 st.subheader("Porcentaje de asistencia por unidad")
 
-porcentaje_por_unidad = (
-    df_numeric_grouped
-    .drop(columns=["Nombre", "No de control"])
-    .mean()
-    .reset_index()
-)
-porcentaje_por_unidad.columns = ["Unidad", "Porcentaje"]
+porcentaje_por_unidad = pd.DataFrame({
+    "Unidad": cubo.units,
+    "Porcentaje": cubo.unit_percentages().mean(axis=0),
+})
 
 def clasificar_unidad(p):
     if p < 70:
@@ -135,11 +119,8 @@ st.plotly_chart(fig1, use_container_width=True)
 # === GRÁFICA 2: PORCENTAJE DE ASISTENCIA POR ALUMNO ===
 st.subheader("Porcentaje de asistencia por alumno")
 
-asistencia_cols_sin_info = [
-    col for col in df_numeric_grouped.columns if col.startswith("Unidad")
-]
-
-df_numeric_grouped["% Asistencia"] = df_numeric_grouped[asistencia_cols_sin_info].mean(axis=1)
+df_numeric_grouped = cubo.students.copy()
+df_numeric_grouped["% Asistencia"] = cubo.student_percentages()
 df_numeric_grouped["Texto"] = df_numeric_grouped["% Asistencia"].round(1).astype(str) + "%"
 
 def clasificar(asistencia):
@@ -177,11 +158,9 @@ st.plotly_chart(fig2, use_container_width=True)
 # === GRÁFICA 3: DETALLE POR ALUMNO ===
 st.subheader("Historial por alumno")
 
-alumno = st.selectbox("Selecciona un alumno", df_numeric_grouped["Nombre"])
-row = df_numeric_grouped[df_numeric_grouped["Nombre"] == alumno].set_index("Nombre")
-
-unidades = [col for col in df_numeric_grouped.columns if col.startswith("Unidad")]
-valores = row[unidades].values[0]
+alumno = st.selectbox("Selecciona un alumno", nombres)
+unidades = cubo.units
+valores = cubo.unit_percentages()[cubo.student_index(alumno)]
 
 def clasificar_emoji(p):
     if p < 70:
@@ -224,11 +203,7 @@ st.plotly_chart(fig3, use_container_width=True)
 # === GRÁFICA 4: PORCENTAJE GENERAL DE ASISTENCIA DE LA MATERIA ===
 st.subheader("Porcentaje general de asistencia de la materia")
 
-unidad_cols = [col for col in df_numeric.columns if col.startswith("Unidad")]
-
-total_asistencias = df_numeric[unidad_cols].sum().sum()
-total_posibles = df_numeric.shape[0] * len(unidad_cols)
-porcentaje_general = (total_asistencias / total_posibles) * 100 if total_posibles > 0 else 0
+porcentaje_general = cubo.materia_percentage()
 
 if porcentaje_general < 70:
     estado = "🔴 Riesgo"
@@ -266,16 +241,13 @@ st.plotly_chart(fig4, use_container_width=True)
 # === GRÁFICAS DE RETARDOS ===
 st.header("Retardos Registrados")
 
-df_retardos = df.copy()
-retardo_cols = [col for col in df_retardos.columns if col.startswith("Unidad")]
+retardo_cols = cubo.sessions
 
 # === 1. TOTAL DE RETARDOS POR ALUMNO ===
 st.subheader("Total de retardos por alumno")
 
-df_retardos["Total Retardos"] = df_retardos[retardo_cols].apply(
-    lambda row: sum(1 for val in row if val == "~"),
-    axis=1
-)
+df_retardos = cubo.students.copy()
+df_retardos["Total Retardos"] = cubo.student_tardies()
 
 fig_r1 = px.bar(
     df_retardos,
@@ -290,17 +262,9 @@ st.plotly_chart(fig_r1, use_container_width=True)
 # === 2. PORCENTAJE DE RETARDOS POR UNIDAD ===
 st.subheader("Porcentaje de retardos por unidad")
 
-porcentajes_retardos = {}
-
-for col in retardo_cols:
-    total = df_retardos[col].count()
-    retardos = (df_retardos[col] == "~").astype(int).sum()
-    porcentaje = (retardos / total) * 100 if total > 0 else 0
-    porcentajes_retardos[col] = porcentaje
-
 df_porcentaje_retardos = pd.DataFrame({
-    "Unidad": list(porcentajes_retardos.keys()),
-    "Porcentaje de Retardos": list(porcentajes_retardos.values())
+    "Unidad": retardo_cols,
+    "Porcentaje de Retardos": cubo.session_tardy_rates()
 })
 
 fig_r2 = px.bar(
@@ -323,11 +287,7 @@ st.plotly_chart(fig_r2, use_container_width=True)
 # === 3. PORCENTAJE GENERAL DE RETARDOS ===
 st.subheader("Porcentaje general de retardos")
 
-total_registros = df_retardos[retardo_cols].count().sum()
-total_retardos = (df_retardos[retardo_cols] == "~").astype(int).sum().sum()
-porcentaje_general_retardos = (
-    (total_retardos / total_registros) * 100 if total_registros > 0 else 0
-)
+porcentaje_general_retardos = cubo.tardy_percentage()
 
 df_retardo_global = pd.DataFrame({
     "Categoría": ["Materia"],
@@ -354,20 +314,13 @@ st.subheader("Historial de retardos por alumno")
 
 alumno_retardo = st.selectbox(
     "Selecciona un alumno para ver sus retardos",
-    df_retardos["Nombre"],
+    nombres,
     key="select_retardos"
 )
 
-fila = df_retardos[df_retardos["Nombre"] == alumno_retardo]
-
-retardos_por_unidad = {}
-for col in retardo_cols:
-    valor = fila[col].values[0]
-    retardos_por_unidad[col] = 1 if valor == "~" else 0
-
 df_historial_retardos = pd.DataFrame({
-    "Unidad": list(retardos_por_unidad.keys()),
-    "Retardo": list(retardos_por_unidad.values())
+    "Unidad": retardo_cols,
+    "Retardo": cubo.tardy_history(cubo.student_index(alumno_retardo))
 })
 
 fig_r4 = px.bar(
@@ -1,26 +1,27 @@
 import streamlit as st
-import gspread
-import pandas as pd
 from datetime import datetime
-from oauth2client.service_account import ServiceAccountCredentials
 import pytz
-import string
+import sys, os
+
+# ---  Hacemos que Python vea la carpeta raíz del proyecto ---
+CURRENT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from header_index import header_index
+from gsheets_utils import SHEET_NAME, enqueue_attendance_cells, list_worksheets, read_ws_df_pending
+from rate_limiter import set_lane
+
+# Las correcciones de asistencia van en el carril de captura
+set_lane("capture")
 
 # === CONFIGURACIÓN DE STREAMLIT ===
 st.set_page_config(page_title="Corrección de Inasistencias", layout="wide")
 st.title("🕒 Corrección de inasistencias del día")
 
-# === Autenticación con Google Sheets ===
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["service_account"], scope)
-client = gspread.authorize(creds)
-
-# === Acceder al archivo de Google Sheets ===
-SHEET_NAME = "Seguimiento_Asistencia_2025_2"
-sh = client.open(SHEET_NAME)
-
 # === Selección de materia y unidad ===
-materias = [ws.title for ws in sh.worksheets()]
+materias = list_worksheets()
 materia = st.selectbox("📚 Selecciona la materia:", materias)
 
 unidad = st.selectbox("📦 Selecciona la unidad:", ["1", "2", "3", "4", "5", "6", "7", "8", "Asesoría", "Propedéutico"])
@@ -31,8 +32,9 @@ hora_local = datetime.now(pytz.utc).astimezone(zona)
 fecha_hoy = hora_local.strftime('%d/%m/%Y')
 
 # === Leer datos de la hoja seleccionada ===
-ws = sh.worksheet(materia)
-df = pd.DataFrame(ws.get_all_records())
+# Incluye las capturas que la bitácora aún no sube (una captura de hace unos segundos ya aparece)
+df = read_ws_df_pending(SHEET_NAME, materia)
+indice = header_index(df.columns)  # se arma con los encabezados originales
 df.columns = df.columns.str.strip().str.lower()  # 🔧 Normaliza nombres de columnas
 
 if df.empty:
@@ -40,7 +42,7 @@ if df.empty:
     st.stop()
 
 # === Buscar columnas de hoy (independiente de la hora exacta) ===
-columnas_de_hoy = [col for col in df.columns if f"unidad {unidad.lower()} - {fecha_hoy}" in col.lower()]
+columnas_de_hoy = [df.columns[c.position] for c in indice.on_date(hora_local.date(), unit=unidad)]
 
 if not columnas_de_hoy:
     st.warning(f"No se encontró una columna para hoy: Unidad {unidad} - {fecha_hoy}")
@@ -50,9 +52,6 @@ if not columnas_de_hoy:
 fecha_col = columnas_de_hoy[-1]
 col_index = df.columns.get_loc(fecha_col) + 1  # gspread usa índices desde 1
 
-# === Obtener letra de la columna (tipo 'H') ===
-columna_actual = string.ascii_uppercase[col_index - 1]
-
 # === Convertir DataFrame a lista de alumnos (normalizando claves) ===
 alumnos = df.to_dict("records")
 alumnos = [{k.strip().lower(): v for k, v in alumno.items()} for alumno in alumnos]  # 🔧 Normaliza claves
@@ -89,10 +88,13 @@ with col1:
 
 # === Botón para guardar todos los retardos seleccionados ===
 if st.button("✅ Guardar retardos"):
-    hoja = sh.worksheet(materia)
-    for i, alumno in enumerate(alumnos, start=2):  # Asumiendo que fila 1 son encabezados
-        nombre = alumno["nombre"]
-        if nombre in retardos_seleccionados:
-            hoja.update_acell(f"{columna_actual}{i}", "~")
+    # Se juntan todas las celdas a corregir; van a la bitácora detrás de la captura
+    # (que quizá aún no se sube) y el hilo las escribe en un solo batch_update
+    celdas = {
+        (i, col_index): "~"
+        for i, alumno in enumerate(alumnos, start=2)  # Asumiendo que fila 1 son encabezados
+        if alumno["nombre"] in retardos_seleccionados
+    }
+    enqueue_attendance_cells(materia, celdas)
     st.success("✅ Retardos registrados correctamente.")
     st.rerun()
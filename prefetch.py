@@ -0,0 +1,73 @@
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+# =========================
+# PRECARGA EN SEGUNDO PLANO
+# =========================
+# En home.py el docente elige la materia y luego todavía tarda unos segundos en
+# elegir la unidad y pulsar el botón. Ese tiempo se aprovecha: al elegir la
+# materia un hilo corre las etapas de carga (autorización, worksheet, índice de
+# encabezados, lista de alumnos) y deja todo en el caché compartido, así que la
+# página de captura lo encuentra listo. Cada etapa queda cronometrada para
+# mostrar cuánta latencia se ocultó.
+
+class Prefetcher:
+    """Un hilo por llave que corre etapas con nombre; guarda sus tiempos."""
+
+    def __init__(self, fresh_s: float = 60.0, max_keys: int = 50):
+        self.fresh_s = fresh_s      # una precarga terminada hace menos de esto no se repite
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._runs: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._done: Dict[Hashable, threading.Event] = {}
+
+    def start(self, key: Hashable, stages: List[Tuple[str, Callable[[], object]]]) -> bool:
+        """Lanza la precarga; False si ya hay una en curso o una reciente."""
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None:
+                if run["finished"] is None:
+                    return False
+                if time.time() - run["finished"] < self.fresh_s and run["error"] is None:
+                    return False
+            run = {"started": time.time(), "finished": None, "stages": {}, "error": None}
+            self._runs[key] = run
+            self._runs.move_to_end(key)
+            while len(self._runs) > self.max_keys:
+                viejo, _ = self._runs.popitem(last=False)
+                self._done.pop(viejo, None)
+            done = self._done[key] = threading.Event()
+
+        def correr():
+            try:
+                for nombre, fn in stages:
+                    t0 = time.perf_counter()
+                    fn()
+                    run["stages"][nombre] = time.perf_counter() - t0
+            except Exception as e:  # la página de captura hará la lectura normal
+                run["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                run["finished"] = time.time()
+                done.set()
+
+        # El hilo hereda el contexto (p. ej. el carril del planificador)
+        threading.Thread(target=contextvars.copy_context().run, args=(correr,), daemon=True).start()
+        return True
+
+    def wait(self, key: Hashable, timeout: float) -> Optional[Dict]:
+        """Espera a que termine la precarga de la llave (si la hay) y regresa su reporte."""
+        with self._lock:
+            done = self._done.get(key)
+        if done is not None:
+            done.wait(timeout)
+        return self.report(key)
+
+    def report(self, key: Hashable) -> Optional[Dict]:
+        with self._lock:
+            run = self._runs.get(key)
+            if run is None:
+                return None
+            return {**run, "stages": dict(run["stages"])}
@@ -0,0 +1,156 @@
+import time
+import heapq
+import itertools
+import threading
+import contextlib
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# =========================
+# PLANIFICADOR GLOBAL DE PETICIONES A GOOGLE SHEETS
+# =========================
+# Todas las llamadas a Sheets piden un token antes de salir:
+# - una cubeta de tokens por tipo ("read" / "write") del tamaño de la cuota por minuto
+# - carriles de prioridad: "capture" (asistencia) > "interactive" > "dashboard"
+# - los carriles de menor prioridad no pueden vaciar la cubeta por debajo de una
+#   reserva, así siempre queda cupo para las capturas de asistencia
+# - cada espera tiene un límite de tiempo; si se vence se rechaza la petición
+# - métricas por carril: tiempo de espera y rechazos
+
+LANES = ("capture", "interactive", "dashboard")
+LANE_PRIORITY = {lane: i for i, lane in enumerate(LANES)}
+
+# Fracción de la cubeta que sólo puede usar el carril "capture"
+RESERVE_FRACTION = {"capture": 0.0, "interactive": 0.1, "dashboard": 0.25}
+
+# Segundos máximos de espera en cola por carril
+DEFAULT_DEADLINE_S = {"capture": 60.0, "interactive": 20.0, "dashboard": 10.0}
+
+_current_lane: ContextVar[str] = ContextVar("sheets_lane", default="interactive")
+
+class RateLimitExceeded(Exception):
+    """La petición no obtuvo turno antes de su límite de tiempo."""
+
+def set_lane(lane: str) -> None:
+    """Fija el carril de las peticiones del hilo actual (p. ej. al inicio de una página)."""
+    if lane not in LANE_PRIORITY:
+        raise ValueError(f'Carril desconocido: "{lane}" (usa {", ".join(LANES)})')
+    _current_lane.set(lane)
+
+@contextlib.contextmanager
+def lane(name: str) -> Iterator[None]:
+    """Usa un carril sólo dentro del bloque `with`."""
+    if name not in LANE_PRIORITY:
+        raise ValueError(f'Carril desconocido: "{name}" (usa {", ".join(LANES)})')
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+def current_lane() -> str:
+    return _current_lane.get()
+
+class TokenBucket:
+    """Cubeta de tokens que se rellena de forma continua."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # tokens por segundo
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, tokens: float) -> float:
+        """Segundos hasta que la cubeta tenga `tokens` disponibles."""
+        falta = tokens - self.tokens
+        return 0.0 if falta <= 0 else falta / self.rate
+
+class SheetsScheduler:
+    """Reparte los tokens de lectura/escritura entre todas las sesiones del proceso."""
+
+    def __init__(self, reads_per_minute: float = 60, writes_per_minute: float = 60):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute),
+            "write": TokenBucket(writes_per_minute),
+        }
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: Dict[str, list] = {kind: [] for kind in self.buckets}
+        self._stats = {
+            lane_name: {"acquired": 0, "rejected": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+            for lane_name in LANES
+        }
+
+    def _is_next(self, kind: str, ticket: tuple) -> bool:
+        return bool(self._waiting[kind]) and self._waiting[kind][0] == ticket
+
+    def acquire(self, kind: str, lane_name: Optional[str] = None, deadline_s: Optional[float] = None) -> float:
+        """
+        Espera un token de `kind` respetando prioridad y reserva del carril.
+        Regresa los segundos esperados o lanza RateLimitExceeded.
+        """
+        lane_name = lane_name or current_lane()
+        if deadline_s is None:
+            deadline_s = DEFAULT_DEADLINE_S[lane_name]
+        bucket = self.buckets[kind]
+        reserva = bucket.capacity * RESERVE_FRACTION[lane_name]
+
+        t0 = time.monotonic()
+        limite = t0 + deadline_s
+        ticket = (LANE_PRIORITY[lane_name], next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiting[kind], ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    if self._is_next(kind, ticket) and bucket.tokens >= reserva + 1:
+                        bucket.tokens -= 1
+                        break
+                    if now >= limite:
+                        self._stats[lane_name]["rejected"] += 1
+                        raise RateLimitExceeded(
+                            f"Sin cupo de {kind} en {deadline_s:.1f} s (carril {lane_name})"
+                        )
+                    espera = bucket.time_until(reserva + 1) if self._is_next(kind, ticket) else 0.5
+                    self._cond.wait(timeout=max(0.01, min(espera, limite - now)))
+            finally:
+                self._waiting[kind].remove(ticket)
+                heapq.heapify(self._waiting[kind])
+                self._cond.notify_all()
+
+            waited = time.monotonic() - t0
+            st_lane = self._stats[lane_name]
+            st_lane["acquired"] += 1
+            st_lane["wait_total_s"] += waited
+            st_lane["wait_max_s"] = max(st_lane["wait_max_s"], waited)
+        return waited
+
+    def penalize(self, kind: str) -> None:
+        """Google respondió 429: se vacía la cubeta para que TODAS las sesiones esperen."""
+        with self._cond:
+            bucket = self.buckets[kind]
+            bucket.refill(time.monotonic())
+            bucket.tokens = 0.0
+
+    def stats(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            return {
+                "tokens": {kind: round(b.tokens, 1) for kind, b in self.buckets.items()},
+                "waiting": {kind: len(w) for kind, w in self._waiting.items()},
+                "lanes": {
+                    name: {
+                        **s,
+                        "wait_avg_s": s["wait_total_s"] / s["acquired"] if s["acquired"] else 0.0,
+                    }
+                    for name, s in self._stats.items()
+                },
+            }
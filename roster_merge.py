@@ -0,0 +1,104 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import pandas as pd
+
+# =========================
+# ACTUALIZAR UNA LISTA SIN BORRAR LA ASISTENCIA
+# =========================
+# Al volver a subir la lista de un grupo se compara contra la hoja existente
+# usando "No de control" como llave:
+# - alumnos nuevos     -> filas nuevas al final (asistencia en blanco)
+# - alumnos que salen  -> se conservan, o se borran sus filas completas
+# - cambios de nombre / grupo / docente -> sólo esas celdas
+# Las columnas "Unidad …" nunca se reescriben: cada alumno conserva su fila,
+# así que su asistencia sigue alineada.
+
+KEY_COLUMN = "No de control"
+# Columnas que la lista del SII sí trae; Dirección / Telefono / Correo se
+# capturan a mano y no se pisan al actualizar
+SYNC_COLUMNS = ["Nombre", "Grupo", "Docente"]
+
+class RosterPlan(NamedTuple):
+    added: List[str]                      # No de control nuevos
+    removed: List[str]                    # No de control que ya no vienen en la lista
+    renamed: List[Tuple[str, str, str]]   # (No de control, nombre anterior, nombre nuevo)
+    updated: List[str]                    # No de control con grupo / docente distinto
+    delete_rows: List[int]                # filas (base 1) a borrar completas
+    cells: Dict[Tuple[int, int], str]     # celdas a escribir (después de borrar)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.delete_rows or self.cells)
+
+def plan_roster_update(
+    grid: Sequence[Sequence[str]], roster: pd.DataFrame, delete_removed: bool = False
+) -> Optional[RosterPlan]:
+    """
+    Compara la hoja (`grid`, con encabezados en la fila 1) contra la lista nueva.
+    Regresa None si la hoja no tiene columna "No de control" (hay que crearla completa).
+    """
+    if not grid or KEY_COLUMN not in grid[0]:
+        return None
+    header = list(grid[0])
+    col = {h: j for j, h in enumerate(header) if h}
+    key_idx = col[KEY_COLUMN]
+
+    def celda(row: Sequence[str], j: int) -> str:
+        return str(row[j]).strip() if j < len(row) else ""
+
+    # Filas actuales por No de control (la primera gana si hay repetidos)
+    existentes: Dict[str, int] = {}
+    for r, row in enumerate(grid[1:], start=2):
+        nc = celda(row, key_idx)
+        if nc and nc not in existentes:
+            existentes[nc] = r
+
+    nuevos = {
+        str(fila[KEY_COLUMN]).strip(): fila
+        for fila in roster.astype(str).to_dict("records")
+        if str(fila[KEY_COLUMN]).strip()
+    }
+
+    removed = [nc for nc in existentes if nc not in nuevos]
+    added = [nc for nc in nuevos if nc not in existentes]
+    delete_rows = sorted(existentes[nc] for nc in removed) if delete_removed else []
+
+    # Después de borrar, cada fila sube tantas posiciones como filas borradas tenga arriba
+    def fila_final(r: int) -> int:
+        return r - sum(1 for d in delete_rows if d < r)
+
+    cells: Dict[Tuple[int, int], str] = {}
+    renamed, updated = [], []
+    for nc, r in existentes.items():
+        if nc not in nuevos:
+            continue
+        fila, actual = nuevos[nc], grid[r - 1]
+        cambio_otro = False
+        for nombre_col in SYNC_COLUMNS:
+            if nombre_col not in col or nombre_col not in fila:
+                continue
+            anterior, nuevo = celda(actual, col[nombre_col]), fila[nombre_col].strip()
+            if anterior == nuevo:
+                continue
+            cells[(fila_final(r), col[nombre_col] + 1)] = nuevo
+            if nombre_col == "Nombre":
+                renamed.append((nc, anterior, nuevo))
+            else:
+                cambio_otro = True
+        if cambio_otro:
+            updated.append(nc)
+
+    # Nuevos al final, con todas las columnas de la lista que tenga la hoja
+    siguiente = fila_final(len(grid) + 1)
+    for i, nc in enumerate(added):
+        for nombre_col, valor in nuevos[nc].items():
+            if nombre_col in col and valor != "":
+                cells[(siguiente + i, col[nombre_col] + 1)] = valor
+
+    return RosterPlan(
+        added=added,
+        removed=removed,
+        renamed=renamed,
+        updated=updated,
+        delete_rows=delete_rows,
+        cells=cells,
+    )
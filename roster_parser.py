@@ -0,0 +1,229 @@
+import io
+import os
+import re
+import hashlib
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import pandas as pd
+
+# =========================
+# LECTOR DE LISTAS DEL SII (PDF)
+# =========================
+# Recorre el PDF página por página y línea por línea (sin armar el texto
+# completo) con la misma máquina de estados de siempre:
+# - encabezado: MATERIA / GRUPO / CATEDRATICO
+# - alumnos: número de fila (con marcas R/E/** opcionales), nombre y No. de control
+# El resultado es un Roster tipado; la llave para memorizarlo es el SHA-256
+# de los bytes del archivo.
+
+# Encabezados EXACTOS que esperan las gráficas
+ROSTER_COLUMNS = ["Dirección", "Telefono", "Correo", "No de control", "Nombre", "Grupo", "Docente"]
+
+# Patrones
+NUM_RE = re.compile(r"^\d+$")                                     # "1", "2", ...
+NUM_MAS_MARCA_RE = re.compile(r"^\d+\s+(?:[A-ZÁÉÍÓÚÑ]|\*{1,3})$")  # "10 R" o "20 **"
+MARCA_SOLO_RE = re.compile(r"^(?:[A-ZÁÉÍÓÚÑ]|\*{1,3})$")          # "R", "E", "*", "**", "***"
+NC_RE = re.compile(r"^[C]?\d{8}$")                                # Cdddddddd o dddddddd
+GRUPO_RE = re.compile(r"^\d{3}$")                                 # p. ej. 611, 053
+MARCA_NOMBRE_RE = re.compile(r"^(?:[A-ZÁÉÍÓÚÑ]|\*{1,3})\s+")
+ESPACIOS_RE = re.compile(r"\s{2,}")
+
+class Student(NamedTuple):
+    no_control: str
+    nombre: str
+
+class Roster(NamedTuple):
+    sha256: str
+    materia: str
+    grupo: str
+    docente: str
+    students: List[Student]
+
+    @property
+    def title(self) -> str:
+        """Nombre de la pestaña: 'grupo - materia'."""
+        return f"{self.grupo} - {self.materia}".strip()
+
+    def to_df(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [["", "", "", s.no_control, s.nombre, self.grupo, self.docente] for s in self.students],
+            columns=ROSTER_COLUMNS,
+        )
+
+def roster_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def iter_pdf_lines(data: bytes) -> Iterator[str]:
+    """
+    Líneas del PDF, una página a la vez. Igual que "".join(textos).split("\\n"):
+    una línea cortada al final de una página continúa en la siguiente.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        pendiente = ""
+        for page in doc:
+            partes = (pendiente + page.get_text()).split("\n")
+            pendiente = partes.pop()
+            yield from partes
+        yield pendiente
+
+class _LineWindow:
+    """Líneas bajo demanda: sólo guarda las que todavía se pueden consultar."""
+
+    def __init__(self, lines: Iterator[str]):
+        self._it = lines
+        self._buf: deque = deque()
+        self._base = 0
+        self._done = False
+
+    def has(self, i: int) -> bool:
+        while not self._done and i >= self._base + len(self._buf):
+            try:
+                self._buf.append(next(self._it))
+            except StopIteration:
+                self._done = True
+        return i < self._base + len(self._buf)
+
+    def __getitem__(self, i: int) -> str:
+        self.has(i)
+        return self._buf[i - self._base]
+
+    def release(self, i: int) -> None:
+        """Ya no se consultarán líneas antes de `i`."""
+        while self._base < i and self._buf:
+            self._buf.popleft()
+            self._base += 1
+
+class _HeaderScanner:
+    """Materia / grupo / docente; se alimenta línea por línea."""
+
+    def __init__(self, w: _LineWindow):
+        self.w = w
+        self.pos = 0
+        self.materia, self.grupo, self.docente = "", "", ""
+
+    def advance_to(self, limit: Optional[int]) -> None:
+        w = self.w
+        while (limit is None or self.pos < limit) and w.has(self.pos):
+            i = self.pos
+            u = w[i].upper().strip()
+            if "MATERIA" in u and w.has(i + 3):
+                self.materia = w[i + 3].strip()
+            elif "GRUPO" in u:
+                for k in range(i, i + 5):
+                    if not w.has(k):
+                        break
+                    s = w[k].strip()
+                    if GRUPO_RE.match(s):
+                        self.grupo = s
+                        break
+            elif "CATEDRATICO" in u and w.has(i + 2):
+                self.docente = w[i + 2].strip()
+            self.pos += 1
+
+def parse_roster_lines(lines: Iterator[str], sha256: str = "") -> Roster:
+    """Encabezado y alumnos (robusto con R/E/**, etc.) en una sola pasada."""
+    w = _LineWindow(lines)
+    header = _HeaderScanner(w)
+    alumnos: List[Student] = []
+
+    i = 0
+    while w.has(i):
+        header.advance_to(i)
+        w.release(min(i, header.pos))
+        linea = w[i].strip()
+
+        # Inicio de fila por número o "número + marca"
+        if not (NUM_RE.match(linea) or NUM_MAS_MARCA_RE.match(linea)):
+            i += 1
+            continue
+
+        i += 1
+        # Saltar marcas sueltas en la columna intermedia
+        while w.has(i) and MARCA_SOLO_RE.match(w[i].strip()):
+            i += 1
+        if not w.has(i):
+            break
+
+        # Nombre (tolerar línea vacía extra)
+        nombre = w[i].strip()
+        if nombre == "" and w.has(i + 1):
+            i += 1
+            nombre = w[i].strip()
+
+        # Limpiar marca pegada al nombre (p. ej. "R ORTIZ..." o "** TORRES...")
+        nombre = MARCA_NOMBRE_RE.sub("", nombre)
+        # Colapsar espacios dobles
+        nombre = ESPACIOS_RE.sub(" ", nombre).strip()
+
+        # Buscar No. de control en las siguientes 3 líneas
+        no_control = ""
+        j = i + 1
+        while j < i + 4 and w.has(j):
+            cand = w[j].strip()
+            if NC_RE.match(cand):
+                no_control = cand
+                break
+            j += 1
+
+        if no_control:
+            alumnos.append(Student(no_control=no_control, nombre=nombre))
+            i = j + 1
+        else:
+            i += 1
+
+    header.advance_to(None)
+    return Roster(
+        sha256=sha256,
+        materia=header.materia,
+        grupo=header.grupo,
+        docente=header.docente,
+        students=alumnos,
+    )
+
+def parse_roster(data: bytes, sha256: Optional[str] = None) -> Roster:
+    """Lee una lista del SII desde los bytes del PDF."""
+    return parse_roster_lines(iter_pdf_lines(data), sha256 or roster_sha256(data))
+
+# =========================
+# CARGA MASIVA (varios PDF o un ZIP)
+# =========================
+
+class ParsedFile(NamedTuple):
+    name: str
+    roster: Optional[Roster]
+    error: str
+
+def expand_uploads(files: Sequence[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """(nombre, bytes) de cada PDF; los ZIP se abren y se toman sus PDF."""
+    pdfs = []
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    base = os.path.basename(info.filename)
+                    if info.is_dir() or base.startswith(".") or not base.lower().endswith(".pdf"):
+                        continue
+                    pdfs.append((f"{name}/{info.filename}", zf.read(info)))
+        else:
+            pdfs.append((name, data))
+    return pdfs
+
+def _parse_file(item: Tuple[str, bytes]) -> ParsedFile:
+    name, data = item
+    try:
+        return ParsedFile(name, parse_roster(data), "")
+    except Exception as e:  # un PDF dañado no tumba el lote
+        return ParsedFile(name, None, f"{type(e).__name__}: {e}")
+
+def parse_many(files: Sequence[Tuple[str, bytes]], max_workers: Optional[int] = None) -> List[ParsedFile]:
+    """Interpreta varios PDF en paralelo (un proceso por núcleo); conserva el orden."""
+    files = list(files)
+    if len(files) <= 1:
+        return [_parse_file(f) for f in files]
+    workers = min(max_workers or os.cpu_count() or 1, len(files))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_parse_file, files))
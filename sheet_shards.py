@@ -0,0 +1,272 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from header_index import is_attendance_column, parse_header
+
+# =========================
+# PESTAÑAS COMPAÑERAS (SHARDS) PARA MATERIAS GRANDES
+# =========================
+# Una materia con muchas capturas (Asesoría, Propedéutico, grupos de todo el
+# semestre) se acerca al límite de columnas/celdas de Google Sheets y cada
+# lectura completa se vuelve lenta. Cuando la pestaña de la materia llega a
+# `max_columns`, las columnas de asistencia nuevas se escriben en pestañas
+# ocultas por mes (o por unidad):
+#
+#   "611 - Cálculo"                 datos del alumno + columnas anteriores
+#   "_611 - Cálculo · 2025-10"      No de control + capturas de octubre
+#   "_611 - Cálculo · 2025-11"      No de control + capturas de noviembre
+#
+# Las filas de cada shard van alineadas con las de la pestaña principal (fila
+# N = mismo alumno), igual que las columnas de asistencia del formato ancho.
+# El router arma la vista ancha al leer y manda cada escritura a la pestaña
+# donde vive la columna, así que las páginas no cambian. Cuando la lista de
+# la materia se reescribe (cargar_lista / roster_merge), los shards se
+# reordenan por "No de control" en la misma llamada para seguir alineados.
+#
+# Está apagado por defecto (cada escritura enrutada cuesta lecturas de
+# encabezados de la materia y sus shards). Se activa en secrets:
+#   [storage]
+#   shard_by = "month"              # "month", "unit" u "off" (por defecto)
+#   shard_max_columns = 200
+
+SHARD_SEP = " · "
+MAX_TITLE = 100          # límite de Google Sheets para el nombre de una pestaña
+KEY_COLUMN = "No de control"
+SHARD_BY = ("month", "unit", "off")
+
+def shard_key(header: str, by: str = "month") -> str:
+    """Mes ('2025-10') o unidad ('Unidad 3') a la que pertenece una columna de asistencia."""
+    info = parse_header(header)
+    if by == "unit":
+        return info.unit or "Otros"
+    return info.dt.strftime("%Y-%m") if info.dt else "sin fecha"
+
+def shard_title(title: str, key: str) -> str:
+    """'_<materia> · <clave>', recortando la materia para no pasar de 100 caracteres."""
+    sufijo = f"{SHARD_SEP}{key}"
+    return f"_{title[:MAX_TITLE - 1 - len(sufijo)]}{sufijo}"
+
+class ShardRouter:
+    """
+    Envuelve un backend (Sheets o SQLite) con la misma interfaz: lee la
+    materia más sus shards como una sola vista ancha y enruta las escrituras.
+    """
+
+    def __init__(self, base, by: str = "month", max_columns: int = 200):
+        if by not in SHARD_BY:
+            raise ValueError(f'shard_by desconocido: "{by}" (usa {", ".join(SHARD_BY)})')
+        self.base = base
+        self.by = by
+        self.max_columns = max_columns
+        self.delta = getattr(base, "delta", None)
+        self._lock = threading.Lock()
+        self._key_rows: Dict[str, int] = {}   # shard -> alumnos escritos en su columna "No de control"
+
+    @property
+    def name(self) -> str:
+        return self.base.name
+
+    # --- descubrir shards ---
+    def shards_of(self, worksheet_title: str, titles: Optional[List[str]] = None) -> List[str]:
+        """Shards de una materia en orden de creación."""
+        titles = self.base.list_worksheets() if titles is None else titles
+        return [
+            t for t in titles
+            if t.startswith("_") and SHARD_SEP in t and t != worksheet_title
+            and shard_title(worksheet_title, t.rsplit(SHARD_SEP, 1)[1]) == t
+        ]
+
+    def _column_map(self, worksheet_title: str) -> List[Tuple[str, int, str]]:
+        """(pestaña, columna base 1, encabezado) por cada columna de la vista ancha."""
+        mapa = [(worksheet_title, j, h) for j, h in enumerate(self.base.read_header(worksheet_title), start=1)]
+        for shard in self.shards_of(worksheet_title):
+            mapa += [
+                (shard, j, h)
+                for j, h in enumerate(self.base.read_header(shard), start=1)
+                if h != KEY_COLUMN
+            ]
+        return mapa
+
+    # --- lecturas ---
+    def list_worksheets(self) -> List[str]:
+        return self.base.list_worksheets()
+
+    @staticmethod
+    def _merge(main: pd.DataFrame, shards: List[pd.DataFrame]) -> pd.DataFrame:
+        partes = [main.reset_index(drop=True)]
+        for df in shards:
+            df = df.drop(columns=[KEY_COLUMN], errors="ignore").reset_index(drop=True)
+            if len(df.columns):
+                partes.append(df.reindex(range(len(main))).fillna(""))
+        return pd.concat(partes, axis=1) if len(partes) > 1 else partes[0]
+
+    def read_df(self, worksheet_title: str) -> pd.DataFrame:
+        main = self.base.read_df(worksheet_title)
+        shards = self.shards_of(worksheet_title)
+        if not shards:
+            return main
+        return self._merge(main, [self.base.read_df(s) for s in shards])
+
+    def read_many(self, worksheet_titles: List[str]) -> Dict[str, pd.DataFrame]:
+        """Materias y todos sus shards en una sola lectura del backend."""
+        todas = self.base.list_worksheets()
+        shards = {t: self.shards_of(t, todas) for t in worksheet_titles}
+        pestañas = list(dict.fromkeys(list(worksheet_titles) + [s for ss in shards.values() for s in ss]))
+        if hasattr(self.base, "read_many"):
+            frames = self.base.read_many(pestañas)
+        else:
+            frames = {t: self.base.read_df(t) for t in pestañas}
+        return {t: self._merge(frames[t], [frames[s] for s in shards[t]]) for t in worksheet_titles}
+
+    def get_all_values(self, worksheet_title: str) -> List[List[str]]:
+        grid = [list(r) for r in self.base.get_all_values(worksheet_title)]
+        for shard in self.shards_of(worksheet_title):
+            extra = self.base.get_all_values(shard)
+            if not extra or not grid:
+                continue
+            ancho = max(len(r) for r in grid)
+            llave = extra[0].index(KEY_COLUMN) if KEY_COLUMN in extra[0] else None
+            for i, fila in enumerate(extra):
+                fila = [v for j, v in enumerate(fila) if j != llave]
+                if i >= len(grid):
+                    grid.append([])
+                grid[i] = list(grid[i]) + [""] * (ancho - len(grid[i])) + fila
+        return grid
+
+    def read_header(self, worksheet_title: str) -> List[str]:
+        return [h for _, _, h in self._column_map(worksheet_title)]
+
+    # --- escrituras ---
+    def _target(self, worksheet_title: str, header: str) -> str:
+        """Pestaña donde vive (o vivirá) una columna de asistencia."""
+        for pestaña, _, h in self._column_map(worksheet_title):
+            if h == header:
+                return pestaña
+        if self.by == "off" or not is_attendance_column(header):
+            return worksheet_title
+        activo = (
+            self.shards_of(worksheet_title)
+            or len(self.base.read_header(worksheet_title)) >= self.max_columns
+        )
+        return shard_title(worksheet_title, shard_key(header, self.by)) if activo else worksheet_title
+
+    def _student_keys(self, worksheet_title: str) -> List[str]:
+        df = self.base.read_df(worksheet_title)
+        if KEY_COLUMN not in df.columns:
+            return []
+        return df[KEY_COLUMN].astype(str).tolist()
+
+    def write_column(self, worksheet_title: str, header: str, values: List[str]) -> Dict:
+        destino = self._target(worksheet_title, header)
+        if destino == worksheet_title:
+            return self.base.write_column(worksheet_title, header, values)
+
+        api_calls = 0
+        with self._lock:
+            # La columna "No de control" del shard sólo se reescribe si cambió el tamaño de la lista
+            if self._key_rows.get(destino) != len(values):
+                llaves = self._student_keys(worksheet_title)
+                if destino in self.base.list_worksheets():
+                    api_calls += self.base.write_column(destino, KEY_COLUMN, llaves)["api_calls"]
+                else:
+                    self.base.replace_worksheet(destino, [[KEY_COLUMN]] + [[k] for k in llaves])
+                    api_calls += 1
+                    # Sólo Sheets tiene pestañas ocultas
+                    if hasattr(self.base, "hide_worksheet"):
+                        api_calls += self.base.hide_worksheet(destino)["api_calls"]
+                self._key_rows[destino] = len(values)
+        stats = self.base.write_column(destino, header, values)
+        stats["api_calls"] += api_calls
+        stats["worksheet"] = destino
+        return stats
+
+    def _realign(self, worksheet_title: str, titles: Optional[List[str]] = None) -> int:
+        """
+        Reordena cada shard por "No de control" para que su fila N vuelva a ser
+        el alumno de la fila N de la materia (los que ya no están se quitan, los
+        nuevos quedan en blanco). Regresa las llamadas a la API.
+        """
+        shards = self.shards_of(worksheet_title, titles)
+        if not shards:
+            return 0
+        main = self.base.read_df(worksheet_title)
+        if KEY_COLUMN not in main.columns:
+            return 0
+        llaves = main[KEY_COLUMN].astype(str).str.strip().tolist()
+        api_calls = 0
+        for shard in shards:
+            grid = self.base.get_all_values(shard)
+            if not grid or KEY_COLUMN not in grid[0]:
+                continue
+            header, j = list(grid[0]), list(grid[0]).index(KEY_COLUMN)
+            actuales = [str(r[j]).strip() if j < len(r) else "" for r in grid[1:]]
+            if actuales == llaves:
+                continue
+            por_llave: Dict[str, List[str]] = {}
+            for k, fila in zip(actuales, grid[1:]):
+                por_llave.setdefault(k, list(fila))
+            filas = []
+            for k in llaves:
+                fila = (por_llave.get(k, []) + [""] * len(header))[:len(header)]
+                fila[j] = k
+                filas.append(fila)
+            self.base.replace_worksheet(shard, [header] + filas)
+            api_calls += 2
+            with self._lock:
+                self._key_rows[shard] = len(llaves)
+        return api_calls
+
+    def update_cells(self, worksheet_title: str, cells: Dict[Tuple[int, int], str]) -> Dict:
+        """
+        Coordenadas de la vista ancha; cada celda va a la pestaña de su columna.
+        Si cambia la columna "No de control" de la materia (alumnos nuevos de
+        roster_merge), los shards se realinean.
+        """
+        mapa = self._column_map(worksheet_title)
+        ancho_main = sum(1 for pestaña, _, _ in mapa if pestaña == worksheet_title)
+        por_pestaña: Dict[str, Dict[Tuple[int, int], str]] = {}
+        for (row, col), value in cells.items():
+            if col <= len(mapa):
+                pestaña, col_real, _ = mapa[col - 1]
+            else:
+                # Más allá de la vista ancha: columnas nuevas al final de la pestaña principal
+                pestaña, col_real = worksheet_title, ancho_main + col - len(mapa)
+            por_pestaña.setdefault(pestaña, {})[(row, col_real)] = value
+        out = {"cells": 0, "api_calls": 0}
+        for pestaña, celdas in por_pestaña.items():
+            stats = self.base.update_cells(pestaña, celdas)
+            out["cells"] += stats["cells"]
+            out["api_calls"] += stats["api_calls"]
+        llave = [j for pestaña, j, h in mapa if pestaña == worksheet_title and h == KEY_COLUMN]
+        if llave and any(col == llave[0] for (_, col) in por_pestaña.get(worksheet_title, {})):
+            out["api_calls"] += self._realign(worksheet_title)
+        return out
+
+    def delete_rows(self, worksheet_title: str, rows: List[int]) -> Dict:
+        """Borra las filas en la materia y en sus shards para que sigan alineadas."""
+        out = self.base.delete_rows(worksheet_title, rows)
+        for shard in self.shards_of(worksheet_title):
+            alto = len(self.base.get_all_values(shard))
+            stats = self.base.delete_rows(shard, [r for r in rows if r <= alto])
+            out["api_calls"] += stats["api_calls"]
+            with self._lock:
+                self._key_rows.pop(shard, None)
+        return out
+
+    def replace_worksheet(self, worksheet_title: str, values: List[List[str]]) -> None:
+        """Lista nueva de la materia: sus shards se reordenan con ella."""
+        self.base.replace_worksheet(worksheet_title, values)
+        self._realign(worksheet_title)
+
+    def replace_worksheets(self, sheets: Dict[str, List[List[str]]]) -> Dict:
+        out = self.base.replace_worksheets(sheets)
+        todas = self.base.list_worksheets()
+        for title in sheets:
+            out["api_calls"] += self._realign(title, todas)
+        return out
+
+    def read_rows(self, worksheet_title: str, start_row: int, n_cols: int) -> List[List[str]]:
+        return self.base.read_rows(worksheet_title, start_row, n_cols)
+
+    def append_rows(self, worksheet_title: str, rows: List[List[str]]) -> Dict:
+        return self.base.append_rows(worksheet_title, rows)
@@ -0,0 +1,84 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+# =========================
+# LECTURAS COALESCIDAS (single-flight)
+# =========================
+# Al empezar una clase decenas de sesiones abren la misma materia casi al
+# mismo tiempo; st.cache_data no evita que cada una baje la hoja mientras el
+# primer resultado todavía no llega. Aquí la primera petición de una llave
+# (hoja, worksheet, versión) hace la lectura y las demás esperan ese mismo
+# resultado (o su error).
+
+T = TypeVar("T")
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Una sola ejecución en curso por llave; contadores por llave."""
+
+    def __init__(self, max_keys: int = 200):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats: "OrderedDict[Hashable, Dict]" = OrderedDict()
+
+    def _stat(self, key: Hashable) -> Dict:
+        s = self._stats.get(key)
+        if s is None:
+            s = self._stats[key] = {"calls": 0, "executions": 0, "shared": 0, "errors": 0, "last_s": 0.0}
+            # Sólo se guardan las llaves más recientes (cada versión nueva es otra llave)
+            while len(self._stats) > self.max_keys:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        return s
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            s = self._stat(key)
+            s["calls"] += 1
+            flight = self._flights.get(key)
+            lider = flight is None
+            if lider:
+                flight = self._flights[key] = _Flight()
+                s["executions"] += 1
+            else:
+                flight.waiters += 1
+                s["shared"] += 1
+
+        if not lider:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        t0 = time.perf_counter()
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._stat(key)["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                self._stat(key)["last_s"] = time.perf_counter() - t0
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self) -> Dict[Hashable, Dict]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import List, NamedTuple, Optional
+import pandas as pd
+import pyarrow as pa
+from gspread.utils import numericise_all
+
+# =========================
+# SNAPSHOTS EN DISCO (ARRANQUE EN FRÍO)
+# =========================
+# Después de un deploy o reinicio, la primera visita a cada página esperaba la
+# autorización, el client.open y la descarga completa de cada worksheet. Cada
+# lectura fresca deja aquí una copia en formato columnar (Arrow IPC, sin
+# comprimir, se abre con memory-map) junto con su sello de versión:
+#
+#   <carpeta>/<sha1(hoja|worksheet)>.arrow     el DataFrame tal como lo da read_df
+#   <carpeta>/<sha1(hoja)>.titles.json         lista de worksheets
+#
+# En frío los tableros se sirven desde el snapshot de inmediato y un hilo
+# revalida contra la hoja: si la versión no cambió se adopta tal cual. La
+# versión completa lleva contadores locales que sólo valen dentro del proceso
+# que los generó, por eso cada snapshot guarda también su corrida (`run`).
+#
+#   [cache]
+#   snapshot_dir = "data/snapshots"
+
+class Snapshot(NamedTuple):
+    df: pd.DataFrame
+    version: str         # versión completa "remota|local" cuando se leyó
+    run: str             # proceso que lo guardó (sus contadores locales)
+    saved_at: float
+
+    @property
+    def remote(self) -> str:
+        """modifiedTime de la hoja cuando se leyó."""
+        return self.version.split("|", 1)[0]
+
+def _to_table(df: pd.DataFrame, version: str, run: str) -> pa.Table:
+    """
+    Columnas con nombres posicionales (los encabezados van en los metadatos).
+    Las columnas mixtas (números y texto, como las deja numericise) se guardan
+    como texto y se vuelven a numericizar al leer.
+    """
+    arrays, mixtas = [], []
+    for i in range(len(df.columns)):
+        s = df.iloc[:, i]
+        if s.dtype == object:
+            tipos = {type(v) for v in s}
+            if tipos - {str}:
+                mixtas.append(i)
+                s = s.map(lambda v: "" if v is None else str(v))
+        arrays.append(pa.array(s, from_pandas=True))
+    meta = {
+        "columns": [str(c) for c in df.columns],
+        "mixed": mixtas,
+        "version": version,
+        "run": run,
+        "saved_at": time.time(),
+    }
+    schema = pa.schema(
+        [pa.field(f"c{i}", a.type) for i, a in enumerate(arrays)],
+        metadata={"snapshot": json.dumps(meta, ensure_ascii=False)},
+    )
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _from_table(table: pa.Table) -> Snapshot:
+    meta = json.loads(table.schema.metadata[b"snapshot"])
+    mixtas = set(meta["mixed"])
+    columnas = {}
+    for i in range(table.num_columns):
+        s = table.column(i).to_pandas()
+        if i in mixtas:
+            s = pd.Series(numericise_all(s.tolist()), dtype=object)
+        columnas[i] = s
+    df = pd.DataFrame(columnas)
+    df.columns = meta["columns"]
+    # Snapshots anteriores sólo traían la parte remota
+    return Snapshot(df, meta.get("version", meta.get("remote", "")), meta.get("run", ""), meta["saved_at"])
+
+class SnapshotStore:
+    """Snapshots Arrow por worksheet; escritura atómica (archivo temporal + rename)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.run = uuid.uuid4().hex   # esta corrida del proceso
+        os.makedirs(directory, exist_ok=True)
+        self.loads = 0
+        self.saves = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def _path(self, *parts: str, ext: str = ".arrow") -> str:
+        nombre = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, nombre + ext)
+
+    def _fail(self, e: Exception) -> None:
+        self.errors += 1
+        self.last_error = f"{type(e).__name__}: {e}"
+
+    def _write_atomic(self, path: str, write) -> None:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp)
+        os.replace(tmp, path)
+
+    def save(self, spreadsheet: str, worksheet: str, df: pd.DataFrame, version: str) -> bool:
+        try:
+            table = _to_table(df, version, self.run)
+
+            def escribir(tmp):
+                with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+            self._write_atomic(self._path(spreadsheet, worksheet), escribir)
+            self.saves += 1
+            return True
+        except Exception as e:  # un snapshot que no se pudo guardar sólo cuesta un arranque lento
+            self._fail(e)
+            return False
+
+    def load(self, spreadsheet: str, worksheet: str) -> Optional[Snapshot]:
+        path = self._path(spreadsheet, worksheet)
+        if not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, "r") as source:
+                snap = _from_table(pa.ipc.open_file(source).read_all())
+            self.loads += 1
+            return snap
+        except Exception as e:
+            self._fail(e)
+            return None
+
+    def save_titles(self, spreadsheet: str, titles: List[str]) -> None:
+        try:
+            data = json.dumps({"titles": list(titles), "saved_at": time.time()}, ensure_ascii=False)
+
+            def escribir(tmp):
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(data)
+
+            self._write_atomic(self._path(spreadsheet, ext=".titles.json"), escribir)
+        except Exception as e:
+            self._fail(e)
+
+    def load_titles(self, spreadsheet: str) -> Optional[List[str]]:
+        path = self._path(spreadsheet, ext=".titles.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return list(json.load(f)["titles"])
+        except Exception as e:
+            self._fail(e)
+            return None
+
+    def stats(self) -> dict:
+        archivos = [f for f in os.listdir(self.directory) if f.endswith(".arrow")]
+        return {
+            "files": len(archivos),
+            "bytes": sum(os.path.getsize(os.path.join(self.directory, f)) for f in archivos),
+            "loads": self.loads,
+            "saves": self.saves,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
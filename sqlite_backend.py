@@ -0,0 +1,227 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+import pandas as pd
+from delta_reader import grid_to_df
+
+# =========================
+# BACKEND LOCAL EN SQLITE
+# =========================
+# Guarda cada worksheet como una cuadrícula de celdas (fila, columna, valor),
+# igual que la ve Google Sheets. Sirve para:
+# - leer en milisegundos sin gastar cuota de la API
+# - correr la app completa sin red (desarrollo / pruebas)
+#
+# Se activa en secrets:
+#   [storage]
+#   backend = "sqlite"
+#   sqlite_path = "data/asistencia.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS worksheets (
+    title    TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    worksheet TEXT    NOT NULL,
+    row       INTEGER NOT NULL,
+    col       INTEGER NOT NULL,
+    value     TEXT    NOT NULL,
+    PRIMARY KEY (worksheet, row, col)
+) WITHOUT ROWID;
+"""
+
+class SQLiteBackend:
+    """Misma interfaz que SheetsBackend, pero sobre un archivo SQLite en modo WAL."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            carpeta = os.path.dirname(os.path.abspath(path))
+            os.makedirs(carpeta, exist_ok=True)
+        # Una conexión por hilo (Streamlit atiende cada sesión en su propio hilo)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_worksheet(self, conn: sqlite3.Connection, worksheet_title: str) -> None:
+        conn.execute(
+            "INSERT OR IGNORE INTO worksheets (title, position) "
+            "SELECT ?, COALESCE(MAX(position), -1) + 1 FROM worksheets",
+            (worksheet_title,),
+        )
+
+    def list_worksheets(self) -> List[str]:
+        rows = self._conn().execute("SELECT title FROM worksheets ORDER BY position").fetchall()
+        return [r[0] for r in rows]
+
+    def get_all_values(self, worksheet_title: str) -> List[List[str]]:
+        rows = self._conn().execute(
+            "SELECT row, col, value FROM cells WHERE worksheet = ? AND value != ''",
+            (worksheet_title,),
+        ).fetchall()
+        if not rows:
+            return []
+        n_rows = max(r[0] for r in rows)
+        n_cols = max(r[1] for r in rows)
+        grid = [[""] * n_cols for _ in range(n_rows)]
+        for row, col, value in rows:
+            grid[row - 1][col - 1] = value
+        return grid
+
+    def read_df(self, worksheet_title: str) -> pd.DataFrame:
+        """Mismo resultado que pd.DataFrame(ws.get_all_records())."""
+        return grid_to_df(self.get_all_values(worksheet_title))
+
+    def read_header(self, worksheet_title: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT col, value FROM cells WHERE worksheet = ? AND row = 1 AND value != '' ORDER BY col",
+            (worksheet_title,),
+        ).fetchall()
+        if not rows:
+            return []
+        header = [""] * rows[-1][0]
+        for col, value in rows:
+            header[col - 1] = value
+        return header
+
+    def write_column(self, worksheet_title: str, header: str, values: List[str]) -> Dict:
+        headers = self.read_header(worksheet_title)
+        if header in headers:
+            col_idx = headers.index(header) + 1
+        else:
+            col_idx = len(headers) + 1
+        cells = {(1, col_idx): header}
+        cells.update({(i, col_idx): v for i, v in enumerate(values, start=2)})
+        self.update_cells(worksheet_title, cells)
+        return {"col_idx": col_idx, "range": None, "api_calls": 0}
+
+    def update_cells(self, worksheet_title: str, cells: Dict[Tuple[int, int], str]) -> Dict:
+        conn = self._conn()
+        with conn:
+            self._ensure_worksheet(conn, worksheet_title)
+            conn.executemany(
+                "INSERT OR REPLACE INTO cells (worksheet, row, col, value) VALUES (?, ?, ?, ?)",
+                [(worksheet_title, row, col, str(value)) for (row, col), value in cells.items()],
+            )
+        return {"cells": len(cells), "api_calls": 0}
+
+    def modified_stamp(self) -> str:
+        """Sello de versión: última modificación del archivo (y de su WAL)."""
+        if self.path == ":memory:":
+            return "memoria"
+        return str(max(
+            (os.stat(p).st_mtime_ns for p in (self.path, self.path + "-wal") if os.path.exists(p)),
+            default=0,
+        ))
+
+    def read_rows(self, worksheet_title: str, start_row: int, n_cols: int) -> List[List[str]]:
+        """Filas desde `start_row` (base 1) hasta el final, en las primeras `n_cols` columnas."""
+        rows = self._conn().execute(
+            "SELECT row, col, value FROM cells WHERE worksheet = ? AND row >= ? AND col <= ? AND value != ''",
+            (worksheet_title, start_row, n_cols),
+        ).fetchall()
+        if not rows:
+            return []
+        block = [[""] * n_cols for _ in range(max(r[0] for r in rows) - start_row + 1)]
+        for row, col, value in rows:
+            block[row - start_row][col - 1] = value
+        return block
+
+    def append_rows(self, worksheet_title: str, rows: List[List[str]]) -> Dict:
+        conn = self._conn()
+        with conn:
+            self._ensure_worksheet(conn, worksheet_title)
+            ultima = conn.execute(
+                "SELECT COALESCE(MAX(row), 0) FROM cells WHERE worksheet = ?", (worksheet_title,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO cells (worksheet, row, col, value) VALUES (?, ?, ?, ?)",
+                [
+                    (worksheet_title, r, c, str(v))
+                    for r, fila in enumerate(rows, start=ultima + 1)
+                    for c, v in enumerate(fila, start=1)
+                ],
+            )
+        return {"rows": len(rows), "api_calls": 0}
+
+    def delete_rows(self, worksheet_title: str, rows: List[int]) -> Dict:
+        """Borra filas completas y recorre hacia arriba las de abajo (como Sheets)."""
+        borrar = sorted(set(rows))
+        if not borrar:
+            return {"rows": 0, "api_calls": 0}
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "DELETE FROM cells WHERE worksheet = ? AND row = ?",
+                [(worksheet_title, r) for r in borrar],
+            )
+            restantes = [
+                r[0] for r in conn.execute(
+                    "SELECT DISTINCT row FROM cells WHERE worksheet = ? AND row > ? ORDER BY row",
+                    (worksheet_title, borrar[0]),
+                )
+            ]
+            # En orden ascendente el destino siempre está libre
+            movimientos, k = [], 0
+            for r in restantes:
+                while k < len(borrar) and borrar[k] < r:
+                    k += 1
+                movimientos.append((r - k, worksheet_title, r))
+            conn.executemany(
+                "UPDATE cells SET row = ? WHERE worksheet = ? AND row = ?", movimientos
+            )
+        return {"rows": len(borrar), "api_calls": 0}
+
+    def replace_worksheet(self, worksheet_title: str, values: List[List[str]]) -> None:
+        conn = self._conn()
+        with conn:
+            self._ensure_worksheet(conn, worksheet_title)
+            conn.execute("DELETE FROM cells WHERE worksheet = ?", (worksheet_title,))
+            conn.executemany(
+                "INSERT INTO cells (worksheet, row, col, value) VALUES (?, ?, ?, ?)",
+                [
+                    (worksheet_title, r, c, str(v))
+                    for r, fila in enumerate(values, start=1)
+                    for c, v in enumerate(fila, start=1)
+                ],
+            )
+
+    def replace_worksheets(self, sheets: Dict[str, List[List[str]]]) -> Dict:
+        """Varias pestañas en una sola transacción."""
+        conn = self._conn()
+        with conn:
+            creadas = 0
+            for title, values in sheets.items():
+                if conn.execute("SELECT 1 FROM worksheets WHERE title = ?", (title,)).fetchone() is None:
+                    creadas += 1
+                self._ensure_worksheet(conn, title)
+                conn.execute("DELETE FROM cells WHERE worksheet = ?", (title,))
+                conn.executemany(
+                    "INSERT INTO cells (worksheet, row, col, value) VALUES (?, ?, ?, ?)",
+                    [
+                        (title, r, c, str(v))
+                        for r, fila in enumerate(values, start=1)
+                        for c, v in enumerate(fila, start=1)
+                    ],
+                )
+        return {"created": creadas, "replaced": len(sheets) - creadas, "api_calls": 0}
+
+    def import_from(self, source) -> List[str]:
+        """Copia todas las worksheets de otro backend (p. ej. Sheets) a SQLite."""
+        titles = source.list_worksheets()
+        for title in titles:
+            self.replace_worksheet(title, source.get_all_values(title))
+        return titles
@@ -0,0 +1,74 @@
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+from attendance_matrix import TARDY, AttendanceMatrix, status_rates
+
+# =========================
+# CUBO RESUMEN POR MATERIA
+# =========================
+# Se arma UNA vez por versión de la worksheet (llave = sello del VersionClock):
+#   conteos[alumno, unidad, estado]  +  conteos por alumno, por sesión y de la materia
+# Todas las gráficas de graficas.py son vistas baratas sobre el cubo, así que
+# cambiar de alumno en un selectbox no vuelve a convertir ni agrupar la hoja.
+
+class SummaryCube:
+    """Conteos de asistencia de una materia listos para graficar."""
+
+    def __init__(self, matriz: AttendanceMatrix, units: Sequence[Optional[str]]):
+        self.students = matriz.students           # Nombre / No de control
+        self.sessions = list(matriz.sessions)     # encabezados de asistencia
+        self.codes = matriz.codes                 # int8 alumnos × sesiones (historiales)
+        # Todas las reducciones salen de la matriz (ver attendance_matrix.py)
+        self.units, self.unit_counts = matriz.unit_counts(units)   # alumnos × unidades × estados
+        self.unit_scores = matriz.unit_scores(units).to_numpy()    # puntaje alumno × unidad (0–1)
+        self.student_counts = matriz.counts(axis=1)   # alumnos × estados
+        self.session_counts = matriz.counts(axis=0)   # sesiones × estados
+        self.totals = matriz.counts()                 # estados (materia)
+        self.score = float(matriz.scores().mean()) if matriz.codes.size else 0.0
+
+    @classmethod
+    def from_df(
+        cls, df: pd.DataFrame, session_cols: Sequence[str], units: Sequence[Optional[str]]
+    ) -> "SummaryCube":
+        """`units[j]` es la etiqueta de la sesión j; None = no cuenta para unidades."""
+        return cls(AttendanceMatrix.from_df(df, session_cols), units)
+
+    @property
+    def n_students(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def n_cells(self) -> int:
+        return int(self.codes.size)
+
+    def student_index(self, nombre: str) -> int:
+        """Fila del primer alumno con ese nombre."""
+        return int(np.flatnonzero((self.students["Nombre"] == nombre).to_numpy())[0])
+
+    # --- puntaje ✓ = 1, ~ = 0.5 ---
+    def unit_percentages(self) -> np.ndarray:
+        """% de asistencia alumno × unidad."""
+        return self.unit_scores * 100
+
+    def student_percentages(self) -> np.ndarray:
+        """% de asistencia por alumno (promedio de sus unidades)."""
+        pct = self.unit_percentages()
+        if pct.shape[1] == 0:
+            return np.full(self.n_students, np.nan)
+        return pct.mean(axis=1)
+
+    def materia_percentage(self) -> float:
+        return self.score * 100
+
+    # --- retardos ---
+    def student_tardies(self) -> np.ndarray:
+        return self.student_counts[:, TARDY]
+
+    def session_tardy_rates(self) -> np.ndarray:
+        return status_rates(self.session_counts)["tardy_rate"] * 100
+
+    def tardy_percentage(self) -> float:
+        return float(status_rates(self.totals)["tardy_rate"]) * 100
+
+    def tardy_history(self, student: int) -> np.ndarray:
+        return (self.codes[student] == TARDY).astype(int)
@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from attendance_matrix import count_rates, encode_values
+from header_index import header_index, is_attendance_column, parse_header
+
+# =========================
+# HOJA DE RESUMEN "_resumen"
+# =========================
+# Conteos acumulados por materia × unidad × alumno:
+#
+#   materia | unidad | No de control | presentes | retardos | faltas | sesiones
+#
+# Cada captura (columna nueva o reescrita) y cada corrección de retardos se
+# traduce en un delta contra lo que había en la hoja; sólo se escriben las
+# filas del resumen que cambian (y se agregan las que faltan). Los tableros
+# pueden leer esta hoja pequeña en vez de todas las materias.
+
+SUMMARY_TITLE = "_resumen"
+KEY_COLUMNS = ["materia", "unidad", "No de control"]
+COUNT_COLUMNS = ["presentes", "retardos", "faltas", "sesiones"]
+SUMMARY_HEADER = KEY_COLUMNS + COUNT_COLUMNS
+
+Key = Tuple[str, str, str]
+
+# código de estado (0 sin dato, 1 ✓, 2 ~, 3 ✗) -> aporte a presentes / retardos / faltas / sesiones
+# Una celda sin dato cuenta como sesión (igual que en comparativo: el
+# denominador de las tasas son todas las sesiones de la materia).
+_APORTE = np.array([
+    [0, 0, 0, 1],
+    [1, 0, 0, 1],
+    [0, 1, 0, 1],
+    [0, 0, 1, 1],
+], dtype=np.int64)
+
+def student_keys(df: pd.DataFrame) -> List[str]:
+    if "No de control" not in df.columns:
+        return []
+    return df["No de control"].astype(str).str.strip().tolist()
+
+def _add(deltas: Dict[Key, np.ndarray], key: Key, delta: np.ndarray) -> None:
+    if key[2] and delta.any():
+        deltas[key] = deltas.get(key, np.zeros(4, dtype=np.int64)) + delta
+
+def column_deltas(
+    materia: str, header: str, keys: Sequence[str], old: Optional[Sequence], new: Sequence
+) -> Dict[Key, np.ndarray]:
+    """Delta de una columna de asistencia reescrita (`old` = None si es nueva)."""
+    if not is_attendance_column(header):
+        return {}
+    unidad = parse_header(header).unit
+    n = len(keys)
+    nuevo = encode_values(np.asarray(list(new)[:n] + [""] * max(n - len(new), 0), dtype=object))
+    if old is None:
+        antes = np.zeros((n, len(COUNT_COLUMNS)), dtype=np.int64)   # la sesión no existía
+    else:
+        viejo = encode_values(np.asarray(list(old)[:n] + [""] * max(n - len(old), 0), dtype=object))
+        antes = _APORTE[viejo]
+    diff = _APORTE[nuevo] - antes
+    deltas: Dict[Key, np.ndarray] = {}
+    for nc, d in zip(keys, diff):
+        _add(deltas, (materia, unidad, str(nc).strip()), d)
+    return deltas
+
+def frame_deltas(materia: str, df: pd.DataFrame, cells: Dict[Tuple[int, int], str]) -> Dict[Key, np.ndarray]:
+    """Delta de celdas sueltas (coordenadas base 1 sobre la vista ancha `df`)."""
+    keys = student_keys(df)
+    deltas: Dict[Key, np.ndarray] = {}
+    for (row, col), value in cells.items():
+        if not (2 <= row < len(keys) + 2 and 1 <= col <= len(df.columns)):
+            continue
+        header = str(df.columns[col - 1])
+        if not is_attendance_column(header):
+            continue
+        viejo, nuevo = encode_values(np.asarray([df.iat[row - 2, col - 1], value], dtype=object))
+        _add(deltas, (materia, parse_header(header).unit, keys[row - 2]), _APORTE[nuevo] - _APORTE[viejo])
+    return deltas
+
+def summary_from_wide(materia: str, df: pd.DataFrame) -> Dict[Key, np.ndarray]:
+    """Conteos completos de una materia (para reconstruir el resumen)."""
+    keys = student_keys(df)
+    deltas: Dict[Key, np.ndarray] = {}
+    for info in header_index(df.columns).attendance:
+        codes = encode_values(df.iloc[:, info.position].to_numpy(dtype=object))
+        for nc, d in zip(keys, _APORTE[codes]):
+            _add(deltas, (materia, info.unit, nc), d)
+    return deltas
+
+def summary_rows(counts: Dict[Key, np.ndarray]) -> List[List]:
+    """Filas de la hoja (sin encabezado) a partir de conteos completos."""
+    return [list(key) + [int(v) for v in c] for key, c in counts.items()]
+
+def plan_summary_update(
+    summary: pd.DataFrame, deltas: Dict[Key, np.ndarray]
+) -> Tuple[Dict[Tuple[int, int], int], List[List]]:
+    """
+    Celdas a reescribir (filas existentes) y filas nuevas para aplicar los deltas.
+    `summary` es la hoja leída como DataFrame (fila i -> fila i + 2 en la hoja).
+    """
+    pos = {c: SUMMARY_HEADER.index(c) + 1 for c in COUNT_COLUMNS}
+    fila_de: Dict[Key, int] = {}
+    if not summary.empty and set(SUMMARY_HEADER) <= set(summary.columns):
+        llaves = zip(*(summary[c].astype(str).str.strip() for c in KEY_COLUMNS))
+        for i, key in enumerate(llaves):
+            fila_de.setdefault(key, i)
+        actuales = summary[COUNT_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+
+    cells: Dict[Tuple[int, int], int] = {}
+    nuevas: List[List] = []
+    for key, delta in deltas.items():
+        i = fila_de.get(key)
+        if i is None:
+            nuevas.append(list(key) + [int(v) for v in np.maximum(delta, 0)])
+            continue
+        total = np.maximum(actuales[i] + delta, 0)
+        for j, c in enumerate(COUNT_COLUMNS):
+            if total[j] != actuales[i][j]:
+                cells[(i + 2, pos[c])] = int(total[j])
+    return cells, nuevas
+
+def materia_rates(summary: pd.DataFrame) -> pd.DataFrame:
+    """Totales y tasas por materia (mismas columnas que el resumen de comparativo)."""
+    columnas = ["materia", "present", "tardy", "absent", "total", "present_rate", "tardy_rate", "absent_rate"]
+    if summary.empty or not set(SUMMARY_HEADER) <= set(summary.columns):
+        return pd.DataFrame(columns=columnas)
+    conteos = summary[COUNT_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    out = (
+        conteos.assign(materia=summary["materia"].astype(str))
+        .groupby("materia", sort=True)[COUNT_COLUMNS].sum()
+        .rename(columns={"presentes": "present", "retardos": "tardy", "faltas": "absent", "sesiones": "total"})
+        .reset_index()
+    )
+    for rate, valores in count_rates(out["present"], out["tardy"], out["absent"], out["total"]).items():
+        out[rate] = valores
+    return out[columnas]
@@ -0,0 +1,67 @@
+import sys, os
+
+# ---  Hacemos que Python vea la carpeta raíz del proyecto ---
+CURRENT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import pytest
+from sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def backend(tmp_path):
+    """Backend SQLite vacío con una materia de tres alumnos."""
+    b = SQLiteBackend(str(tmp_path / "asistencia.db"))
+    b.replace_worksheet("Redes", [
+        ["No de control", "Nombre"],
+        ["1", "Ana"],
+        ["2", "Beto"],
+        ["3", "Caro"],
+    ])
+    return b
+
+def apply_to(backend):
+    """apply_fn de la bitácora sobre un backend (como _apply_journal_batch, sin Streamlit)."""
+    def aplicar(lote):
+        if lote["kind"] == "column":
+            backend.write_column(lote["worksheet"], lote["header"], lote["values"])
+        else:
+            backend.update_cells(lote["worksheet"], lote["cells"])
+    return aplicar
+
+class FakeWorksheet:
+    """Worksheet en memoria con get_all_values / batch_get como los de gspread."""
+
+    def __init__(self, title, grid):
+        self.title = title
+        self.grid = [list(r) for r in grid]
+        self.calls = []
+
+    @property
+    def col_count(self):
+        return max((len(r) for r in self.grid), default=0)
+
+    def _trim(self, block):
+        block = [list(r) for r in block]
+        for r in block:
+            while r and r[-1] == "":
+                r.pop()
+        while block and not block[-1]:
+            block.pop()
+        return block
+
+    def get_all_values(self):
+        self.calls.append("get_all_values")
+        return self._trim(self.grid)
+
+    def batch_get(self, ranges):
+        from gspread.utils import a1_range_to_grid_range
+        self.calls.append(("batch_get", list(ranges)))
+        out = []
+        for rango in ranges:
+            g = a1_range_to_grid_range(rango)
+            r0, r1 = g.get("startRowIndex", 0), g.get("endRowIndex", len(self.grid))
+            c0, c1 = g.get("startColumnIndex", 0), g.get("endColumnIndex", self.col_count)
+            out.append(self._trim([(row + [""] * c1)[c0:c1] for row in self.grid[r0:r1]]))
+        return out
@@ -0,0 +1,13 @@
+import datetime
+from attendance_log import LOG_TITLE, LogLayout, ZONA
+
+H = "Unidad 1 - 01/09/2025 08:00"
+
+def test_capture_becomes_events_stamped_in_mexico_city_time(backend):
+    log = LogLayout(backend)
+    log.write_column("Redes", H, ["✓", "~", "✗"])
+    eventos = backend.get_all_values(LOG_TITLE)[1:]
+    assert [e[:4] for e in eventos] == [["Redes", "1", H, "✓"], ["Redes", "2", H, "~"], ["Redes", "3", H, "✗"]]
+    ts = datetime.datetime.fromisoformat(eventos[0][4])
+    assert ts.utcoffset() == datetime.datetime.now(ZONA).utcoffset()
+    assert log.read_df("Redes")[H].tolist() == ["✓", "~", "✗"]
@@ -0,0 +1,41 @@
+from attendance_matrix import merge_marks
+
+def test_unchanged_checkbox_keeps_the_saved_mark():
+    guardados = ["✓", "~", "✗", "r", "✓"]
+    casillas = [True, False, False, True, False]
+    assert merge_marks(guardados, casillas) == ["✓", "~", "✗", "✓", "✗"]
+
+def test_rewrite_with_realigned_roster_keeps_tardies():
+    # Captura abierta cuya columna ya no coincide fila por fila: lo guardado se
+    # alinea por No de control (alumno nuevo = celda vacía) y se reescribe completa
+    por_alumno = {"1": "✓", "2": "~", "3": "✗"}
+    lista = ["1", "4", "2", "3"]
+    previos = [por_alumno.get(nc, "") for nc in lista]
+    assert merge_marks(previos, [True, False, False, True]) == ["✓", "✗", "~", "✓"]
+
+def test_reductions_per_student_session_unit_and_materia():
+    import numpy as np
+    import pandas as pd
+    from attendance_matrix import AttendanceMatrix
+    from summary_cube import SummaryCube
+
+    df = pd.DataFrame({
+        "No de control": ["1", "2"],
+        "Nombre": ["Ana", "Beto"],
+        "Unidad 1 - 01/09/2025 08:00": ["✓", "r"],
+        "Unidad 1 - 02/09/2025 08:00": ["~", ""],
+        "Unidad 2 - 08/09/2025 08:00": ["✗", "✓"],
+    })
+    sesiones = list(df.columns[2:])
+    m = AttendanceMatrix.from_df(df, sesiones)
+    np.testing.assert_allclose(m.rates(axis=1)["tardy_rate"], [1 / 3, 1 / 3])
+    np.testing.assert_allclose(m.rates(axis=0)["present_rate"], [0.5, 0.0, 0.5])
+    assert float(m.rates()["absent_rate"]) == 1 / 6   # la celda vacía cuenta en el denominador
+    etiquetas, conteos = m.unit_counts(["U1", "U1", "U2"])
+    assert etiquetas == ["U1", "U2"] and conteos[1, 0].tolist() == [1, 0, 1, 0]
+    np.testing.assert_allclose(m.unit_scores(["U1", "U1", "U2"]).to_numpy(), [[0.75, 0.0], [0.25, 1.0]])
+
+    cubo = SummaryCube(m, ["U1", "U1", "U2"])
+    np.testing.assert_allclose(cubo.unit_percentages(), m.unit_scores(["U1", "U1", "U2"]).to_numpy() * 100)
+    np.testing.assert_allclose(cubo.session_tardy_rates(), [50.0, 50.0, 0.0])
+    assert cubo.materia_percentage() == float(m.scores().mean() * 100)
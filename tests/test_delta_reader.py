@@ -0,0 +1,48 @@
+from conftest import FakeWorksheet
+from delta_reader import DeltaReader
+
+GRID = [
+    ["No de control", "Nombre", "Unidad 1 - 01/09/2025 08:00"],
+    ["1", "Ana", "✓"],
+    ["2", "Beto", "✗"],
+]
+
+def _reader(**kw):
+    return DeltaReader(lambda ws: ws.get_all_values(), lambda ws, r: ws.batch_get(r), **kw)
+
+def test_hand_edit_is_picked_up_by_periodic_resync():
+    ws = FakeWorksheet("Redes", GRID)
+    reader = _reader(full_resync_s=0.0)
+    reader.read_df(ws)
+    ws.grid[2][2] = "~"   # edición a mano en una celda existente
+    df = reader.read_df(ws)
+    assert df["Unidad 1 - 01/09/2025 08:00"].tolist() == ["✓", "~"]
+    assert reader.last_stats["Redes"]["mode"] == "full (resync)"
+
+def test_header_is_reused_only_while_fresh_and_clean():
+    ws = FakeWorksheet("Redes", GRID)
+    reader = _reader()
+    assert reader.header("Redes", max_age_s=5.0) is None   # nunca leída
+    reader.read_df(ws)
+    assert reader.header("Redes", max_age_s=5.0) == GRID[0]
+    assert reader.header("Redes", max_age_s=-1.0) is None  # demasiado vieja
+    reader.mark_dirty("Redes", "D1:D3")
+    assert reader.header("Redes", max_age_s=5.0) is None   # escritura nuestra sin releer
+
+def test_new_column_and_own_writes_are_read_as_deltas():
+    ws = FakeWorksheet("Redes", GRID)
+    reader = _reader()
+    reader.read_df(ws)
+
+    # Captura nueva en D y corrección nuestra en C3
+    for fila, valor in zip(ws.grid, ["Unidad 1 - 02/09/2025 08:00", "✗", "✓"]):
+        fila.append(valor)
+    ws.grid[2][2] = "~"
+    reader.mark_dirty("Redes", "C3")
+    ws.calls.clear()
+
+    df = reader.read_df(ws)
+    assert df["Unidad 1 - 02/09/2025 08:00"].tolist() == ["✗", "✓"]
+    assert df["Unidad 1 - 01/09/2025 08:00"].tolist() == ["✓", "~"]
+    assert ws.calls == [("batch_get", ["1:1", "D1:D", "A4:C", "C3"])]
+    assert reader.last_stats["Redes"]["mode"] == "delta"
@@ -0,0 +1,41 @@
+import threading
+import time
+import pytest
+import rate_limiter
+from rate_limiter import RateLimitExceeded, SheetsScheduler
+
+def test_capture_lane_is_served_before_an_earlier_dashboard_request(monkeypatch):
+    # Sin reserva, para que sólo cuente el orden de los carriles
+    monkeypatch.setitem(rate_limiter.RESERVE_FRACTION, "dashboard", 0.0)
+    sched = SheetsScheduler(reads_per_minute=600)   # 1 token cada 0.1 s
+    sched.penalize("read")
+    orden = []
+
+    def pedir(carril):
+        sched.acquire("read", carril, deadline_s=5.0)
+        orden.append(carril)
+
+    tablero = threading.Thread(target=pedir, args=("dashboard",))
+    tablero.start()
+    while not sched.stats()["waiting"]["read"]:
+        time.sleep(0.005)
+    pedir("capture")
+    tablero.join()
+    assert orden == ["capture", "dashboard"]
+
+def test_reserve_keeps_low_lanes_out_and_counts_rejections():
+    sched = SheetsScheduler(reads_per_minute=600)
+    sched.penalize("read")
+    with pytest.raises(RateLimitExceeded):
+        sched.acquire("read", "dashboard", deadline_s=0.2)   # la reserva es de 150 tokens
+    assert sched.acquire("read", "capture", deadline_s=1.0) < 1.0
+    lanes = sched.stats()["lanes"]
+    assert lanes["dashboard"]["rejected"] == 1 and lanes["capture"]["acquired"] == 1
+
+def test_lane_context_is_restored():
+    rate_limiter.set_lane("interactive")
+    with rate_limiter.lane("capture"):
+        assert rate_limiter.current_lane() == "capture"
+    assert rate_limiter.current_lane() == "interactive"
+    with pytest.raises(ValueError):
+        rate_limiter.set_lane("urgente")
@@ -0,0 +1,33 @@
+import pandas as pd
+from roster_merge import plan_roster_update
+
+GRID = [
+    ["No de control", "Nombre", "Grupo", "Unidad 1 - 01/09/2025 08:00"],
+    ["1", "Ana", "A", "✓"],
+    ["2", "Beto", "A", "✗"],
+    ["3", "Caro", "A", "✓"],
+]
+
+def _lista(*filas):
+    return pd.DataFrame(filas, columns=["No de control", "Nombre", "Grupo"])
+
+def test_sheet_without_key_column_is_replaced():
+    assert plan_roster_update([], _lista(["1", "Ana", "A"])) is None
+    assert plan_roster_update([["Nombre"]], _lista(["1", "Ana", "A"])) is None
+
+def test_same_roster_is_a_no_op():
+    plan = plan_roster_update(GRID, _lista(["1", "Ana", "A"], ["2", "Beto", "A"], ["3", "Caro", "A"]))
+    assert plan.is_empty
+
+def test_changes_touch_only_roster_cells_and_keep_attendance():
+    plan = plan_roster_update(GRID, _lista(["1", "Ana María", "A"], ["3", "Caro", "B"], ["4", "Dani", "A"]))
+    assert plan.added == ["4"] and plan.removed == ["2"]
+    assert plan.renamed == [("1", "Ana", "Ana María")] and plan.updated == ["3"]
+    assert plan.delete_rows == []
+    assert plan.cells == {(2, 2): "Ana María", (4, 3): "B", (5, 1): "4", (5, 2): "Dani", (5, 3): "A"}
+
+def test_deleting_removed_students_shifts_rows_below():
+    plan = plan_roster_update(GRID, _lista(["1", "Ana", "A"], ["3", "Caro", "B"], ["4", "Dani", "A"]), delete_removed=True)
+    assert plan.delete_rows == [3]
+    # Caro sube de la fila 4 a la 3 y el nuevo entra después de la última fila restante
+    assert plan.cells == {(3, 3): "B", (4, 1): "4", (4, 2): "Dani", (4, 3): "A"}
@@ -0,0 +1,57 @@
+from sheet_shards import ShardRouter, shard_title
+
+H_SEP = "Unidad 1 - 01/09/2025 08:00"
+H_OCT = "Unidad 2 - 06/10/2025 08:00"
+OCT = shard_title("Redes", "2025-10")
+
+class HidingBackend:
+    """Backend SQLite que registra las pestañas ocultadas (como Sheets)."""
+
+    def __init__(self, base):
+        self._base = base
+        self.hidden = []
+
+    def __getattr__(self, name):
+        return getattr(self._base, name)
+
+    def hide_worksheet(self, worksheet_title):
+        self.hidden.append(worksheet_title)
+        return {"api_calls": 1}
+
+def sharded(backend):
+    """Router con septiembre en la materia y octubre ya en su shard."""
+    router = ShardRouter(HidingBackend(backend), by="month", max_columns=3)
+    router.write_column("Redes", H_SEP, ["✓", "✗", "✓"])
+    router.write_column("Redes", H_OCT, ["~", "✓", "✗"])
+    return router
+
+def test_new_shards_are_hidden(backend):
+    router = sharded(backend)
+    assert router.base.hidden == [OCT]
+    assert router.read_header("Redes") == ["No de control", "Nombre", H_SEP, H_OCT]
+
+def test_replacing_the_roster_reorders_the_shards(backend):
+    router = sharded(backend)
+    router.replace_worksheet("Redes", [
+        ["No de control", "Nombre", H_SEP],
+        ["3", "Caro", "✓"],
+        ["4", "Dani", ""],
+        ["1", "Ana", "✓"],
+    ])
+    df = router.read_df("Redes")
+    assert df["No de control"].astype(str).tolist() == ["3", "4", "1"]
+    assert df[H_OCT].tolist() == ["✗", "", "~"]
+    assert backend.get_all_values(OCT)[1:] == [["3", "✗"], ["4", ""], ["1", "~"]]
+
+def test_roster_upsert_keeps_the_shards_aligned(backend):
+    router = sharded(backend)
+    # Como roster_merge: se borra a Beto y Dani entra al final de la vista ancha
+    router.delete_rows("Redes", [3])
+    router.update_cells("Redes", {(4, 1): "4", (4, 2): "Dani"})
+    df = router.read_df("Redes")
+    assert df["No de control"].astype(str).tolist() == ["1", "3", "4"]
+    assert df[H_OCT].tolist() == ["~", "✗", ""]
+    assert [r[0] for r in backend.get_all_values(OCT)[1:]] == ["1", "3", "4"]
+    # La siguiente captura de octubre cae en la fila de cada alumno
+    router.write_column("Redes", "Unidad 2 - 07/10/2025 08:00", ["✓", "✓", "✗"])
+    assert router.read_df("Redes")["Unidad 2 - 07/10/2025 08:00"].tolist() == ["✓", "✓", "✗"]
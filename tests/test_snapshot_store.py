@@ -0,0 +1,26 @@
+import pandas as pd
+from cache_version import VersionClock
+from snapshot_store import SnapshotStore
+
+DF = pd.DataFrame({"No de control": [1, 2], "Nombre": ["Ana", "Beto"], "Unidad 1 - 01/09/2025 08:00": ["✓", "~"]})
+
+def test_snapshot_keeps_full_version_and_run(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert store.save("Asistencia", "Redes", DF, "2025-09-01T08:00:00Z|3")
+    snap = store.load("Asistencia", "Redes")
+    assert snap.version == "2025-09-01T08:00:00Z|3" and snap.remote == "2025-09-01T08:00:00Z"
+    assert snap.run == store.run
+    pd.testing.assert_frame_equal(snap.df, DF)
+
+    # Otra corrida del proceso lee el mismo archivo con otro `run`
+    otra = SnapshotStore(str(tmp_path))
+    assert otra.load("Asistencia", "Redes").run != otra.run
+
+def test_own_writes_move_the_local_part_without_asking_drive():
+    consultas = []
+    clock = VersionClock(lambda: consultas.append(1) or "t0", check_interval_s=60)
+    assert clock.stamp(["Redes"]) == "t0|0"
+    clock.bump(["Redes"])
+    assert clock.local(["Redes"]) == 1 and clock.local(["Física"]) == 0
+    assert clock.stamp(["Redes"]) == "t0|1"   # mismo modifiedTime, otra versión
+    assert len(consultas) == 1
@@ -0,0 +1,53 @@
+from sqlite_backend import SQLiteBackend
+
+H1 = "Unidad 1 - 01/09/2025 08:00"
+H2 = "Unidad 1 - 02/09/2025 08:00"
+
+def test_write_column_appends_then_rewrites_in_place(backend):
+    assert backend.write_column("Redes", H1, ["✓", "✗", "✓"])["col_idx"] == 3
+    assert backend.write_column("Redes", H2, ["✗", "✗", "✗"])["col_idx"] == 4
+    # Mismo encabezado: se reescribe la misma columna
+    assert backend.write_column("Redes", H1, ["~", "✗", "✓"])["col_idx"] == 3
+    assert backend.read_header("Redes") == ["No de control", "Nombre", H1, H2]
+    df = backend.read_df("Redes")
+    assert df[H1].tolist() == ["~", "✗", "✓"]
+    assert df[H2].tolist() == ["✗", "✗", "✗"]
+
+def test_update_cells_writes_past_the_grid(backend):
+    backend.update_cells("Redes", {(1, 28): H1, (3, 28): "~", (5, 1): "4"})
+    grid = backend.get_all_values("Redes")
+    assert len(grid) == 5 and len(grid[0]) == 28
+    assert grid[0][27] == H1 and grid[2][27] == "~" and grid[4][0] == "4"
+    # Celdas vacías no cuentan para el tamaño de la hoja
+    backend.update_cells("Redes", {(5, 1): ""})
+    assert len(backend.get_all_values("Redes")) == 4
+
+def test_append_rows_goes_after_the_last_row(backend):
+    backend.append_rows("Redes", [["4", "Dani"], ["5", "Eva"]])
+    df = backend.read_df("Redes")
+    assert df["Nombre"].tolist() == ["Ana", "Beto", "Caro", "Dani", "Eva"]
+    # Pestaña nueva: la primera fila anexada es la 1
+    backend.append_rows("_resumen", [["materia", "unidad"]])
+    assert backend.get_all_values("_resumen") == [["materia", "unidad"]]
+
+def test_delete_rows_shifts_the_rows_below_with_their_attendance(backend):
+    backend.write_column("Redes", H1, ["✓", "✗", "~"])
+    backend.append_rows("Redes", [["4", "Dani", "✓"]])
+    assert backend.delete_rows("Redes", [2, 4]) == {"rows": 2, "api_calls": 0}
+    assert backend.get_all_values("Redes") == [
+        ["No de control", "Nombre", H1],
+        ["2", "Beto", "✗"],
+        ["4", "Dani", "✓"],
+    ]
+    assert backend.delete_rows("Redes", [])["rows"] == 0
+
+def test_import_from_copies_every_worksheet(tmp_path, backend):
+    backend.write_column("Redes", H1, ["✓", "✗", "✓"])
+    backend.replace_worksheet("Física", [["No de control", "Nombre"], ["9", "Iván"]])
+
+    copia = SQLiteBackend(str(tmp_path / "copia" / "asistencia.db"))
+    copia.replace_worksheet("Física", [["viejo"]])   # la que ya existe se reemplaza
+    assert copia.import_from(backend) == ["Redes", "Física"]
+    assert copia.list_worksheets() == ["Física", "Redes"]
+    for title in ("Redes", "Física"):
+        assert copia.get_all_values(title) == backend.get_all_values(title)
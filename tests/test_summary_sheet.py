@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import summary_sheet
+from summary_sheet import SUMMARY_HEADER, column_deltas, frame_deltas, plan_summary_update, summary_from_wide
+
+H1 = "Unidad 1 - 01/09/2025 08:00"
+H2 = "Unidad 1 - 02/09/2025 08:00"
+
+WIDE = pd.DataFrame({
+    "No de control": ["1", "2"],
+    "Nombre": ["Ana", "Beto"],
+    H1: ["✓", "~"],
+    H2: ["✗", ""],
+})
+
+def _summary(conteos):
+    return pd.DataFrame(summary_sheet.summary_rows(conteos), columns=SUMMARY_HEADER)
+
+def test_full_count_includes_blank_cells_as_sessions():
+    conteos = summary_from_wide("Redes", WIDE)
+    assert conteos[("Redes", "Unidad 1", "1")].tolist() == [1, 0, 1, 2]
+    assert conteos[("Redes", "Unidad 1", "2")].tolist() == [0, 1, 0, 2]
+
+def test_new_column_delta_matches_full_rebuild():
+    actual = _summary(summary_from_wide("Redes", WIDE))
+    deltas = column_deltas("Redes", "Unidad 2 - 08/09/2025 08:00", ["1", "2", "3"], None, ["✓", "✗", "r"])
+    cells, nuevas = plan_summary_update(actual, deltas)
+    assert cells == {}   # unidad nueva: sólo filas nuevas
+    assert sorted(nuevas) == [
+        ["Redes", "Unidad 2", "1", 1, 0, 0, 1],
+        ["Redes", "Unidad 2", "2", 0, 0, 1, 1],
+        ["Redes", "Unidad 2", "3", 0, 1, 0, 1],
+    ]
+
+def test_cell_correction_rewrites_only_changed_counts():
+    actual = _summary(summary_from_wide("Redes", WIDE))
+    # Beto: el retardo de la primera sesión pasa a presente
+    deltas = frame_deltas("Redes", WIDE, {(3, 3): "✓"})
+    assert list(deltas) == [("Redes", "Unidad 1", "2")]
+    cells, nuevas = plan_summary_update(actual, deltas)
+    assert nuevas == []
+    fila = actual.index[actual["No de control"] == "2"][0] + 2
+    assert cells == {(fila, 4): 1, (fila, 5): 0}
+
+def test_rewritten_column_delta_is_zero_when_nothing_changes():
+    assert column_deltas("Redes", H1, ["1", "2"], ["✓", "~"], ["✓", "~"]) == {}
+    d = column_deltas("Redes", H1, ["1", "2"], ["✓", "~"], ["✗", "~"])
+    assert {k: v.tolist() for k, v in d.items()} == {("Redes", "Unidad 1", "1"): [-1, 0, 1, 0]}
+    assert not np.any(column_deltas("Redes", "Nombre", ["1"], None, ["x"]))
@@ -0,0 +1,160 @@
+import pytest
+from conftest import apply_to
+from write_journal import WriteJournal
+
+H = "Unidad 1 - 01/09/2025 08:00"
+
+def test_poison_entry_does_not_block_others(tmp_path, backend):
+    aplicar = apply_to(backend)
+
+    def apply_fn(lote):
+        if lote["worksheet"] == "Borrada":
+            raise KeyError("WorksheetNotFound: Borrada")  # permanente
+        aplicar(lote)
+
+    j = WriteJournal(str(tmp_path / "j.jsonl"), apply_fn)
+    j.append("column", "Borrada", header=H, values=["✓"])
+    j.append("column", "Redes", header=H, values=["✓", "✗", "✓"])
+
+    assert j.flush_once() == 1
+    assert backend.read_df("Redes")[H].tolist() == ["✓", "✗", "✓"]
+    assert j.backlog()["pending"] == 0
+    muertas = j.dead()
+    assert [e["worksheet"] for e in muertas] == ["Borrada"]
+    assert "WorksheetNotFound" in muertas[0]["error"]
+
+    # Los muertos sobreviven a un reinicio y no vuelven a la cola solos
+    j2 = WriteJournal(str(tmp_path / "j.jsonl"), apply_fn)
+    assert j2.backlog()["pending"] == 0
+    assert [e["id"] for e in j2.dead()] == [muertas[0]["id"]]
+
+def test_transient_error_keeps_batch_pending(tmp_path, backend):
+    fallas = {"n": 1}
+    aplicar = apply_to(backend)
+
+    def apply_fn(lote):
+        if fallas["n"]:
+            fallas["n"] -= 1
+            raise TimeoutError("timeout")
+        aplicar(lote)
+
+    j = WriteJournal(str(tmp_path / "j.jsonl"), apply_fn)
+    j.append("column", "Redes", header=H, values=["✓", "✓", "✓"])
+    assert j.flush_once() == 0
+    assert j.backlog()["pending"] == 1 and not j.dead()
+    assert j.flush_once() == 1
+    assert backend.read_df("Redes")[H].tolist() == ["✓", "✓", "✓"]
+
+def test_retry_dead_requeues_entry(tmp_path, backend):
+    rota = {"on": True}
+    aplicar = apply_to(backend)
+
+    def apply_fn(lote):
+        if rota["on"]:
+            raise ValueError("400 bad request")
+        aplicar(lote)
+
+    j = WriteJournal(str(tmp_path / "j.jsonl"), apply_fn)
+    j.append("column", "Redes", header=H, values=["✗", "✗", "✗"])
+    j.flush_once()
+    assert len(j.dead()) == 1
+
+    rota["on"] = False
+    assert j.retry_dead() == 1
+    assert WriteJournal(str(tmp_path / "j.jsonl"), apply_fn).backlog()["pending"] == 1
+    assert j.flush_once() == 1
+    assert not j.dead()
+    assert backend.read_df("Redes")[H].tolist() == ["✗", "✗", "✗"]
+
+def test_cells_after_column_rewrite_keep_their_order(tmp_path, backend):
+    j = WriteJournal(str(tmp_path / "j.jsonl"), apply_to(backend))
+    backend.write_column("Redes", H, ["✓", "✓", "✓"])
+    col = backend.read_header("Redes").index(H) + 1
+    j.append("cells", "Redes", cells=[[2, col, "~"]])                  # K1
+    j.append("column", "Redes", header=H, values=["✗", "✗", "✗"])     # C
+    j.append("cells", "Redes", cells=[[3, col, "✓"]])                  # K2
+
+    lotes = j._coalesce(j.pending())
+    assert [l["kind"] for l in lotes] == ["cells", "column", "cells"]
+
+    j.flush_once()
+    assert backend.read_df("Redes")[H].tolist() == ["✗", "✓", "✗"]
+
+def test_entries_after_a_dead_column_wait_behind_it(tmp_path, backend):
+    rota = {"on": True}
+    lotes = []
+    aplicar = apply_to(backend)
+
+    def apply_fn(lote):
+        if rota["on"] and lote["kind"] == "column":
+            raise ValueError("400 bad request")
+        lotes.append(lote["kind"])
+        aplicar(lote)
+
+    j = WriteJournal(str(tmp_path / "j.jsonl"), apply_fn)
+    j.append("column", "Redes", header=H, values=["✗", "✗", "✗"])   # C (falla)
+    j.append("cells", "Redes", cells=[[3, 3, "~"]])                  # K calculada sobre C
+    j.flush_once()
+    assert lotes == [] and len(j.dead()) == 2
+    assert "Detrás de una captura con error" in j.dead()[1]["error"]
+
+    # Lo que llega en otro ciclo también espera detrás de la captura muerta
+    j.append("cells", "Redes", cells=[[4, 3, "✓"]])
+    j.flush_once()
+    assert lotes == [] and len(j.dead()) == 3
+
+    rota["on"] = False
+    j.retry_dead()
+    j.flush_once()
+    assert lotes == ["column", "cells"]
+    assert backend.read_df("Redes")[H].tolist() == ["✗", "~", "✓"]
+
+def test_compaction_failure_keeps_the_previous_journal(tmp_path, backend, monkeypatch):
+    import os
+    ruta = str(tmp_path / "j.jsonl")
+
+    def apply_fn(lote):
+        raise ValueError("400 bad request")
+
+    j = WriteJournal(ruta, apply_fn)
+    j.append("column", "Redes", header=H, values=["✓", "✓", "✓"])
+    j.flush_once()   # muerta; la compactación la conserva
+
+    def corte(src, dst):
+        raise OSError("corte de luz")
+
+    monkeypatch.setattr(os, "replace", corte)
+    with pytest.raises(OSError):
+        j._compact()   # la escritura a medias no toca la bitácora
+    monkeypatch.undo()
+    assert len(WriteJournal(ruta, apply_fn).dead()) == 1
+
+def test_pending_entries_are_replayed_after_restart_and_acked(tmp_path, backend):
+    ruta = str(tmp_path / "j.jsonl")
+    j = WriteJournal(ruta, apply_to(backend))
+    j.append("column", "Redes", header=H, values=["✓", "✓", "✓"])
+    j.append("cells", "Redes", cells=[[2, 1, "1"]])
+
+    # Reinicio antes de sincronizar: la bitácora en disco conserva ambas
+    j2 = WriteJournal(ruta, apply_to(backend))
+    assert j2.backlog()["pending"] == 2
+    j2.flush_once()
+    assert backend.read_df("Redes")[H].tolist() == ["✓", "✓", "✓"]
+
+    # Ya confirmadas (ack): otro reinicio no las repite
+    assert WriteJournal(ruta, apply_to(backend)).backlog()["pending"] == 0
+
+def test_consecutive_rewrites_of_a_column_coalesce_into_the_last(tmp_path, backend):
+    lotes = []
+    aplicar = apply_to(backend)
+
+    def apply_fn(lote):
+        lotes.append(lote)
+        aplicar(lote)
+
+    j = WriteJournal(str(tmp_path / "j.jsonl"), apply_fn)
+    j.append("column", "Redes", header=H, values=["✓", "✓", "✓"])
+    j.append("column", "Redes", header=H, values=["✓", "✗", "✓"])
+    j.flush_once()
+    assert len(lotes) == 1 and lotes[0]["values"] == ["✓", "✗", "✓"]
+    assert backend.read_df("Redes")[H].tolist() == ["✓", "✗", "✓"]
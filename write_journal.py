@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# =========================
+# BITÁCORA DE ESCRITURA DIFERIDA (write-behind)
+# =========================
+# Cada captura se agrega primero a un archivo local de solo-anexar (JSON por
+# línea, con fsync) y se confirma al docente de inmediato. Un hilo en segundo
+# plano vacía la bitácora hacia el backend en lotes agrupados, con reintentos.
+#
+# Formato de cada línea:
+#   {"op": "write", "id": "...", "ts": 0.0, "kind": "column"|"cells", "worksheet": "...", ...}
+#   {"op": "ack", "ids": ["...", ...]}
+#   {"op": "dead", "ids": ["...", ...], "error": "..."}
+# Una entrada "write" sin su "ack" sigue pendiente (también tras reiniciar la app).
+# Cada lote se aplica por separado: un error transitorio (429, timeout, red) lo
+# deja pendiente para el siguiente ciclo; cualquier otro error (pestaña que ya
+# no existe, 400 de la API...) lo aparta como "muerto" para que no bloquee las
+# capturas de los demás. Lo que llega después a esa MISMA worksheet también se
+# aparta (p. ej. correcciones calculadas sobre la columna que falló), así un
+# reintento desde diagnóstico vuelve a aplicar todo en su orden original.
+
+def is_transient(error: BaseException) -> bool:
+    """Errores de red / timeout que vale la pena reintentar tal cual."""
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+class WriteJournal:
+    """Bitácora durable con un hilo que la vacía hacia el backend."""
+
+    def __init__(
+        self,
+        path: str,
+        apply_fn: Callable[[Dict], None],
+        flush_interval: float = 1.0,
+        max_retry_delay: float = 60.0,
+        is_retryable: Callable[[BaseException], bool] = is_transient,
+    ):
+        self.path = path
+        self.apply_fn = apply_fn
+        self.is_retryable = is_retryable
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Dict[str, Dict] = {}  # id -> entrada (en orden de llegada)
+        self._dead: Dict[str, Dict] = {}     # id -> entrada apartada (con su "error")
+        self.flushed = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_flush_ts: Optional[float] = None
+
+        carpeta = os.path.dirname(os.path.abspath(path))
+        os.makedirs(carpeta, exist_ok=True)
+        self._load()
+
+    # --- Archivo ---
+    def _load(self) -> None:
+        """Reconstruye las entradas pendientes a partir del archivo."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    rec = json.loads(linea)
+                except ValueError:
+                    # Última línea truncada por un corte de luz: se ignora
+                    continue
+                if rec.get("op") == "write":
+                    self._pending[rec["id"]] = rec
+                    self._dead.pop(rec["id"], None)   # reintentada desde diagnóstico
+                elif rec.get("op") == "ack":
+                    for entry_id in rec.get("ids", []):
+                        self._pending.pop(entry_id, None)
+                        self._dead.pop(entry_id, None)
+                elif rec.get("op") == "dead":
+                    for entry_id in rec.get("ids", []):
+                        entry = self._pending.pop(entry_id, None)
+                        if entry is not None:
+                            self._dead[entry_id] = {**entry, "error": rec.get("error")}
+
+    def _append_lines(self, records: List[Dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self) -> None:
+        """
+        Sin pendientes, la bitácora se reescribe sólo con los muertos para que no
+        crezca sin límite. Se escribe aparte y se reemplaza de un jalón: un corte
+        a la mitad deja la bitácora anterior completa.
+        """
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry_id, entry in self._dead.items():
+                write = {k: v for k, v in entry.items() if k != "error"}
+                f.write(json.dumps(write, ensure_ascii=False) + "\n")
+                f.write(json.dumps({"op": "dead", "ids": [entry_id], "error": entry["error"]}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    # --- API ---
+    def append(self, kind: str, worksheet: str, **payload) -> str:
+        """Guarda la entrada en disco (fsync) y regresa su id (llave de idempotencia)."""
+        entry = {
+            "op": "write",
+            "id": uuid.uuid4().hex,
+            "ts": time.time(),
+            "kind": kind,
+            "worksheet": worksheet,
+            **payload,
+        }
+        with self._lock:
+            self._append_lines([entry])
+            self._pending[entry["id"]] = entry
+        self._wake.set()
+        return entry["id"]
+
+    def pending(self, worksheet: Optional[str] = None) -> List[Dict]:
+        """Entradas aún no confirmadas (en orden de llegada), opcionalmente de una worksheet."""
+        with self._lock:
+            return [dict(e) for e in self._pending.values() if worksheet is None or e["worksheet"] == worksheet]
+
+    def dead(self) -> List[Dict]:
+        """Entradas apartadas por un error permanente (con su "error")."""
+        with self._lock:
+            return [dict(e) for e in self._dead.values()]
+
+    def retry_dead(self, ids: Optional[List[str]] = None) -> int:
+        """Regresa entradas muertas (None = todas) a pendientes, p. ej. tras renombrar la pestaña."""
+        with self._lock:
+            ids = list(self._dead) if ids is None else [i for i in ids if i in self._dead]
+            entradas = [{k: v for k, v in self._dead.pop(i).items() if k != "error"} for i in ids]
+            # Se vuelven a anexar como escrituras nuevas (mismo id) para que sobrevivan a un reinicio
+            self._append_lines(entradas)
+            for entry in entradas:
+                self._pending[entry["id"]] = entry
+        if entradas:
+            self._wake.set()
+        return len(entradas)
+
+    def discard_dead(self, ids: Optional[List[str]] = None) -> int:
+        """Descarta entradas muertas (None = todas); quedan confirmadas sin aplicarse."""
+        with self._lock:
+            ids = list(self._dead) if ids is None else [i for i in ids if i in self._dead]
+            if ids:
+                self._append_lines([{"op": "ack", "ids": ids}])
+            for entry_id in ids:
+                self._dead.pop(entry_id, None)
+        return len(ids)
+
+    def backlog(self) -> Dict:
+        """Indicador del trabajo pendiente para mostrar en la UI."""
+        with self._lock:
+            pendientes = list(self._pending.values())
+            muertas = len(self._dead)
+        oldest = min((e["ts"] for e in pendientes), default=None)
+        return {
+            "pending": len(pendientes),
+            "dead": muertas,
+            "oldest_age_s": (time.time() - oldest) if oldest else 0.0,
+            "flushed": self.flushed,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_flush_ts": self.last_flush_ts,
+        }
+
+    def _coalesce(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Agrupa las entradas pendientes SÓLO si son consecutivas dentro de su
+        worksheet y del mismo tipo, para respetar el orden de llegada:
+        - columnas: mismo encabezado seguido, gana la última captura
+        - celdas: ediciones seguidas en un solo lote (la última gana por celda)
+        Así "celdas K1 → columna C → celdas K2" da tres lotes y K2 queda después de C.
+        Cada lote lleva los ids que cubre.
+        """
+        lotes: List[Dict] = []
+        ultimo: Dict[str, Dict] = {}   # worksheet -> último lote (lo que está "abierto" para agrupar)
+        for e in entries:
+            ws = e["worksheet"]
+            if e["kind"] == "column":
+                key = ("column", ws, e["header"])
+            else:
+                key = ("cells", ws)
+            lote = ultimo.get(ws)
+            if lote is None or lote["key"] != key:
+                lote = {"key": key, "kind": e["kind"], "worksheet": ws, "ids": []}
+                if e["kind"] == "cells":
+                    lote["cells"] = {}
+                lotes.append(lote)
+                ultimo[ws] = lote
+            if e["kind"] == "column":
+                lote["header"] = e["header"]
+                lote["values"] = e["values"]
+            else:
+                for row, col, value in e["cells"]:
+                    lote["cells"][(row, col)] = value
+            lote["ids"].append(e["id"])
+        for lote in lotes:
+            del lote["key"]
+        return lotes
+
+    def _mark_dead(self, ids: List[str], error: str) -> None:
+        with self._lock:
+            self._append_lines([{"op": "dead", "ids": ids, "error": error}])
+            for entry_id in ids:
+                entry = self._pending.pop(entry_id, None)
+                if entry is not None:
+                    self._dead[entry_id] = {**entry, "error": error}
+
+    def _flush(self) -> Tuple[int, bool]:
+        """Aplica los pendientes lote por lote; regresa (confirmadas, hubo error transitorio)."""
+        with self._lock:
+            entries = list(self._pending.values())
+        if not entries:
+            return 0, False
+
+        confirmadas = 0
+        reintentar = False
+        bloqueadas = set()   # worksheets con un lote pendiente: lo que sigue espera para no desordenarse
+        with self._lock:
+            # worksheet -> error de su captura muerta: lo que llegue después depende de ella
+            muertas = {e["worksheet"]: e["error"] for e in self._dead.values()}
+        for lote in self._coalesce(entries):
+            if lote["worksheet"] in bloqueadas:
+                continue
+            if lote["worksheet"] in muertas:
+                self._mark_dead(lote["ids"], f"Detrás de una captura con error: {muertas[lote['worksheet']]}")
+                continue
+            try:
+                self.apply_fn(lote)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                if self.is_retryable(e):
+                    # 429, timeout, red caída...: el lote sigue pendiente para el siguiente ciclo
+                    reintentar = True
+                    bloqueadas.add(lote["worksheet"])
+                else:
+                    # Error permanente: se aparta (con lo que siga en su worksheet) para
+                    # no bloquear las capturas de las demás
+                    self._mark_dead(lote["ids"], self.last_error)
+                    muertas[lote["worksheet"]] = self.last_error
+                continue
+            with self._lock:
+                self._append_lines([{"op": "ack", "ids": lote["ids"]}])
+                for entry_id in lote["ids"]:
+                    self._pending.pop(entry_id, None)
+            confirmadas += len(lote["ids"])
+            self.flushed += len(lote["ids"])
+
+        with self._lock:
+            if not self._pending:
+                self._compact()
+        if not reintentar:
+            self.last_error = None
+        self.last_flush_ts = time.time()
+        return confirmadas, reintentar
+
+    def flush_once(self) -> int:
+        """Aplica todos los pendientes; regresa cuántas entradas se confirmaron."""
+        return self._flush()[0]
+
+    def _run(self) -> None:
+        retry_delay = self.flush_interval
+        while True:
+            self._wake.wait(timeout=retry_delay)
+            self._wake.clear()
+            try:
+                _, reintentar = self._flush()
+            except Exception as e:  # p. ej. disco lleno al escribir el ack
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                reintentar = True
+            if reintentar:
+                retry_delay = min(max(retry_delay, self.flush_interval) * 2, self.max_retry_delay)
+            else:
+                retry_delay = self.flush_interval
+
+    def start(self) -> "WriteJournal":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-journal", daemon=True)
+            self._thread.start()
+            if self._pending:
+                self._wake.set()
+        return self